@@ -32,6 +32,21 @@ DAILY_TICKER_ANALYSIS_PROMPT = """Analyze ticker {ticker} for day {day_input} us
 Generate your comprehensive financial analysis based on this data."""
 
 
+LANGUAGE_RETRY_PROMPT = """Your previous answer did not contain a valid analysis entry for these languages: {languages}.
+
+**Problems found:**
+{errors}
+
+Using the same data and your previous analysis, return the MANDATORY OUTPUT FORMAT array again, but with entries ONLY for the languages {languages}.
+Every field is required and every list must contain non-empty strings."""
+
+
 def generate_daily_analysis_prompt(raw_analysis_data: ComprehensiveStockDataModel) -> str:
     """Generate a daily analysis prompt for any ticker symbol"""
     return DAILY_TICKER_ANALYSIS_PROMPT.format(ticker=raw_analysis_data.symbol.upper(), day_input=raw_analysis_data.timestamp, raw_analysis_data=raw_analysis_data)
+
+
+def generate_language_retry_prompt(languages: list, errors: dict) -> str:
+    """Generate a follow-up prompt asking the agent to regenerate only the failed languages"""
+    error_lines = "\n".join(f"- {language}: {errors.get(language, 'Missing from the response')}" for language in languages)
+    return LANGUAGE_RETRY_PROMPT.format(languages=", ".join(languages), errors=error_lines)
@@ -1,7 +1,9 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 from typing import List, Optional
 
+from price_series import PriceSeries
+
 
 class StockDividendDataModel(BaseModel):
     """Model for stock dividend data"""
@@ -284,6 +286,40 @@ class TimeFrameIndicators(BaseModel):
     momentum: float
     trend_indicators: TechnicalIndicatorsModel.TrendIndicators
 
+class IndicatorStateModel(BaseModel):
+    """Model for persisted incremental indicator state of a ticker and timeframe"""
+    symbol: str
+    timeframe: str
+    bars_count: int = 0
+    last_bar: StockRealtimeDataModel | None = None
+
+    # Rolling buffers (oldest first) sized to the longest window that needs them
+    closes: List[float] = []
+    highs: List[float] = []
+    lows: List[float] = []
+    volumes: List[int] = []
+
+    # Running numerator/denominator of the adjusted EMAs (pandas ewm(adjust=True))
+    ema_12_num: float = 0.0
+    ema_12_den: float = 0.0
+    ema_26_num: float = 0.0
+    ema_26_den: float = 0.0
+    macd_signal_num: float = 0.0
+    macd_signal_den: float = 0.0
+
+    obv: float = 0.0
+
+    # Parabolic SAR state machine (None until two bars have been seen)
+    sar_is_long: bool | None = None
+    sar_value: float = 0.0
+    sar_next: float = 0.0
+    sar_extreme_point: float = 0.0
+    sar_acceleration: float = 0.0
+
+    version: int = 0
+    updated_at: str | None = None
+
+
 class TechnicalAnalysisResults(BaseModel):
     """Model for complete technical analysis results"""
     # Current market data
@@ -305,10 +341,13 @@ class ComprehensiveStockDataModel(BaseModel):
 
     class CompanyDataModel(BaseModel):
         """Model for company data"""
-        hourly_prices: List[StockRealtimeDataModel] = []
-        daily_prices: List[StockRealtimeDataModel] = []
-        weekly_prices: List[StockRealtimeDataModel] = []
-        monthly_prices: List[StockRealtimeDataModel] = []
+        model_config = ConfigDict(arbitrary_types_allowed=True)
+
+        # Price history is kept columnar (see PriceSeries)
+        hourly_prices: PriceSeries = Field(default_factory=PriceSeries.empty)
+        daily_prices: PriceSeries = Field(default_factory=PriceSeries.empty)
+        weekly_prices: PriceSeries = Field(default_factory=PriceSeries.empty)
+        monthly_prices: PriceSeries = Field(default_factory=PriceSeries.empty)
         overview: StockOverviewModel | None = None
         dividend_data: List[StockDividendDataModel] = []
         splits_data: List[StockSplitDataModel] = []
@@ -317,6 +356,18 @@ class ComprehensiveStockDataModel(BaseModel):
         earnings_estimates: List[StockEarningsEstimateDataModel] = []
         news_sentiment: List[NewsArticleModel] = []
 
+        @field_validator('hourly_prices', 'daily_prices', 'weekly_prices', 'monthly_prices', mode='before')
+        @classmethod
+        def validate_prices(cls, v):
+            # Lists of StockRealtimeDataModel (or their dicts) are still accepted
+            if isinstance(v, list):
+                return PriceSeries.from_models([StockRealtimeDataModel(**item) if isinstance(item, dict) else item for item in v])
+            return v
+
+        @field_serializer('hourly_prices', 'daily_prices', 'weekly_prices', 'monthly_prices')
+        def serialize_prices(self, v: PriceSeries):
+            return v.to_dicts()
+
     languages: List[str] = ["en"]
     symbol: str
     timestamp: str
@@ -4,20 +4,71 @@ Integrates with multiple financial data APIs for comprehensive market data
 """
 
 import os
-import aiohttp
-import requests
-import pandas as pd
+import asyncio
 import numpy as np
 import json
-import ssl
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
 from google.cloud import firestore
 from data_tool_model import *
+from price_series import PriceSeries
+import av_json
+import http_client
+import technical_indicators
 
 ALPHAVANTAGE_API_KEY = os.environ.get('ALPHAVANTAGE_API_KEY')
 PROJECT_ID = os.environ.get('GCP_PROJECT')
 
+# Blocking calls one analyze_symbol runs at the same time in worker threads (11 Alpha Vantage fetches,
+# then the 4 timeframes); callers size their thread pool as concurrency x THREADS_PER_SYMBOL
+THREADS_PER_SYMBOL = 11
+
+# Keep-alive connections opened to Alpha Vantage while the pre-flight checks run
+# (analyze_symbol issues 11 calls at once; 0 disables the warm-up)
+ALPHAVANTAGE_WARM_CONNECTIONS = int(os.environ.get('ALPHAVANTAGE_WARM_CONNECTIONS', '11'))
+
+# Firestore collection holding incremental indicator state per ticker/timeframe
+INDICATOR_STATE_COLLECTION = 'indicator_state'
+
+# Seconds the macro data loaded for a day is reused by every analysis in this process before
+# the documents' update times are checked again
+GLOBAL_DATA_CACHE_TTL = int(os.environ.get('GLOBAL_DATA_CACHE_TTL', '3600'))
+
+# Firestore document name -> model of its 'data' rows, in GlobalUSDataModel field order
+GLOBAL_US_INDICATORS = {
+    'inflation': GlobalUSInflationDataModel,
+    'cpi': GlobalUSCPIDataModel,
+    'federal_funds_rate': GlobalUSFederalFundsRateDataModel,
+    'retail_sales': GlobalUSRetailSalesDataModel,
+    'unemployment': GlobalUSUnemploymentDataModel,
+}
+
+# Consolidated macro snapshots written by global_us_data_collector (one per day plus 'latest')
+GLOBAL_DATA_SNAPSHOT_COLLECTION = 'global_us_data_snapshots'
+
+# Process-level macro data cache: day -> (time.monotonic() of the last check, document update times, model)
+_global_data_cache: Dict[str, tuple] = {}
+_global_data_lock = threading.Lock()
+
+
+def apply_series_delta(series: Dict[str, list], delta: Dict[str, list]) -> Dict[str, list]:
+    """
+    Apply one day's changes from a macro snapshot to a series
+    Args:
+        series: {'dates': [...], 'values': [...]} before the change
+        delta: {'dates': [...], 'values': [...], 'removed': [...]} as written by global_us_data_collector
+    Returns:
+        New {'dates': [...], 'values': [...]} series, newest first like the Alpha Vantage response
+    """
+    points = dict(zip(series.get('dates', []), series.get('values', [])))
+    for date in delta.get('removed', []):
+        points.pop(date, None)
+    points.update(zip(delta.get('dates', []), delta.get('values', [])))
+    dates = sorted(points, reverse=True)
+    return {'dates': dates, 'values': [points[date] for date in dates]}
+
 
 class FinancialDataTool:
     """
@@ -26,13 +77,10 @@ class FinancialDataTool:
     """
     
     def __init__(self):        
-        # Initialize Firestore client
-        self.db = firestore.Client(project=PROJECT_ID)
+        # Firestore client is created on first use (see db), keeping the import of this module cheap
+        self._db = None
+        self._db_lock = threading.Lock()
         
-        # Create SSL context that doesn't verify certificates (for demo/testing only)
-        self.ssl_context = ssl.create_default_context()
-        self.ssl_context.check_hostname = False
-        self.ssl_context.verify_mode = ssl.CERT_NONE
         self.today = datetime.now().strftime('%Y-%m-%d')
 
         if not ALPHAVANTAGE_API_KEY:
@@ -47,10 +95,22 @@ class FinancialDataTool:
             },
         }
     
+    @property
+    def db(self) -> firestore.Client:
+        """Firestore client, created on first use"""
+        if self._db is None:
+            with self._db_lock:
+                if self._db is None:
+                    self._db = firestore.Client(project=PROJECT_ID)
+        return self._db
+
     def _create_session(self):
-        """Create an aiohttp session with proper SSL configuration"""
-        connector = aiohttp.TCPConnector(ssl=self.ssl_context)
-        return aiohttp.ClientSession(connector=connector)
+        """Create an aiohttp session verifying TLS with the process-wide context"""
+        return http_client.create_async_session()
+
+    def warm_connections(self) -> int:
+        """Open ALPHAVANTAGE_WARM_CONNECTIONS pooled connections to Alpha Vantage ahead of the first analysis"""
+        return http_client.warm_pool(self.apis['alpha_vantage']['base_url'], ALPHAVANTAGE_WARM_CONNECTIONS)
 
     def get_stock_daily_quote(self, symbol: str, function: str) -> Dict:
         """
@@ -73,35 +133,19 @@ class FinancialDataTool:
                     'interval': '60min',
                     'apikey': self.apis['alpha_vantage']['api_key']
                 }
-                retrieved_data = []
+                retrieved_data = PriceSeries.empty()
 
-                response = requests.get(url, params=params)
+                response = http_client.get(url, params=params, stream=True)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = av_json.get_json(response)
                     found_markdown = False
                     for frame in [
                         'Time Series (60min)', 'Time Series (Daily)', 'Weekly Time Series', 'Monthly Time Series'
                     ]:
                         if frame in data:
                             found_markdown = True
-                            quote = data[frame]
-                            # Convert to list and sort by date (Alpha Vantage returns newest first)
-                            date_entries = []
-                            for date, values in quote.items():
-                                entry = StockRealtimeDataModel(
-                                    date=date,
-                                    open=float(values['1. open']),
-                                    high=float(values['2. high']),
-                                    low=float(values['3. low']),
-                                    close=float(values['4. close']),
-                                    volume=int(values['5. volume'])
-                                )
-                                date_entries.append((date, entry))
-                            
-                            # Sort by date in descending order (newest first) for API consistency
-                            # but keep track that [0] = most recent for current price extraction
-                            date_entries.sort(key=lambda x: x[0], reverse=True)
-                            retrieved_data = [entry for date, entry in date_entries]
+                            # Columnar series sorted chronologically; len()/[0] still give the most recent bar first
+                            retrieved_data = PriceSeries.from_alpha_vantage(data[frame])
                     
                     if not found_markdown:
                         print(f"No valid data found for {symbol} with function {params['function']}", data)
@@ -139,9 +183,9 @@ class FinancialDataTool:
                     'apikey': self.apis['alpha_vantage']['api_key']
                 }
 
-                response = requests.get(url, params=params)
+                response = http_client.get(url, params=params, stream=True)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = av_json.get_json(response)
                         
                     if "feed" in data:
                         # Create the structured model from the raw data
@@ -184,9 +228,9 @@ class FinancialDataTool:
             }
             retrieved_data = {}
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "Symbol" in data:
                     retrieved_data = StockOverviewModel(**data)
                     return retrieved_data
@@ -225,9 +269,9 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "data" in data:
                     retrieved_data = [StockDividendDataModel(**dividend) for dividend in data["data"]]
                 else:
@@ -266,9 +310,9 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "data" in data:
                     retrieved_data = [StockSplitDataModel(**splits) for splits in data["data"]]
                 else:
@@ -307,9 +351,9 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "annualReports" in data:
                     retrieved_data = [StockBalanceSheetDataModel(**sheet) for sheet in data["annualReports"]]
                 else:
@@ -349,9 +393,9 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "annualReports" in data:
                     retrieved_data = [StockIncomeStatementDataModel(**sheet) for sheet in data["annualReports"]]
                 else:
@@ -390,9 +434,9 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if "estimates" in data:
                     retrieved_data = [StockEarningsEstimateDataModel(**sheet) for sheet in data["estimates"]]
                 else:
@@ -411,220 +455,136 @@ class FinancialDataTool:
                 print(f"Response data: {data}")
             return {'error': str(e), 'symbol': symbol}
     
-    def get_global_us_inflation_data(self) -> List[GlobalUSInflationDataModel]:
+    def get_all_global_us_data(self) -> GlobalUSDataModel:
         """
-        Get global US inflation data from Firestore
+        Get all global US economic data from Firestore
         Returns:
-            List of GlobalUSInflationDataModel containing inflation data or error information
+            Dict containing all economic indicators
+
+        The result is cached per day for the whole process. After GLOBAL_DATA_CACHE_TTL the documents are
+        read again, but only re-parsed when their update times changed.
         """
-        try:
-            doc_ref = self.db.collection('global_us_data').document('inflation').collection("history").document(self.today)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                if 'data' in data:
-                    retrieved_data = [GlobalUSInflationDataModel(**item) for item in data['data']]
-                    return retrieved_data
-                else:
-                    print("ERROR: No data field in historical inflation document.")
-                    return {'error': 'No data field in document', 'function': 'INFLATION'}
-            else:
-                print("WARNING: Inflation document does not exist in Firestore. Searching for historical last known values.")
-                doc_ref = self.db.collection('global_us_data').document('inflation')
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    if 'data' in data:
-                        retrieved_data = [GlobalUSInflationDataModel(**item) for item in data['data']]
-                        return retrieved_data
+        today = datetime.now().strftime('%Y-%m-%d')
+        with _global_data_lock:
+            cached = _global_data_cache.get(today)
+            if cached and time.monotonic() - cached[0] < GLOBAL_DATA_CACHE_TTL:
+                return cached[2]
+
+            try:
+                snapshot = self._read_global_us_snapshot(today)
+                if snapshot is not None:
+                    update_times = {snapshot.id: snapshot.update_time}
+                    if cached and cached[1] == update_times:
+                        all_data = cached[2]
                     else:
-                        print("ERROR: No data field in historical inflation document.")
-                        return {'error': 'No data field in document', 'function': 'INFLATION'}
+                        all_data = self._parse_global_us_snapshot(snapshot)
                 else:
-                    print("ERROR: No historical inflation document found in Firestore.")
-                    return {'error': 'Document not found', 'function': 'INFLATION'}
+                    # Per-indicator documents written before the collector produced snapshots
+                    documents = self._read_global_us_documents(today)
+                    update_times = {name: doc.update_time for name, doc in documents.items()}
+                    if cached and cached[1] == update_times:
+                        all_data = cached[2]
+                    else:
+                        all_data = GlobalUSDataModel(**{
+                            name: self._parse_global_us_document(name, documents.get(name))
+                            for name in GLOBAL_US_INDICATORS
+                        })
 
-        except Exception as e:
-            print(f"Error fetching inflation data from Firestore: {e}")
-            return {'error': str(e), 'function': 'INFLATION'}
+                _global_data_cache.clear()
+                _global_data_cache[today] = (time.monotonic(), update_times, all_data)
+                return all_data
 
-    def get_global_us_cpi_data(self) -> List[GlobalUSCPIDataModel]:
+            except Exception as e:
+                print(f"Error fetching all global US data: {e}")
+                return {'error': str(e), 'status': 'failed'}
+
+    def _read_global_us_snapshot(self, day: str):
         """
-        Get global US CPI data from Firestore
+        Read the consolidated macro snapshot for a day, falling back to the latest one (single batched request)
+        Args:
+            day: Date of the snapshot (YYYY-MM-DD)
         Returns:
-            List of GlobalUSCPIDataModel containing CPI data or error information
+            Snapshot document holding all indicators, or None when there is no complete snapshot
         """
-        try:
-            doc_ref = self.db.collection('global_us_data').document('cpi').collection("history").document(self.today)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                if 'data' in data:
-                    retrieved_data = [GlobalUSCPIDataModel(**item) for item in data['data']]
-                    return retrieved_data
-                else:
-                    print("ERROR: No data field in historical CPI document.")
-                    return {'error': 'No data field in document', 'function': 'CPI'}
-            else:
-                print("WARNING: CPI document does not exist in Firestore. Searching for historical last known values.")
-                doc_ref = self.db.collection('global_us_data').document('cpi')
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    if 'data' in data:
-                        retrieved_data = [GlobalUSCPIDataModel(**item) for item in data['data']]
-                        return retrieved_data
-                    else:
-                        print("ERROR: No data field in historical CPI document.")
-                        return {'error': 'No data field in document', 'function': 'CPI'}
-                else:
-                    print("ERROR: No historical CPI document found in Firestore.")
-                    return {'error': 'Document not found', 'function': 'CPI'}
+        collection = self.db.collection(GLOBAL_DATA_SNAPSHOT_COLLECTION)
+        snapshots = {doc.id: doc for doc in self.db.get_all([collection.document(day), collection.document('latest')]) if doc.exists}
+        for snapshot_id in (day, 'latest'):
+            snapshot = snapshots.get(snapshot_id)
+            series = snapshot.to_dict().get('series') or {} if snapshot is not None else {}
+            if all(name in series for name in GLOBAL_US_INDICATORS):
+                return snapshot
+        return None
 
-        except Exception as e:
-            print(f"Error fetching CPI data from Firestore: {e}")
-            return {'error': str(e), 'function': 'CPI'}
+    def _parse_global_us_snapshot(self, snapshot) -> GlobalUSDataModel:
+        """Build the macro data model from the date/value arrays of a snapshot document"""
+        return self._global_us_model_from_series(snapshot.to_dict()['series'])
 
-    def get_global_us_federal_funds_rate_data(self) -> List[GlobalUSFederalFundsRateDataModel]:
-        """
-        Get global US Federal Funds Rate data from Firestore
-        Returns:
-            List of GlobalUSFederalFundsRateDataModel containing Federal Funds Rate data or error information
-        """
-        try:
-            doc_ref = self.db.collection('global_us_data').document('federal_funds_rate').collection("history").document(self.today)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                if 'data' in data:
-                    retrieved_data = [GlobalUSFederalFundsRateDataModel(**item) for item in data['data']]
-                    return retrieved_data
-                else:
-                    print("ERROR: No data field in historical Federal Funds Rate document.")
-                    return {'error': 'No data field in document', 'function': 'FEDERAL_FUNDS_RATE'}
-            else:
-                print("WARNING: Federal Funds Rate document does not exist in Firestore. Searching for historical last known values.")
-                doc_ref = self.db.collection('global_us_data').document('federal_funds_rate')
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    if 'data' in data:
-                        retrieved_data = [GlobalUSFederalFundsRateDataModel(**item) for item in data['data']]
-                        return retrieved_data
-                    else:
-                        print("ERROR: No data field in historical Federal Funds Rate document.")
-                        return {'error': 'No data field in document', 'function': 'FEDERAL_FUNDS_RATE'}
-                else:
-                    print("ERROR: No historical Federal Funds Rate document found in Firestore.")
-                    return {'error': 'Document not found', 'function': 'FEDERAL_FUNDS_RATE'}
-            
-        except Exception as e:
-            print(f"Error fetching Federal Funds Rate data from Firestore: {e}")
-            return {'error': str(e), 'function': 'FEDERAL_FUNDS_RATE'}
+    def _global_us_model_from_series(self, series: Dict[str, Dict[str, list]]) -> GlobalUSDataModel:
+        """Build the macro data model from name -> {'dates': [...], 'values': [...]} (absent names stay empty)"""
+        return GlobalUSDataModel(**{
+            name: [model(date=date, value=value) for date, value in zip(series[name]['dates'], series[name]['values'])]
+            for name, model in GLOBAL_US_INDICATORS.items() if name in series
+        })
 
-    def get_global_us_retail_sales_data(self) -> List[GlobalUSRetailSalesDataModel]:
+    def get_global_us_data_as_of(self, day: str) -> GlobalUSDataModel:
         """
-        Get global US retail sales data from Firestore
+        Reconstruct the macro data as it was known on a past day from the per-day snapshot changes
+        Args:
+            day: Date (YYYY-MM-DD)
         Returns:
-            List of GlobalUSRetailSalesDataModel containing retail sales data or error information
+            GlobalUSDataModel folded from all snapshot documents up to the day, or error dict
         """
         try:
-            doc_ref = self.db.collection('global_us_data').document('retail_sales').collection("history").document(self.today)
-            doc = doc_ref.get()
-            
-            if doc.exists:
+            query = self.db.collection(GLOBAL_DATA_SNAPSHOT_COLLECTION).where('date', '<=', day).order_by('date')
+            series = {}
+            for doc in query.stream():
+                if doc.id == 'latest':
+                    continue
                 data = doc.to_dict()
-                if 'data' in data:
-                    retrieved_data = [GlobalUSRetailSalesDataModel(**item) for item in data['data']]
-                    return retrieved_data
-                else:
-                    print("ERROR: No data field in historical Retail Sales document.")
-                    return {'error': 'No data field in document', 'function': 'RETAIL_SALES'}
-            else:
-                print("WARNING: Retail Sales document does not exist in Firestore. Searching for historical last known values.")
-                doc_ref = self.db.collection('global_us_data').document('retail_sales')
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    if 'data' in data:
-                        retrieved_data = [GlobalUSRetailSalesDataModel(**item) for item in data['data']]
-                        return retrieved_data
-                    else:
-                        print("ERROR: No data field in historical Retail Sales document.")
-                        return {'error': 'No data field in document', 'function': 'RETAIL_SALES'}
-                else:
-                    print("ERROR: No historical Retail Sales document found in Firestore.")
-                    return {'error': 'Document not found', 'function': 'RETAIL_SALES'}
-            
-        except Exception as e:
-            print(f"Error fetching retail sales data from Firestore: {e}")
-            return {'error': str(e), 'function': 'RETAIL_SALES'}
+                if 'series' in data:
+                    # Full snapshot written before the collector stored changes only
+                    series = dict(data['series'])
+                for name, delta in data.get('changes', {}).items():
+                    series[name] = apply_series_delta(series.get(name, {}), delta)
 
-    def get_global_us_unemployment_data(self) -> List[GlobalUSUnemploymentDataModel]:
-        """
-        Get global US unemployment data from Firestore
-        Returns:
-            List of GlobalUSUnemploymentDataModel containing unemployment data or error information
-        """
-        try:
-            doc_ref = self.db.collection('global_us_data').document('unemployment').collection("history").document(self.today)
-            doc = doc_ref.get()
-            
-            if doc.exists:
-                data = doc.to_dict()
-                if 'data' in data:
-                    retrieved_data = [GlobalUSUnemploymentDataModel(**item) for item in data['data']]
-                    return retrieved_data
-                else:
-                    print("ERROR: No data field in historical Unemployment document.")
-                    return {'error': 'No data field in document', 'function': 'UNEMPLOYMENT'}
-            else:
-                print("WARNING: Unemployment document does not exist in Firestore. Searching for historical last known values.")
-                doc_ref = self.db.collection('global_us_data').document('unemployment')
-                doc = doc_ref.get()
-                
-                if doc.exists:
-                    data = doc.to_dict()
-                    if 'data' in data:
-                        retrieved_data = [GlobalUSUnemploymentDataModel(**item) for item in data['data']]
-                        return retrieved_data
-                    else:
-                        print("ERROR: No data field in historical Unemployment document.")
-                        return {'error': 'No data field in document', 'function': 'UNEMPLOYMENT'}
-                else:
-                    print("ERROR: No historical Unemployment document found in Firestore.")
-                    return {'error': 'Document not found', 'function': 'UNEMPLOYMENT'}
+            return self._global_us_model_from_series(series)
 
         except Exception as e:
-            print(f"Error fetching unemployment data from Firestore: {e}")
-            return {'error': str(e), 'function': 'UNEMPLOYMENT'}
+            print(f"Error reconstructing global US data as of {day}: {e}")
+            return {'error': str(e), 'status': 'failed'}
 
-    def get_all_global_us_data(self) -> GlobalUSDataModel:
+    def _read_global_us_documents(self, day: str) -> Dict[str, object]:
         """
-        Get all global US economic data from Firestore
+        Read the macro documents for a day in one batched request
+        Args:
+            day: Date of the history documents (YYYY-MM-DD)
         Returns:
-            Dict containing all economic indicators
+            Document name -> snapshot; indicators without a history document for the day fall back to
+            the last known values (one more batched request)
         """
-        try:
-            all_data = GlobalUSDataModel(
-                inflation=self.get_global_us_inflation_data(),
-                cpi=self.get_global_us_cpi_data(),
-                federal_funds_rate=self.get_global_us_federal_funds_rate_data(),
-                retail_sales=self.get_global_us_retail_sales_data(),
-                unemployment=self.get_global_us_unemployment_data()
-            )
-            return all_data
+        collection = self.db.collection('global_us_data')
+        history_refs = [collection.document(name).collection("history").document(day) for name in GLOBAL_US_INDICATORS]
+        # History documents written by newer collectors only hold changes; those fall back to the full document
+        documents = {
+            doc.reference.parent.parent.id: doc for doc in self.db.get_all(history_refs)
+            if doc.exists and 'data' in doc.to_dict()
+        }
 
-        except Exception as e:
-            print(f"Error fetching all global US data: {e}")
-            return {'error': str(e), 'status': 'failed'}
+        missing = [name for name in GLOBAL_US_INDICATORS if name not in documents]
+        if missing:
+            print(f"WARNING: No documents for {day} for {missing} in Firestore. Searching for historical last known values.")
+            documents.update({doc.id: doc for doc in self.db.get_all([collection.document(name) for name in missing]) if doc.exists})
+        return documents
+
+    def _parse_global_us_document(self, name: str, doc) -> list:
+        """Validate the 'data' rows of a macro document; raises when the document or its data is missing"""
+        if doc is None:
+            raise ValueError(f"No {name} document found in Firestore")
+        data = doc.to_dict()
+        if 'data' not in data:
+            raise ValueError(f"No data field in {name} document")
+        model = GLOBAL_US_INDICATORS[name]
+        return [model(**item) for item in data['data']]
 
     def _get_indicator_unit(self, indicator: str) -> str:
         """Get the unit for each economic indicator"""
@@ -637,33 +597,49 @@ class FinancialDataTool:
         }
         return units.get(indicator, 'unknown')
 
-    async def analyze_symbol(self, symbol: str) -> ComprehensiveStockDataModel:
+    async def analyze_symbol(self, symbol: str, global_data: Optional[GlobalUSDataModel] = None,
+                             rate_limiter=None) -> ComprehensiveStockDataModel:
         """
         Execute all stock data collection functions simultaneously for a given symbol
         Args:
             symbol: Stock ticker symbol (e.g., AAPL, MSFT, GOOGL)
+            global_data: Macro data already loaded for a batch of symbols (read from Firestore when omitted)
+            rate_limiter: Optional aiolimiter.AsyncLimiter shared by concurrent analyses, acquired per Alpha Vantage call
         Returns:
             Dict containing all stock data in a structured format
         """
+        async def fetch(function, *args):
+            # The API helpers use blocking requests calls, so run them in worker threads
+            if rate_limiter is None:
+                return await asyncio.to_thread(function, *args)
+            async with rate_limiter:
+                return await asyncio.to_thread(function, *args)
+
         try:
-            stock_hourly_quote = self.get_stock_daily_quote(symbol, 'TIME_SERIES_INTRADAY')
-            stock_daily_quote = self.get_stock_daily_quote(symbol, 'TIME_SERIES_DAILY')
-            stock_weekly_quote = self.get_stock_daily_quote(symbol, 'TIME_SERIES_WEEKLY')
-            stock_monthly_quote = self.get_stock_daily_quote(symbol, 'TIME_SERIES_MONTHLY')
-            stock_news_sentiment = self.get_stock_news_sentiment(symbol)
-            stock_overview = self.get_stock_overview(symbol)
-            stock_dividend_data = self.get_stock_dividend_data(symbol)
-            stock_splits_data = self.get_stock_splits_data(symbol)
-            stock_balance_sheet_data = self.get_stock_balance_sheet_data(symbol)
-            stock_income_statement_data = self.get_stock_income_statement_data(symbol)
-            stock_estimates_data = self.get_stock_estimates_data(symbol)
+            (stock_hourly_quote, stock_daily_quote, stock_weekly_quote, stock_monthly_quote,
+             stock_news_sentiment, stock_overview, stock_dividend_data, stock_splits_data,
+             stock_balance_sheet_data, stock_income_statement_data, stock_estimates_data) = await asyncio.gather(
+                fetch(self.get_stock_daily_quote, symbol, 'TIME_SERIES_INTRADAY'),
+                fetch(self.get_stock_daily_quote, symbol, 'TIME_SERIES_DAILY'),
+                fetch(self.get_stock_daily_quote, symbol, 'TIME_SERIES_WEEKLY'),
+                fetch(self.get_stock_daily_quote, symbol, 'TIME_SERIES_MONTHLY'),
+                fetch(self.get_stock_news_sentiment, symbol),
+                fetch(self.get_stock_overview, symbol),
+                fetch(self.get_stock_dividend_data, symbol),
+                fetch(self.get_stock_splits_data, symbol),
+                fetch(self.get_stock_balance_sheet_data, symbol),
+                fetch(self.get_stock_income_statement_data, symbol),
+                fetch(self.get_stock_estimates_data, symbol)
+            )
+            if global_data is None:
+                global_data = await asyncio.to_thread(self.get_all_global_us_data)
             
             # Apply stock split adjustments to historical prices
             if isinstance(stock_splits_data, list) and len(stock_splits_data) > 0:
-                stock_hourly_quote = self.apply_split_adjustments(stock_hourly_quote, stock_splits_data) if isinstance(stock_hourly_quote, list) else stock_hourly_quote
-                stock_daily_quote = self.apply_split_adjustments(stock_daily_quote, stock_splits_data) if isinstance(stock_daily_quote, list) else stock_daily_quote
-                stock_weekly_quote = self.apply_split_adjustments(stock_weekly_quote, stock_splits_data) if isinstance(stock_weekly_quote, list) else stock_weekly_quote
-                stock_monthly_quote = self.apply_split_adjustments(stock_monthly_quote, stock_splits_data) if isinstance(stock_monthly_quote, list) else stock_monthly_quote
+                stock_hourly_quote = self.apply_split_adjustments(stock_hourly_quote, stock_splits_data) if isinstance(stock_hourly_quote, PriceSeries) else stock_hourly_quote
+                stock_daily_quote = self.apply_split_adjustments(stock_daily_quote, stock_splits_data) if isinstance(stock_daily_quote, PriceSeries) else stock_daily_quote
+                stock_weekly_quote = self.apply_split_adjustments(stock_weekly_quote, stock_splits_data) if isinstance(stock_weekly_quote, PriceSeries) else stock_weekly_quote
+                stock_monthly_quote = self.apply_split_adjustments(stock_monthly_quote, stock_splits_data) if isinstance(stock_monthly_quote, PriceSeries) else stock_monthly_quote
             else:
                 pass
 
@@ -674,10 +650,10 @@ class FinancialDataTool:
                 timestamp=datetime.now().isoformat(),
                 status='success',
                 company_data=ComprehensiveStockDataModel.CompanyDataModel(
-                    hourly_prices=stock_hourly_quote if isinstance(stock_hourly_quote, list) else [],
-                    daily_prices=stock_daily_quote if isinstance(stock_daily_quote, list) else [],
-                    weekly_prices=stock_weekly_quote if isinstance(stock_weekly_quote, list) else [],
-                    monthly_prices=stock_monthly_quote if isinstance(stock_monthly_quote, list) else [],
+                    hourly_prices=stock_hourly_quote if isinstance(stock_hourly_quote, PriceSeries) else PriceSeries.empty(),
+                    daily_prices=stock_daily_quote if isinstance(stock_daily_quote, PriceSeries) else PriceSeries.empty(),
+                    weekly_prices=stock_weekly_quote if isinstance(stock_weekly_quote, PriceSeries) else PriceSeries.empty(),
+                    monthly_prices=stock_monthly_quote if isinstance(stock_monthly_quote, PriceSeries) else PriceSeries.empty(),
                     news_sentiment=stock_news_sentiment if isinstance(stock_news_sentiment, list) else [],
                     overview=stock_overview if hasattr(stock_overview, 'Symbol') else None,
                     dividend_data=stock_dividend_data if isinstance(stock_dividend_data, list) else [],
@@ -686,7 +662,7 @@ class FinancialDataTool:
                     income_statement_data=stock_income_statement_data if isinstance(stock_income_statement_data, list) else [],
                     earnings_estimates=stock_estimates_data if isinstance(stock_estimates_data, list) else []
                 ),
-                global_economic_data=self.get_all_global_us_data(),
+                global_economic_data=global_data,
                 technical_analysis_results=None
             )
 
@@ -706,22 +682,19 @@ class FinancialDataTool:
                 week_52_high = float(comprehensive_data.company_data.overview._52WeekHigh) if comprehensive_data.company_data.overview._52WeekHigh else None
                 week_52_low = float(comprehensive_data.company_data.overview._52WeekLow) if comprehensive_data.company_data.overview._52WeekLow else None
 
-            # Process each timeframe
-            hourly_indicators = None
-            if comprehensive_data.company_data.hourly_prices:
-                hourly_indicators = self.process_timeframe_data(comprehensive_data.company_data.hourly_prices)
-            
-            daily_indicators = None
-            if comprehensive_data.company_data.daily_prices:
-                daily_indicators = self.process_timeframe_data(comprehensive_data.company_data.daily_prices)
-            
-            weekly_indicators = None
-            if comprehensive_data.company_data.weekly_prices:
-                weekly_indicators = self.process_timeframe_data(comprehensive_data.company_data.weekly_prices)
-            
-            monthly_indicators = None
-            if comprehensive_data.company_data.monthly_prices:
-                monthly_indicators = self.process_timeframe_data(comprehensive_data.company_data.monthly_prices)
+            # Process each timeframe: every one loads and saves its indicator state in Firestore, so the four
+            # run concurrently in worker threads instead of blocking the event loop shared by a batch
+            async def indicators(prices, timeframe: str) -> Optional[TimeFrameIndicators]:
+                if not prices:
+                    return None
+                return await asyncio.to_thread(self.process_timeframe_data, prices, symbol=symbol, timeframe=timeframe)
+
+            hourly_indicators, daily_indicators, weekly_indicators, monthly_indicators = await asyncio.gather(
+                indicators(comprehensive_data.company_data.hourly_prices, 'hourly'),
+                indicators(comprehensive_data.company_data.daily_prices, 'daily'),
+                indicators(comprehensive_data.company_data.weekly_prices, 'weekly'),
+                indicators(comprehensive_data.company_data.monthly_prices, 'monthly')
+            )
 
             comprehensive_data.technical_analysis_results = TechnicalAnalysisResults(
                 current_price=current_price,
@@ -746,8 +719,13 @@ class FinancialDataTool:
                 'error': str(e)
             }
     
-    def process_timeframe_data(self, price_data: List[StockRealtimeDataModel], volumes: List = None) -> TimeFrameIndicators:
-        """Process price data for a specific timeframe and calculate all indicators"""
+    def process_timeframe_data(self, price_data: Union[PriceSeries, List[StockRealtimeDataModel]], volumes: List = None,
+                               symbol: Optional[str] = None, timeframe: Optional[str] = None) -> TimeFrameIndicators:
+        """
+        Process price data for a specific timeframe and calculate all indicators
+        When symbol and timeframe are given, indicators are updated incrementally from the persisted state
+        and span every bar that state has seen, not only price_data (see technical_indicators)
+        """
         if not price_data or len(price_data) < 2:
             # Return default values if insufficient data
             return TimeFrameIndicators(
@@ -767,15 +745,17 @@ class FinancialDataTool:
                 )
             )
         
-        # CRITICAL FIX: Sort data chronologically (oldest first) for technical analysis
-        # Alpha Vantage returns newest first, but technical indicators need oldest first
-        sorted_data = sorted(price_data, key=lambda x: x.date)
-        
+        # PriceSeries columns are already chronological (oldest first), as technical indicators need
+        series = price_data if isinstance(price_data, PriceSeries) else PriceSeries.from_models(price_data)
+
+        if symbol and timeframe and volumes is None:
+            return self.process_timeframe_data_incremental(symbol, timeframe, series)
+
         # Extract price arrays in chronological order
-        closes = [float(item.close) for item in sorted_data]
-        highs = [float(item.high) for item in sorted_data]
-        lows = [float(item.low) for item in sorted_data]
-        volumes_list = [int(item.volume) for item in sorted_data] if volumes is None else volumes
+        closes = series.close.tolist()
+        highs = series.high.tolist()
+        lows = series.low.tolist()
+        volumes_list = series.volume.tolist() if volumes is None else volumes
         
         # Calculate all indicators
         bollinger = self.calculate_bollinger_bands(closes)
@@ -789,9 +769,9 @@ class FinancialDataTool:
         momentum = self.calculate_momentum(closes)
         
         # Calculate trend indicators (using current vs previous data point)
-        # Use the original unsorted data where [0] = most recent, [1] = previous
-        current_volume = int(price_data[0].volume) if len(price_data) > 0 else 0
-        previous_volume = int(price_data[1].volume) if len(price_data) > 1 else 0
+        # Last column entry = most recent, the one before = previous
+        current_volume = int(series.volume[-1]) if len(series) > 0 else 0
+        previous_volume = int(series.volume[-2]) if len(series) > 1 else 0
         
         current_data = {'volume': current_volume}
         previous_data = {'volume': previous_volume}
@@ -809,9 +789,64 @@ class FinancialDataTool:
             momentum=momentum,
             trend_indicators=TechnicalIndicatorsModel.TrendIndicators(**trend_indicators)
         )
-    
+
+    def process_timeframe_data_incremental(self, symbol: str, timeframe: str,
+                                           series: PriceSeries) -> TimeFrameIndicators:
+        """
+        Calculate indicators by folding only the bars that arrived since the last run into the persisted state
+        Args:
+            symbol: Stock ticker symbol (e.g., AAPL, MSFT, GOOGL)
+            timeframe: Timeframe key ('hourly', 'daily', 'weekly', 'monthly')
+            series: Price series (chronological columns)
+        Returns:
+            TimeFrameIndicators for the most recent bar
+
+        The state carries the history across runs: OBV, the EMAs/MACD and SAR keep the bars that have
+        since left the fetched window, and sma_50/sma_200 use buffered closes beyond it. The result
+        equals the pandas path over all bars seen since the state was created, not over the window.
+
+        The newest bar is never persisted because it may still be in progress (current hour/day/week/month);
+        it is applied to a throwaway copy of the state. A full recompute (back to the fetched window) is
+        done when there is no state, when the last persisted bar was revised (stock split, data correction)
+        or has left the window, or when the state version changed.
+        """
+        state = self.load_indicator_state(symbol, timeframe)
+        start = technical_indicators.resume_index(state, series)
+        count = len(series)
+
+        if start is None:
+            print(f"[{symbol}][{timeframe}]: Full indicator recompute over {count} bars")
+            state = technical_indicators.new_state(symbol, timeframe)
+            start = 0
+
+        if start < count - 1:
+            technical_indicators.advance_state(state, series.slice(start, count - 1))
+            self.save_indicator_state(state)
+
+        latest_state = technical_indicators.advance_state(state.model_copy(deep=True), series.slice(count - 1, count))
+        return technical_indicators.indicators_from_state(latest_state)
+
+    def load_indicator_state(self, symbol: str, timeframe: str) -> Optional[IndicatorStateModel]:
+        """Load persisted indicator state from Firestore (None if missing or unreadable)"""
+        try:
+            doc = self.db.collection(INDICATOR_STATE_COLLECTION).document(f"{symbol}_{timeframe}").get()
+            if doc.exists:
+                return IndicatorStateModel(**doc.to_dict())
+        except Exception as e:
+            print(f"Error loading indicator state for {symbol} ({timeframe}): {e}")
+        return None
+
+    def save_indicator_state(self, state: IndicatorStateModel) -> None:
+        """Persist indicator state to Firestore"""
+        try:
+            self.db.collection(INDICATOR_STATE_COLLECTION).document(f"{state.symbol}_{state.timeframe}").set(state.model_dump())
+        except Exception as e:
+            print(f"Error saving indicator state for {state.symbol} ({state.timeframe}): {e}")
+
     def calculate_bollinger_bands(self, prices: List[float], period: int = 20, std_dev: int = 2) -> Dict[str, float]:
         """Calculate Bollinger Bands"""
+        import pandas as pd
+
         if len(prices) < period:
             return {"upper": 0.0, "middle": 0.0, "lower": 0.0}
         
@@ -830,6 +865,8 @@ class FinancialDataTool:
     
     def calculate_moving_averages(self, prices: List[float]) -> Dict[str, float]:
         """Calculate various moving averages"""
+        import pandas as pd
+
         prices_series = pd.Series(prices)
         
         sma_20 = prices_series.rolling(window=20).mean().iloc[-1] if len(prices) >= 20 else 0.0
@@ -850,6 +887,8 @@ class FinancialDataTool:
     
     def calculate_macd(self, prices: List[float]) -> Dict[str, float]:
         """Calculate MACD indicator"""
+        import pandas as pd
+
         if len(prices) < 26:
             return {"macd_line": 0.0, "signal_line": 0.0, "histogram": 0.0}
         
@@ -869,6 +908,8 @@ class FinancialDataTool:
     
     def calculate_rsi(self, prices: List[float], period: int = 14) -> float:
         """Calculate Relative Strength Index"""
+        import pandas as pd
+
         if len(prices) < period + 1:
             return 50.0
         
@@ -905,23 +946,22 @@ class FinancialDataTool:
         
         return float(obv)
     
-    def calculate_sar(self, highs: List[float], lows: List[float], acceleration: float = 0.02, maximum: float = 0.2) -> float:
-        """Calculate Parabolic SAR"""
+    def calculate_sar(self, highs: List[float], lows: List[float], acceleration: float = 0.02, maximum: float = 0.2,
+                      full_series: bool = False) -> Union[float, List[float]]:
+        """Calculate Parabolic SAR (Wilder), last value or the full series (first bar is NaN)"""
         if len(highs) < 2 or len(lows) < 2:
-            return 0.0
-        
-        # Simplified SAR calculation (last value)
-        high_series = pd.Series(highs)
-        low_series = pd.Series(lows)
-        
-        # Basic implementation - return middle of recent range
-        recent_high = high_series.tail(10).max()
-        recent_low = low_series.tail(10).min()
-        
-        return float((recent_high + recent_low) / 2)
+            return [] if full_series else 0.0
+
+        sar_values, _ = technical_indicators.parabolic_sar(highs, lows, acceleration, maximum)
+
+        if full_series:
+            return sar_values.tolist()
+        return float(sar_values[-1])
     
     def calculate_cci(self, highs: List[float], lows: List[float], closes: List[float], period: int = 20) -> float:
         """Calculate Commodity Channel Index"""
+        import pandas as pd
+
         if len(highs) < period or len(lows) < period or len(closes) < period:
             return 0.0
         
@@ -939,6 +979,8 @@ class FinancialDataTool:
     
     def calculate_standard_deviation(self, prices: List[float], period: int = 20) -> float:
         """Calculate Standard Deviation"""
+        import pandas as pd
+
         if len(prices) < period:
             return 0.0
         
@@ -984,16 +1026,16 @@ class FinancialDataTool:
             "market_cap_trend_percent": float(market_cap_trend)
         }
 
-    def apply_split_adjustments(self, price_data: List[StockRealtimeDataModel], splits_data: List) -> List[StockRealtimeDataModel]:
+    def apply_split_adjustments(self, price_data: PriceSeries, splits_data: List) -> PriceSeries:
         """
         Apply stock split adjustments to historical price data
         
         Args:
-            price_data: List of price data points (newest first from API)
+            price_data: Price series (chronological columns)
             splits_data: List of stock split data with effective_date and split_factor
             
         Returns:
-            List of price data with split-adjusted prices
+            Price series with split-adjusted prices
             
         Example:
             - Split 2:1 means split_factor = 2, so divide historical prices by 2
@@ -1004,38 +1046,32 @@ class FinancialDataTool:
             return price_data
         
         try:
-            # Sort splits by effective date (newest first to oldest)
-            sorted_splits = sorted(splits_data, key=lambda x: x.effective_date, reverse=True)
+            # Sort splits once (oldest first) and build reverse cumulative factors:
+            # cumulative_factors[i] = product of the factors of split i and every later split
+            sorted_splits = sorted(splits_data, key=lambda x: x.effective_date)
+            split_dates = np.array([split.effective_date for split in sorted_splits], dtype='datetime64[s]')
+            split_factors = np.array([split.split_factor for split in sorted_splits], dtype=np.float64)
+            cumulative_factors = np.append(np.cumprod(split_factors[::-1])[::-1], 1.0)
 
-            # Create adjusted price data list
-            adjusted_prices = []
-            
-            for price_point in price_data:
-                # Calculate cumulative adjustment factor for this price point
-                cumulative_adjustment = 1.0
-                
-                for split in sorted_splits:
-                    # If the price date is before the split effective date, apply the adjustment
-                    if price_point.date < split.effective_date:
-                        cumulative_adjustment *= split.split_factor
-                
-                # Apply cumulative adjustment to all price fields
-                if cumulative_adjustment > 1.0:
-                    adjusted_price = StockRealtimeDataModel(
-                        date=price_point.date,
-                        open=round(price_point.open / cumulative_adjustment, 4),
-                        high=round(price_point.high / cumulative_adjustment, 4),
-                        low=round(price_point.low / cumulative_adjustment, 4),
-                        close=round(price_point.close / cumulative_adjustment, 4),
-                        volume=int(price_point.volume * cumulative_adjustment)  # Volume increases proportionally
-                    )
-                else:
-                    # No adjustment needed (price is after all splits)
-                    adjusted_price = price_point
-                
-                adjusted_prices.append(adjusted_price)
-            
-            return adjusted_prices
+            # Map every bar to the first split effective after its date (price date < split date)
+            factors = cumulative_factors[np.searchsorted(split_dates, price_data.dates, side='right')]
+
+            # No adjustment needed for prices after all splits
+            adjusted = factors > 1.0
+            if not adjusted.any():
+                return price_data
+
+            def adjust_price(values: np.ndarray) -> np.ndarray:
+                return np.where(adjusted, np.round(values / factors, 4), values)
+
+            return price_data.replace_values(
+                open=adjust_price(price_data.open),
+                high=adjust_price(price_data.high),
+                low=adjust_price(price_data.low),
+                close=adjust_price(price_data.close),
+                # Volume increases proportionally
+                volume=np.where(adjusted, (price_data.volume * factors).astype(np.int64), price_data.volume),
+            )
             
         except Exception as e:
             print(f"❌ Error applying split adjustments: {e}")
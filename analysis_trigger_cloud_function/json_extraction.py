@@ -0,0 +1,181 @@
+"""
+Embedded JSON Extraction
+Finds the largest JSON value embedded in free-form LLM output with a single string-aware bracket scan
+
+Unlike the previous scan, which returned the first array (in text order) that parsed and only then tried
+objects, the largest valid array or object wins regardless of its type or position.
+"""
+
+import bisect
+import json
+from typing import Any, Callable, List, Optional, Tuple
+
+_CLOSER_FOR = {'[': ']', '{': '}'}
+_CLOSERS = {']', '}'}
+
+# Characters find_largest_json parses or repairs before giving up, as a multiple of the text length
+# (with a floor so short texts are always searched exhaustively)
+WORK_BUDGET = 8
+MIN_WORK_BUDGET = 1 << 20
+
+
+def balanced_spans(text: str) -> List[Tuple[int, int]]:
+    """
+    Find every balanced [...] / {...} span in one pass
+    Args:
+        text: Free-form text (e.g. agent output with prose around the JSON)
+    Returns:
+        List of (start, end) spans, end exclusive, in closing order
+
+    Brackets inside JSON strings are ignored. A closer that does not match the innermost opener drops
+    the unmatched openers (stray prose brackets such as "[0, 1)"), so inner values are still found.
+    """
+    spans = []
+    stack: List[Tuple[int, str]] = []
+    in_string = False
+    escaped = False
+
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == '\\':
+                escaped = True
+            elif char == '"':
+                in_string = False
+            elif char == '\n':
+                # JSON strings cannot span lines: a stray quote in prose must not swallow the rest
+                in_string = False
+            continue
+
+        if char in _CLOSER_FOR:
+            stack.append((i, _CLOSER_FOR[char]))
+        elif char in _CLOSERS:
+            # Pop openers until the matching one (unmatched openers are prose); ignore stray closers
+            for depth in range(len(stack) - 1, -1, -1):
+                if stack[depth][1] == char:
+                    spans.append((stack[depth][0], i + 1))
+                    del stack[depth:]
+                    break
+        elif char == '"' and stack:
+            in_string = True
+
+    return spans
+
+
+def find_largest_json(text: str, repair: Optional[Callable[[str], str]] = None) -> Tuple[bool, Any]:
+    """
+    Find the largest valid JSON array/object in text
+    Args:
+        text: Free-form text
+        repair: Optional function applied to a span that does not parse as-is (e.g. trailing comma fixes)
+    Returns:
+        Tuple of (found, value)
+
+    Spans are tried longest first, so the first one that parses is the largest valid value. Parsing stops
+    at the first syntax error, and a nested span containing that error position is not parsed again: it
+    fails at the same character, because everything before it parsed as part of the enclosing value.
+    Every attempt still copies its span (and repairs rewrite it), so nested invalid spans cost up to
+    length x depth; the search gives up once WORK_BUDGET x len(text) characters have been attempted.
+    """
+    error_positions: List[int] = []  # sorted positions where an enclosing span stopped parsing
+    budget = max(WORK_BUDGET * len(text), MIN_WORK_BUDGET)
+
+    for start, end in sorted(balanced_spans(text), key=lambda span: span[0] - span[1]):
+        known = bisect.bisect_right(error_positions, start)
+        parse = known == len(error_positions) or error_positions[known] >= end
+        if not parse and repair is None:
+            continue
+
+        budget -= (end - start) * (parse + (repair is not None))
+        if budget < 0:
+            break
+
+        candidate = text[start:end]
+        if parse:
+            try:
+                return True, json.loads(candidate)
+            except json.JSONDecodeError as e:
+                bisect.insort(error_positions, start + e.pos)
+        if repair is not None:
+            repaired = repair(candidate)
+            if repaired != candidate:
+                try:
+                    return True, json.loads(repaired)
+                except json.JSONDecodeError:
+                    pass
+    return False, None
+
+
+if __name__ == '__main__':
+    import random
+    import re
+    import time
+
+    def every_span(text: str, repair: Optional[Callable[[str], str]] = None) -> Tuple[bool, Any]:
+        """Previous find_largest_json: parse and repair every span, longest first, no early exit (reference only)"""
+        for start, end in sorted(balanced_spans(text), key=lambda span: span[0] - span[1]):
+            candidate = text[start:end]
+            for attempt in (candidate, repair(candidate)) if repair else (candidate,):
+                try:
+                    return True, json.loads(attempt)
+                except json.JSONDecodeError:
+                    pass
+        return False, None
+
+    def trailing_commas(span: str) -> str:
+        return re.sub(r',(\s*[}\]])', r'\1', re.sub(r'(\{|,)\s*([a-zA-Z_]\w*)\s*:', r'\1"\2":', span))
+
+    random.seed(7)
+    item = {
+        'language': 'en', 'overall_analysis': ['Revenue grew [12%] {YoY}; "guidance" raised.'],
+        'technical_analysis': ['RSI at 61 ] brackets } inside strings'], 'promote_flag': True
+    }
+    expected = [item, dict(item, language='sk')]
+    prose = [
+        'Here is the analysis you asked for:', 'Note: values in range [0, 1) are normalised.',
+        'The agent said "ok', '{not json}', '[1] Source: filing', 'Closing } stray', 'Thanks!'
+    ]
+
+    # Fuzz: valid payload surrounded by malformed prose, trailing commas and stray brackets
+    failures = 0
+    for trial in range(2000):
+        body = json.dumps(expected, indent=random.choice([None, 2]))
+        if random.random() < 0.3:
+            body = body.replace('true', 'true,', 1)  # trailing comma before '}' - needs repair
+        before = '\n'.join(random.choices(prose, k=random.randint(0, 5)))
+        after = '\n'.join(random.choices(prose, k=random.randint(0, 5)))
+        text = f"{before}\n{body}\n{after}"
+        found, value = find_largest_json(text, repair=trailing_commas)
+        if not found or value != expected:
+            failures += 1
+    print(f"Fuzz: {failures} failures out of 2000")
+
+    # Skipped spans must never hide a valid value: compare with the exhaustive search on bracket soup
+    tokens = ['[', ']', '{', '}', '"a"', ':', ',', '1', 'x', ' ', '\n', '"', '\\', 'true', '"b":', '[]', '{}']
+    mismatches = 0
+    for trial in range(20000):
+        text = ''.join(random.choices(tokens, k=random.randint(1, 40)))
+        repair = trailing_commas if trial % 2 else None
+        if find_largest_json(text, repair) != every_span(text, repair):
+            mismatches += 1
+    print(f"Differential: {mismatches} mismatches with the exhaustive search out of 20000")
+
+    # Benchmark: no closable span, many closable-but-invalid siblings, and deeply nested invalid spans
+    inputs = {
+        'no closable span': lambda size: ('[{"a": "b" ' * (size // 11))[:size],
+        'invalid siblings': lambda size: '{"a": b} ' * (size // 9),
+        'nested invalid (depth 200)': lambda size: ('{"k": [' * 200 + 'oops' + ']}' * 200) * (size // 1804),
+    }
+    for name, make in inputs.items():
+        for size in (10_000, 100_000, 1_000_000):
+            text = make(size)
+            timings = []
+            for function in (find_largest_json, every_span):
+                if function is every_span and size > 100_000 and name.startswith('nested'):
+                    timings.append(float('nan'))  # minutes with the reference
+                    continue
+                started = time.perf_counter()
+                function(text, repair=trailing_commas)
+                timings.append((time.perf_counter() - started) * 1000)
+            print(f"{name:<27} {size:>9} chars: {timings[0]:9.2f} ms (every span: {timings[1]:9.2f} ms)")
@@ -4,19 +4,28 @@ Google Cloud Function to trigger financial analysis and save results to Firestor
 
 import os
 import json
+import functools
 import time
 import logging
 import traceback
 import random
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 import asyncio
 import aiohttp
+from aiolimiter import AsyncLimiter
+from flask import Response
 from google.cloud import firestore
-from google.cloud import pubsub_v1
-from get_stock_data_tool import get_stock_data_tool
+from get_stock_data_tool import get_stock_data_tool, THREADS_PER_SYMBOL
+import http_client
 import functions_framework
 from data_tool_model import ComprehensiveStockDataModel
+from token_provider import token_provider
+from sse_stream import is_final_response_event, iter_sse_events
+from json_extraction import find_largest_json
 from pydantic import BaseModel, ValidationError, field_validator
 
 # Configure logging
@@ -29,16 +38,40 @@ PROJECT_ID = os.environ.get('GCP_PROJECT')
 AGENT_APP_NAME = os.environ.get('AGENT_APP_NAME', 'analysis_reporter')
 PUBSUB_TOPIC = os.environ.get('PUBSUB_TOPIC', 'make-ig-reel')
 
+# Cloud Run access pre-flight: 'always' (every analysis), 'cached' (once per TTL per process)
+# or 'lazy' (never; auth failures from the real calls are detected instead)
+ACCESS_VALIDATION_MODE = os.environ.get('ACCESS_VALIDATION_MODE', 'cached').lower()
+ACCESS_VALIDATION_TTL = int(os.environ.get('ACCESS_VALIDATION_TTL', '900'))  # seconds
+AUTH_FAILURE_STATUS_CODES = (401, 403)
+
+# Batch runs: tickers analyzed at the same time and the Alpha Vantage budget they share (0 = unlimited)
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '4'))
+ALPHAVANTAGE_REQUESTS_PER_MINUTE = int(os.environ.get('ALPHAVANTAGE_REQUESTS_PER_MINUTE', '0'))
+
+# Bars sent to the reel renderer: ~2 px per point on its 820 px wide chart (LTTB keeps the visual shape)
+REEL_CHART_POINTS = int(os.environ.get('REEL_CHART_POINTS', '410'))
+
 # Firestore collections
 ANALYSIS_COLLECTION = 'financial_analysis'
 PERFORMANCE_COLLECTION = 'performance_metrics'
 METADATA_COLLECTION = 'analysis_metadata'
 COSTS_COLLECTION = 'cost_tracking'
 
-# Initialize Firestore client
-db = firestore.Client(project=PROJECT_ID)
-# Initialize Pub/Sub publisher client
-publisher = pubsub_v1.PublisherClient()
+
+
+# Clients are created on first use, so importing this module (cold start) does not pay for them
+@functools.lru_cache(maxsize=None)
+def get_db() -> firestore.Client:
+    """Shared Firestore client"""
+    return firestore.Client(project=PROJECT_ID)
+
+
+@functools.lru_cache(maxsize=None)
+def get_publisher():
+    """Shared Pub/Sub publisher client (only needed when a promotion is published)"""
+    from google.cloud import pubsub_v1
+
+    return pubsub_v1.PublisherClient()
 
 
 class FinancialAnalysisItem(BaseModel):
@@ -93,8 +126,12 @@ class FinancialAnalysisResponse(BaseModel):
         return v
 
 
+# Process-level time (time.monotonic()) of the last successful Cloud Run access validation
+_access_validated_at: Optional[float] = None
+
 # Retry configuration
 MAX_RETRIES = 1
+MAX_LANGUAGE_RETRIES = 1  # Follow-up prompts that regenerate only the languages that failed validation
 RETRY_DELAY_BASE = 2  # Base delay in seconds
 VALIDATION_ERROR_RETRY_DELAY = 5  # Additional delay for validation errors
 
@@ -106,18 +143,29 @@ class ValidationRetryError(Exception):
 class FinancialAnalysisTrigger:
     """Main class for handling financial analysis triggers"""
     
-    def __init__(self):
-        self.db = db
+    def __init__(self, concurrency: int = 1):
+        self.db = get_db()
+        self.concurrency = max(1, concurrency)
         self.session = None
+        self.warmup = None
         self.day_input = datetime.now().strftime("%Y-%m-%d")
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # asyncio.to_thread runs on the loop's default executor (min(32, CPUs + 4) threads): size it for
+        # every ticker's concurrent blocking calls, plus the warm-up, macro data and Firestore saves
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(
+            max_workers=self.concurrency * THREADS_PER_SYMBOL + 4, thread_name_prefix='analysis'))
+        self.session = http_client.create_async_session()
+        # Alpha Vantage TLS handshakes happen in the background while the pre-flight checks run
+        self.warmup = asyncio.create_task(asyncio.to_thread(get_stock_data_tool.warm_connections))
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
+        if self.warmup:
+            await self.warmup
+        http_client.log_latency_metrics(logger.info, reset=True)
 
     def generate_analysis_payload(self, raw_analysis_data: ComprehensiveStockDataModel) -> Dict[str, Any]:
         """Generate the payload for financial analysis"""
@@ -148,7 +196,7 @@ class FinancialAnalysisTrigger:
             raise ValueError("CLOUD_RUN_URL environment variable not set")
         
         # Get authentication token
-        auth_token = self._get_access_token()
+        auth_token = await self._get_access_token()
         if not auth_token:
             logger.error("Failed to obtain authentication token")
             return {
@@ -195,10 +243,13 @@ class FinancialAnalysisTrigger:
         except Exception as e:
             logger.error(traceback.format_exc())
             logger.error(f"Error creating session {session_id}: {str(e)}")
+            status_code = getattr(e, 'status', 500)
+            if status_code in AUTH_FAILURE_STATUS_CODES:
+                self.record_auth_failure(status_code)
             return {
                 'success': False,
                 'error': str(e),
-                'status_code': getattr(e, 'status', 500)
+                'status_code': status_code
             }
 
     async def call_cloud_run_service(self, payload: Dict[str, Any], max_retries: int = 5, base_delay: float = 2.0, session_exists: bool = False) -> Dict[str, Any]:
@@ -225,7 +276,7 @@ class FinancialAnalysisTrigger:
                 }
 
         # Get authentication token for the main request
-        auth_token = self._get_access_token()
+        auth_token = await self._get_access_token()
         if not auth_token:
             logger.error("Failed to obtain authentication token for main request")
             return {
@@ -253,27 +304,7 @@ class FinancialAnalysisTrigger:
 
                     # Handle SSE stream response
                     if response.content_type == 'text/event-stream':
-                        events = []
-                        full_response = ""
-                        async for line in response.content:
-                            line = line.decode('utf-8').strip()
-                            if line.startswith('data: '):
-                                data_content = line[6:]
-                                try:
-                                    event_data = json.loads(data_content)
-                                    events.append(event_data)
-                                except json.JSONDecodeError:
-                                    full_response += data_content + "\n"
-                        if events:
-                            print("Received events:")
-                            for event in events:
-                                print(f" - {event}")
-                            last_event = events[-1]
-                            result = self._extract_analysis_from_adk_response(last_event)
-                        else:
-                            print("Received response:")
-                            print(full_response)
-                            result = self._extract_json_from_markdown(full_response)
+                        result, stream_metrics = await self._consume_sse_stream(response, start_time)
                     else:
                         response_text = await response.text()
                         try:
@@ -281,6 +312,7 @@ class FinancialAnalysisTrigger:
                             result = self._extract_analysis_from_adk_response(parsed_response)
                         except json.JSONDecodeError:
                             result = self._extract_json_from_markdown(response_text)
+                        stream_metrics = {'events_count': 1}
 
                     end_time = time.time()
                     response_time = end_time - start_time
@@ -291,8 +323,8 @@ class FinancialAnalysisTrigger:
                         'response_time': response_time,
                         'status_code': response.status,
                         'session_created': True,
-                        'events_count': len(events) if response.content_type == 'text/event-stream' and 'events' in locals() else 1,
-                        'content_type': response.content_type
+                        'content_type': response.content_type,
+                        **stream_metrics
                     }
 
             except asyncio.TimeoutError:
@@ -322,6 +354,8 @@ class FinancialAnalysisTrigger:
                         except Exception as record_error:
                             logger.error(f"Failed to record rate limit event: {record_error}")
                 else:
+                    if e.status in AUTH_FAILURE_STATUS_CODES:
+                        self.record_auth_failure(e.status)
                     return {
                         'success': False,
                         'error': f"HTTP {e.status}: {e.message}",
@@ -366,7 +400,184 @@ class FinancialAnalysisTrigger:
             'status_code': last_status
         }
     
-    async def call_cloud_run_with_validation_retry(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def _consume_sse_stream(self, response: aiohttp.ClientResponse, start_time: float) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Consume the /run_sse event stream incrementally
+        Args:
+            response: Open aiohttp response with content type text/event-stream
+            start_time: time.time() when the Cloud Run call started (reference for the latency metrics)
+        Returns:
+            Tuple of (extracted analysis result, stream metrics)
+
+        Only the latest final-response event is kept in memory. As soon as one passes validation the
+        stream is cancelled instead of waiting for the server to close it.
+        """
+        events_count = 0
+        last_event = None
+        result = None
+        non_json_data = []
+        time_to_first_event = None
+        time_to_final_event = None
+        cancelled_early = False
+
+        events = iter_sse_events(response.content)
+        try:
+            async for sse_event in events:
+                if time_to_first_event is None:
+                    time_to_first_event = time.time() - start_time
+                try:
+                    event_data = json.loads(sse_event.data)
+                except json.JSONDecodeError:
+                    non_json_data.append(sse_event.data)
+                    continue
+
+                events_count += 1
+                last_event = event_data
+                if not is_final_response_event(event_data):
+                    continue
+
+                time_to_final_event = time.time() - start_time
+                result = self._extract_analysis_from_adk_response(event_data)
+                analysis = result.get('analysis')
+                if isinstance(analysis, dict) and 'error' in analysis:
+                    continue
+                try:
+                    self._validate_analysis_with_pydantic(analysis)
+                except ValidationRetryError as e:
+                    logger.info(f"Final event did not validate, waiting for a later one: {e}")
+                    continue
+
+                cancelled_early = True
+                break
+        finally:
+            await events.aclose()
+
+        if cancelled_early:
+            # Stop the server-side stream; everything needed has been received
+            response.close()
+        elif result is None:
+            if last_event is not None:
+                result = self._extract_analysis_from_adk_response(last_event)
+            else:
+                full_response = "\n".join(non_json_data)
+                print("Received response:")
+                print(full_response)
+                result = self._extract_json_from_markdown(full_response)
+
+        logger.info(f"SSE stream: {events_count} events, first after {time_to_first_event}s, "
+                    f"final after {time_to_final_event}s, cancelled early: {cancelled_early}")
+        return result, {
+            'events_count': events_count,
+            'time_to_first_event': time_to_first_event,
+            'time_to_final_event': time_to_final_event,
+            'stream_cancelled_early': cancelled_early
+        }
+
+    def _split_analysis_by_language(self, data: Any, languages: List[str]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str]]:
+        """
+        Validate analysis items one by one instead of the response as a whole
+        Args:
+            data: Analysis data as returned by the agent (list, {'analysis': [...]} or a single item)
+            languages: Languages the analysis was requested in
+        Returns:
+            Tuple of (language -> validated item, language or item position -> error message).
+            Requested languages without any item are reported as missing.
+        """
+        if isinstance(data, dict):
+            items = data['analysis'] if isinstance(data.get('analysis'), list) else [data]
+        elif isinstance(data, list):
+            items = data
+        else:
+            items = []
+
+        valid = {}
+        errors = {}
+        for position, item in enumerate(items):
+            key = item.get('language') if isinstance(item, dict) and isinstance(item.get('language'), str) else None
+            key = key.strip() if key and key.strip() else f"item_{position}"
+            try:
+                validated_item = FinancialAnalysisItem(**item) if isinstance(item, dict) else None
+            except ValidationError as e:
+                errors[key] = '; '.join(
+                    f"{' -> '.join(str(x) for x in error['loc'])}: {error['msg']}" for error in e.errors()
+                )
+                continue
+            if validated_item is None:
+                errors[key] = f"Analysis item must be an object, got {type(item).__name__}"
+            elif key not in valid:
+                valid[key] = validated_item.model_dump()
+                errors.pop(key, None)
+
+        for language in languages:
+            if language not in valid and language not in errors:
+                errors[language] = 'Missing from the response'
+        return valid, errors
+
+    async def _retry_failed_languages(self, payload: Dict[str, Any], result: Dict[str, Any], languages: List[str]) -> Dict[str, Any]:
+        """
+        Re-prompt the agent for the languages that failed validation and merge them with the valid ones
+        Args:
+            payload: Original /run_sse payload (its session already holds the data and the first answer)
+            result: Successful result of the first call
+            languages: Languages the analysis was requested in
+        Returns:
+            The result, with 'data.analysis' replaced by the merged items when anything was retried
+
+        Raises ValidationRetryError when a requested language is still invalid after MAX_LANGUAGE_RETRIES, so a
+        partial analysis is never saved; the caller's full validation retry takes over.
+        """
+        from daily_analysis_prompts_structured import generate_language_retry_prompt
+
+        data = result['data'].get('analysis') if isinstance(result.get('data'), dict) else None
+        if isinstance(data, dict) and 'error' in data:
+            return result
+
+        valid, errors = self._split_analysis_by_language(data, languages)
+        failed = [language for language in languages if language not in valid]
+        if not failed or not valid:
+            # Nothing to repair, or nothing worth keeping (the regular full retry handles that)
+            return result
+
+        retries = 0
+        while failed and retries < MAX_LANGUAGE_RETRIES:
+            retries += 1
+            logger.warning(f"Re-prompting for languages {failed} (attempt {retries} of {MAX_LANGUAGE_RETRIES}), "
+                           f"keeping {sorted(valid)}")
+            retry_payload = {
+                **payload,
+                'new_message': {'role': 'user', 'parts': [{'text': generate_language_retry_prompt(failed, errors)}]}
+            }
+            retry_result = await self.call_cloud_run_service(retry_payload, session_exists=True)
+            result['response_time'] = result.get('response_time', 0) + retry_result.get('response_time', 0)
+            if not retry_result['success']:
+                logger.error(f"Language retry failed: {retry_result.get('error')}")
+                break
+
+            retry_data = retry_result['data'].get('analysis') if isinstance(retry_result.get('data'), dict) else None
+            retry_valid, retry_errors = self._split_analysis_by_language(retry_data, failed)
+            for language in failed:
+                if language in retry_valid:
+                    valid[language] = retry_valid[language]
+                    errors.pop(language, None)
+                else:
+                    errors[language] = retry_errors.get(language, errors.get(language, 'Missing from the response'))
+            failed = [language for language in languages if language not in valid]
+
+        if failed:
+            logger.error(f"Languages still invalid after {retries} retries: {failed}")
+            raise ValidationRetryError(
+                f"Languages still invalid after {retries} retries: "
+                + '; '.join(f"{language}: {errors.get(language, 'Missing from the response')}" for language in failed)
+            )
+
+        # Requested languages first, in request order, then any extra languages the agent returned
+        merged = [valid[language] for language in languages if language in valid]
+        merged += [item for language, item in valid.items() if language not in languages]
+        result['data']['analysis'] = merged
+        result['language_retries'] = retries
+        return result
+
+    async def call_cloud_run_with_validation_retry(self, payload: Dict[str, Any], languages: Optional[List[str]] = None) -> Dict[str, Any]:
         """Call Cloud Run service with additional retry logic for validation errors"""
         validation_attempt = 0
         
@@ -376,13 +587,18 @@ class FinancialAnalysisTrigger:
                 # Call the main Cloud Run service
                 result = await self.call_cloud_run_service(payload, session_exists=session_exists)
                 session_exists = True
-                print(f"Cloud Run call result ['data']['analysis']:")
-                print(json.dumps(result['data']['analysis']))
 
                 if not result['success']:
                     # If the Cloud Run call itself failed, return the error
                     return result
-                
+
+                # Regenerate only the languages that are missing or invalid, keeping the valid ones
+                if languages:
+                    result = await self._retry_failed_languages(payload, result, languages)
+
+                print(f"Cloud Run call result ['data']['analysis']:")
+                print(json.dumps(result['data']['analysis']))
+
                 # Try to validate the response data
                 validated_data = self._validate_analysis_with_pydantic(result['data']['analysis'])
                 
@@ -428,36 +644,9 @@ class FinancialAnalysisTrigger:
             'validation_attempts': validation_attempt
         }
 
-    def _get_access_token(self) -> str:
-        """Get access token for Cloud Run authentication with correct audience"""
-        try:
-            from google.auth import default
-            from google.auth.transport.requests import Request
-            import google.oauth2.id_token
-            
-            # For Cloud Run services, we need an identity token, not an access token
-            # The audience should be the URL of the Cloud Run service
-            if CLOUD_RUN_URL:
-                try:
-                    # Get identity token with the Cloud Run service URL as audience
-                    request = Request()
-                    token = google.oauth2.id_token.fetch_id_token(request, CLOUD_RUN_URL)
-                    logger.info("Successfully obtained identity token for Cloud Run authentication")
-                    return token
-                except Exception as id_token_error:
-                    logger.warning(f"Failed to get identity token: {id_token_error}")
-                    # Fallback to access token method
-                    
-            # Fallback to access token method (may not work for Cloud Run)
-            credentials, _ = default()
-            credentials.refresh(Request())
-            logger.warning("Using access token instead of identity token - this may cause 401 errors")
-            return credentials.token
-            
-        except Exception as e:
-            logger.error(f"Error getting authentication token: {str(e)}")
-            logger.error(traceback.format_exc())
-            return ""
+    async def _get_access_token(self) -> str:
+        """Get identity token for Cloud Run authentication with correct audience (cached per process)"""
+        return await token_provider.get_token_async(CLOUD_RUN_URL)
     
     def _extract_analysis_from_adk_response(self, adk_response: Dict[str, Any]) -> Dict[str, Any]:
         """Extract the actual financial analysis from ADK response structure"""
@@ -537,58 +726,10 @@ class FinancialAnalysisTrigger:
                 logger.error(f"Failed to parse extracted JSON from markdown: {e}")
                 logger.error(f"JSON string around error: {json_str[max(0, e.pos-100):e.pos+100]}")
         
-        # If no markdown blocks found, try to find the largest complete JSON structure
-        # Look for array patterns first
-        array_matches = list(re.finditer(r'\[', text))
-        for start_match in array_matches:
-            start_pos = start_match.start()
-            # Find the matching closing bracket
-            bracket_count = 0
-            end_pos = start_pos
-            
-            for i, char in enumerate(text[start_pos:], start_pos):
-                if char == '[':
-                    bracket_count += 1
-                elif char == ']':
-                    bracket_count -= 1
-                    if bracket_count == 0:
-                        end_pos = i + 1
-                        break
-            
-            if bracket_count == 0:  # Found complete array
-                json_str = text[start_pos:end_pos]
-                json_str = self._fix_common_json_errors(json_str)
-                try:
-                    parsed_data = json.loads(json_str)
-                    return parsed_data
-                except json.JSONDecodeError:
-                    continue  # Try next array match
-        
-        # If arrays didn't work, try objects
-        object_matches = list(re.finditer(r'\{', text))
-        for start_match in object_matches:
-            start_pos = start_match.start()
-            # Find the matching closing brace
-            brace_count = 0
-            end_pos = start_pos
-            
-            for i, char in enumerate(text[start_pos:], start_pos):
-                if char == '{':
-                    brace_count += 1
-                elif char == '}':
-                    brace_count -= 1
-                    if brace_count == 0:
-                        end_pos = i + 1
-                        break
-            
-            if brace_count == 0:  # Found complete object
-                json_str = text[start_pos:end_pos]
-                json_str = self._fix_common_json_errors(json_str)
-                try:
-                    parsed_data = json.loads(json_str)
-                    return parsed_data
-                except json.JSONDecodeError:
-                    continue  # Try next object match
+        # If no markdown blocks found, find the largest complete JSON structure in a single string-aware pass
+        found, parsed_data = find_largest_json(text, repair=self._fix_common_json_errors)
+        if found:
+            return parsed_data
         
         # If all else fails, try to extract and parse just the first complete JSON structure
         # by looking for common analysis fields
@@ -766,7 +907,7 @@ class FinancialAnalysisTrigger:
             if not CLOUD_RUN_URL:
                 return {'valid': False, 'error': 'CLOUD_RUN_URL not set'}
             
-            auth_token = self._get_access_token()
+            auth_token = await self._get_access_token()
             if not auth_token:
                 return {'valid': False, 'error': 'No authentication token available'}
             
@@ -776,7 +917,8 @@ class FinancialAnalysisTrigger:
             
             # Try a simple GET request to the service root with longer timeout
             timeout = aiohttp.ClientTimeout(total=30)  # 30 seconds timeout
-            async with self.session.get(
+            async with await http_client.request_async(
+                self.session, 'GET',
                 CLOUD_RUN_URL,
                 headers=headers,
                 timeout=timeout
@@ -784,8 +926,10 @@ class FinancialAnalysisTrigger:
                 if response.status == 200:
                     return {'valid': True, 'status_code': response.status}
                 elif response.status == 401:
+                    self.record_auth_failure(401)
                     return {'valid': False, 'error': 'Authentication failed (401)', 'status_code': 401}
                 elif response.status == 403:
+                    self.record_auth_failure(403)
                     return {'valid': False, 'error': 'Authorization failed (403) - check service account permissions', 'status_code': 403}
                 else:
                     return {'valid': True, 'status_code': response.status, 'note': 'Service accessible but returned non-200 status'}
@@ -800,6 +944,31 @@ class FinancialAnalysisTrigger:
             logger.error(f"Unexpected error validating Cloud Run access: {str(e)}")
             logger.error(traceback.format_exc())
             return {'valid': False, 'error': f'Validation failed: {str(e)}'}
+
+    async def ensure_cloud_run_access(self) -> Dict[str, Any]:
+        """Validate Cloud Run access according to ACCESS_VALIDATION_MODE, reusing a recent successful validation"""
+        global _access_validated_at
+
+        if ACCESS_VALIDATION_MODE == 'lazy':
+            return {'valid': True, 'skipped': True}
+
+        if ACCESS_VALIDATION_MODE == 'cached' and _access_validated_at is not None:
+            age = time.monotonic() - _access_validated_at
+            if age < ACCESS_VALIDATION_TTL:
+                return {'valid': True, 'cached': True, 'age_seconds': age}
+
+        access_validation = await self.validate_cloud_run_access()
+        if access_validation['valid']:
+            _access_validated_at = time.monotonic()
+        return access_validation
+
+    def record_auth_failure(self, status_code: int) -> None:
+        """Forget the cached access validation and token after a 401/403 so the next call starts fresh"""
+        global _access_validated_at
+
+        logger.warning(f"Cloud Run returned {status_code}, invalidating cached access validation and token")
+        _access_validated_at = None
+        token_provider.invalidate(CLOUD_RUN_URL)
     
     def publish_instagram_promotion(self, title: str, subtitle, promo_reels_tts_text: str, promo_reels_summary: str, hourly_prices: list) -> Dict[str, Any]:
         """Publish message to Pub/Sub for Instagram Reel creation"""
@@ -820,6 +989,7 @@ class FinancialAnalysisTrigger:
             }
             
             # Publish to Pub/Sub
+            publisher = get_publisher()
             topic_path = publisher.topic_path(PROJECT_ID, PUBSUB_TOPIC)
             message_json = json.dumps(message_data)
             message_bytes = message_json.encode('utf-8')
@@ -943,13 +1113,13 @@ class FinancialAnalysisTrigger:
             })
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("analysis_overview").set(analysis_doc)
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("income_statement_data").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.income_statement_data]})
-            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("daily_prices").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.daily_prices]})
+            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("daily_prices").set({"data": raw_analysis_data.company_data.daily_prices.to_dicts()})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("dividend_data").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.dividend_data]})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("earnings_estimates").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.earnings_estimates]})
-            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("monthly_prices").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.monthly_prices]})
-            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("hourly_prices").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.hourly_prices]})
+            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("monthly_prices").set({"data": raw_analysis_data.company_data.monthly_prices.to_dicts()})
+            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("hourly_prices").set({"data": raw_analysis_data.company_data.hourly_prices.to_dicts()})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("balance_sheet_data").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.balance_sheet_data]})
-            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("weekly_prices").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.weekly_prices]})
+            self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("weekly_prices").set({"data": raw_analysis_data.company_data.weekly_prices.to_dicts()})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("news_sentiment").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.news_sentiment]})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("splits_data").set({"data": [item.model_dump() for item in raw_analysis_data.company_data.splits_data]})
             self.db.collection(ANALYSIS_COLLECTION).document(f"{ticker}-{self.day_input}").collection("data").document("company_overview").set(raw_analysis_data.company_data.overview.model_dump())
@@ -969,6 +1139,10 @@ class FinancialAnalysisTrigger:
             'ticker': ticker.upper(),
             'session_id': session_id,
             'response_time': metrics.get('response_time', 0),
+            'time_to_first_event': metrics.get('time_to_first_event'),
+            'time_to_final_event': metrics.get('time_to_final_event'),
+            'events_count': metrics.get('events_count', 0),
+            'stream_cancelled_early': metrics.get('stream_cancelled_early', False),
             'status_code': metrics.get('status_code', 0),
             'success': metrics.get('success', False),
             'error': metrics.get('error'),
@@ -1184,153 +1358,304 @@ class FinancialAnalysisTrigger:
             logger.warning(f"Error checking circuit breaker: {e}")
             return {'circuit_open': False}
 
-async def process_financial_analysis(ticker: str, day_input: str = None, user_id: str = "cloud_function") -> Dict[str, Any]:
-    """Main function to process financial analysis"""
-    function_start_time = time.time()
+
+async def _run_preflight_checks(analyzer: FinancialAnalysisTrigger, ticker: str, function_start_time: float) -> Optional[Dict[str, Any]]:
+    """
+    Circuit breaker, recent rate limit and Cloud Run access checks run before analyzing
+    Args:
+        analyzer: Trigger whose Firestore client and HTTP session are used
+        ticker: Ticker (or batch description) used in log messages and the error result
+        function_start_time: Start time used for the reported execution time
+    Returns:
+        Error result when the analysis must not proceed, None otherwise
+    """
+    # Check circuit breaker status
+    circuit_status = await analyzer.check_circuit_breaker()
+    if circuit_status['circuit_open']:
+        wait_minutes = circuit_status['wait_minutes']
+        logger.error(f"Circuit breaker active for {ticker} - too many recent rate limits. Wait {wait_minutes:.1f} more minutes.")
+        return {
+            'success': False,
+            'ticker': ticker,
+            'error': f'Circuit breaker active - too many rate limits. Try again in {wait_minutes:.1f} minutes.',
+            'execution_time': time.time() - function_start_time,
+            'circuit_breaker': True
+        }
     
-    async with FinancialAnalysisTrigger() as analyzer:
-        try:
-            # Check circuit breaker status
-            circuit_status = await analyzer.check_circuit_breaker()
-            if circuit_status['circuit_open']:
-                wait_minutes = circuit_status['wait_minutes']
-                logger.error(f"Circuit breaker active for {ticker} - too many recent rate limits. Wait {wait_minutes:.1f} more minutes.")
-                return {
-                    'success': False,
-                    'ticker': ticker,
-                    'error': f'Circuit breaker active - too many rate limits. Try again in {wait_minutes:.1f} minutes.',
-                    'execution_time': time.time() - function_start_time,
-                    'circuit_breaker': True
-                }
-            
-            # Check for recent rate limiting before proceeding
-            rate_limit_check = await analyzer.check_recent_rate_limits()
-            if rate_limit_check['should_delay']:
-                delay_seconds = rate_limit_check['delay_seconds']
-                logger.warning(f"Recent rate limits detected, delaying analysis for {ticker} by {delay_seconds}s")
-                await asyncio.sleep(delay_seconds)
-            
-            # Check circuit breaker status
-            circuit_status = await analyzer.check_circuit_breaker()
-            if circuit_status['circuit_open']:
-                wait_minutes = circuit_status['wait_minutes']
-                logger.warning(f"Circuit breaker active for {ticker}, waiting {wait_minutes} minutes")
-                await asyncio.sleep(wait_minutes * 60)  # Convert to seconds
-            
-            # Generate payload
-            if day_input:
-                analyzer.day_input = day_input
-            
-            # Validate Cloud Run access before proceeding
-            logger.info(f"Validating Cloud Run access for {ticker}...")
-            access_validation = await analyzer.validate_cloud_run_access()
-            if not access_validation['valid']:
-                error_msg = access_validation['error']
-                status_code = access_validation.get('status_code', 500)
-                logger.error(f"Cloud Run access validation failed for {ticker}: {error_msg}")
-                return {
-                    'success': False,
-                    'ticker': ticker,
-                    'error': f'Cloud Run authentication failed: {error_msg}',
-                    'execution_time': time.time() - function_start_time,
-                    'status_code': status_code,
-                    'validation_failed': True
-                }
-            else:
-                logger.info(f"Cloud Run access validated successfully for {ticker}")
-            
+    # Check for recent rate limiting before proceeding
+    rate_limit_check = await analyzer.check_recent_rate_limits()
+    if rate_limit_check['should_delay']:
+        delay_seconds = rate_limit_check['delay_seconds']
+        logger.warning(f"Recent rate limits detected, delaying analysis for {ticker} by {delay_seconds}s")
+        await asyncio.sleep(delay_seconds)
+    
+    # Check circuit breaker status
+    circuit_status = await analyzer.check_circuit_breaker()
+    if circuit_status['circuit_open']:
+        wait_minutes = circuit_status['wait_minutes']
+        logger.warning(f"Circuit breaker active for {ticker}, waiting {wait_minutes} minutes")
+        await asyncio.sleep(wait_minutes * 60)  # Convert to seconds
+    
+    # Validate Cloud Run access before proceeding (cached per process unless ACCESS_VALIDATION_MODE=always)
+    logger.info(f"Validating Cloud Run access for {ticker}...")
+    access_validation = await analyzer.ensure_cloud_run_access()
+    if not access_validation['valid']:
+        error_msg = access_validation['error']
+        status_code = access_validation.get('status_code', 500)
+        logger.error(f"Cloud Run access validation failed for {ticker}: {error_msg}")
+        return {
+            'success': False,
+            'ticker': ticker,
+            'error': f'Cloud Run authentication failed: {error_msg}',
+            'execution_time': time.time() - function_start_time,
+            'status_code': status_code,
+            'validation_failed': True
+        }
+    elif access_validation.get('skipped'):
+        logger.info(f"Cloud Run access pre-flight skipped for {ticker} (lazy mode)")
+    elif access_validation.get('cached'):
+        logger.info(f"Cloud Run access validated {access_validation['age_seconds']:.0f}s ago, skipping pre-flight for {ticker}")
+    else:
+        logger.info(f"Cloud Run access validated successfully for {ticker}")
 
-            raw_analysis_data = await get_stock_data_tool.analyze_symbol(ticker)
+    return None
 
-            payload = analyzer.generate_analysis_payload(raw_analysis_data)
-            session_id = payload['session_id']
 
-            logger.info(f"Starting financial analysis for {ticker} with session {session_id}")
+async def process_financial_analysis(ticker: str, day_input: str = None, user_id: str = "cloud_function",
+                                     analyzer: Optional[FinancialAnalysisTrigger] = None, global_data=None,
+                                     rate_limiter: Optional[AsyncLimiter] = None, preflight: bool = True) -> Dict[str, Any]:
+    """
+    Main function to process financial analysis
+    Args:
+        ticker: Stock ticker symbol
+        day_input: Day of the analysis
+        user_id: User ID for the agent session
+        analyzer: Trigger shared by a batch (its HTTP session is reused); a new one is created when omitted
+        global_data: Macro data shared by a batch (loaded per analysis when omitted)
+        rate_limiter: Alpha Vantage rate limiter shared by a batch
+        preflight: Run the circuit breaker, rate limit and access checks (a batch runs them once up front)
+    Returns:
+        Dict with the analysis outcome for the ticker
+    """
+    if analyzer is None:
+        async with FinancialAnalysisTrigger() as analyzer:
+            return await process_financial_analysis(ticker, day_input, user_id, analyzer, global_data,
+                                                    rate_limiter, preflight)
 
-            # Call Cloud Run service with validation retry
-            result = await analyzer.call_cloud_run_with_validation_retry(payload)
+    function_start_time = time.time()
 
-            print("Retrieved response from LLM Agent:", result)
+    try:
+        if preflight:
+            preflight_error = await _run_preflight_checks(analyzer, ticker, function_start_time)
+            if preflight_error:
+                return preflight_error
 
-            # Calculate total function execution time
-            function_execution_time = time.time() - function_start_time
-            result['function_execution_time'] = function_execution_time
+        # Generate payload
+        if day_input:
+            analyzer.day_input = day_input
 
-            # --- SIMPLIFIED VALIDATION LOGIC ---
-            # Validation is now handled by Pydantic in call_cloud_run_with_validation_retry
-            logger.info(f"Analysis result for {ticker}: success={result.get('success')}, validation_attempts={result.get('validation_attempts', 1)}")
+        raw_analysis_data = await get_stock_data_tool.analyze_symbol(ticker, global_data=global_data, rate_limiter=rate_limiter)
 
-            # Log any validation information
-            if result.get('validation_attempts', 1) > 1:
-                logger.warning(f"Analysis for {ticker} required {result['validation_attempts']} validation attempts")
-            
-            if result.get('validation_errors'):
-                logger.error(f"Validation errors for {ticker}: {result['validation_errors']}")
-
-            # Save analysis result
-            result_doc_id = analyzer.save_analysis_result(ticker, result, raw_analysis_data)
-            # Save performance metrics
-            analyzer.save_performance_metrics(ticker, result, session_id)
-            # Save metadata
-            analyzer.save_metadata(ticker, payload, result_doc_id, session_id)
-            # Save cost tracking
-            analyzer.save_cost_tracking(ticker, result, session_id)
-
-            # Check for Instagram promotion flag and publish to Pub/Sub if needed
-            promotion_result = {'promoted': False}
-            try:
-                promote_flag = False
-                tts_text = ""
-                summary_text = ""
-                analysis_data = result.get('data', {})
-                for analysis in analysis_data.get('analysis', []):
-                    if isinstance(analysis, dict) and analysis.get("language") == "en":
-                        if str(analysis.get("promote_flag")).lower() == 'true':
-                            promote_flag = True
-                            tts_text = analysis.get("promo_reels_tts_text", "").split("#")[0].strip() + "... Read more on our page!"
-                            summary_text = analysis.get("promo_reels_summary", "").strip()
-                            break
-                if promote_flag:
-                    # Get hourly prices for the promotion
-                    hourly_prices = [item.model_dump() for item in raw_analysis_data.company_data.hourly_prices]
-                    subtitle = f"{raw_analysis_data.company_data.hourly_prices[-1].date} - {raw_analysis_data.company_data.hourly_prices[0].date}"
-                    promotion_result = analyzer.publish_instagram_promotion(
-                        raw_analysis_data.company_data.overview.Name,
-                        subtitle,
-                        tts_text,
-                        summary_text,
-                        hourly_prices
-                    )
+        payload = analyzer.generate_analysis_payload(raw_analysis_data)
+        session_id = payload['session_id']
+
+        logger.info(f"Starting financial analysis for {ticker} with session {session_id}")
+
+        # Call Cloud Run service with validation retry
+        result = await analyzer.call_cloud_run_with_validation_retry(payload, languages=raw_analysis_data.languages)
+
+        print("Retrieved response from LLM Agent:", result)
+
+        # Calculate total function execution time
+        function_execution_time = time.time() - function_start_time
+        result['function_execution_time'] = function_execution_time
+
+        # --- SIMPLIFIED VALIDATION LOGIC ---
+        # Validation is now handled by Pydantic in call_cloud_run_with_validation_retry
+        logger.info(f"Analysis result for {ticker}: success={result.get('success')}, validation_attempts={result.get('validation_attempts', 1)}")
+
+        # Log any validation information
+        if result.get('validation_attempts', 1) > 1:
+            logger.warning(f"Analysis for {ticker} required {result['validation_attempts']} validation attempts")
+        
+        if result.get('validation_errors'):
+            logger.error(f"Validation errors for {ticker}: {result['validation_errors']}")
+
+        # Firestore writes are blocking, run them in a worker thread so concurrent analyses keep going
+        # Save analysis result
+        result_doc_id = await asyncio.to_thread(analyzer.save_analysis_result, ticker, result, raw_analysis_data)
+        # Save performance metrics
+        await asyncio.to_thread(analyzer.save_performance_metrics, ticker, result, session_id)
+        # Save metadata
+        await asyncio.to_thread(analyzer.save_metadata, ticker, payload, result_doc_id, session_id)
+        # Save cost tracking
+        await asyncio.to_thread(analyzer.save_cost_tracking, ticker, result, session_id)
+
+        # Check for Instagram promotion flag and publish to Pub/Sub if needed
+        promotion_result = {'promoted': False}
+        try:
+            promote_flag = False
+            tts_text = ""
+            summary_text = ""
+            analysis_data = result.get('data', {})
+            for analysis in analysis_data.get('analysis', []):
+                if isinstance(analysis, dict) and analysis.get("language") == "en":
+                    if str(analysis.get("promote_flag")).lower() == 'true':
+                        promote_flag = True
+                        tts_text = analysis.get("promo_reels_tts_text", "").split("#")[0].strip() + "... Read more on our page!"
+                        summary_text = analysis.get("promo_reels_summary", "").strip()
+                        break
+            if promote_flag:
+                # Get hourly prices for the promotion, downsampled to what the reel chart can show
+                # (the renderer only reads date and close)
+                hourly_prices = [
+                    {'date': bar['date'], 'close': bar['close']}
+                    for bar in raw_analysis_data.company_data.hourly_prices.downsample(REEL_CHART_POINTS).to_dicts()
+                ]
+                subtitle = f"{raw_analysis_data.company_data.hourly_prices[-1].date} - {raw_analysis_data.company_data.hourly_prices[0].date}"
+                promotion_result = await asyncio.to_thread(
+                    analyzer.publish_instagram_promotion,
+                    raw_analysis_data.company_data.overview.Name,
+                    subtitle,
+                    tts_text,
+                    summary_text,
+                    hourly_prices
+                )
+                
+                if promotion_result.get('promoted'):
+                    logger.info(f"Instagram promotion triggered for {ticker}")
+                else:
+                    logger.info(f"No Instagram promotion for {ticker}: {promotion_result.get('reason', 'Unknown')}")
                     
-                    if promotion_result.get('promoted'):
-                        logger.info(f"Instagram promotion triggered for {ticker}")
-                    else:
-                        logger.info(f"No Instagram promotion for {ticker}: {promotion_result.get('reason', 'Unknown')}")
-                        
-            except Exception as e:
-                logger.error(f"Error handling Instagram promotion for {ticker}: {str(e)}")
-                promotion_result = {'promoted': False, 'error': str(e)}
+        except Exception as e:
+            logger.error(f"Error handling Instagram promotion for {ticker}: {str(e)}")
+            promotion_result = {'promoted': False, 'error': str(e)}
 
-            logger.info(f"Completed financial analysis for {ticker}")
+        logger.info(f"Completed financial analysis for {ticker}")
 
-            return {
-                'success': True,
-                'ticker': ticker,
-                'session_id': session_id,
-                'result_document_id': result_doc_id,
-                'execution_time': function_execution_time,
-                'promotion': promotion_result
-            }
+        return {
+            'success': True,
+            'ticker': ticker,
+            'session_id': session_id,
+            'result_document_id': result_doc_id,
+            'execution_time': function_execution_time,
+            'promotion': promotion_result
+        }
+
+    except Exception as e:
+        logger.error(traceback.format_exc())
+        logger.error(f"Error in process_financial_analysis for {ticker}: {str(e)}")
+        return {
+            'success': False,
+            'ticker': ticker,
+            'error': str(e),
+            'execution_time': time.time() - function_start_time
+        }
+
+async def process_financial_analysis_batch(tickers: List[str], day_input: str = None, user_id: str = "cloud_function",
+                                           concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze many tickers concurrently, yielding each result as soon as it is done
+    Args:
+        tickers: Stock ticker symbols (duplicates are analyzed once)
+        day_input: Day of the analysis
+        user_id: User ID for the agent sessions
+        concurrency: Maximum number of tickers analyzed at the same time
+    Returns:
+        Async iterator of per-ticker results (as returned by process_financial_analysis) in completion order
+
+    The HTTP session, token cache, Firestore client, macro data and Alpha Vantage rate limiter are shared
+    by all tickers; the pre-flight checks run once for the whole batch.
+    """
+    tickers = list(dict.fromkeys(tickers))
+    batch_start_time = time.time()
+
+    async with FinancialAnalysisTrigger(concurrency) as analyzer:
+        preflight_error = await _run_preflight_checks(analyzer, f"batch of {len(tickers)} tickers", batch_start_time)
+        if preflight_error:
+            for ticker in tickers:
+                yield {**preflight_error, 'ticker': ticker}
+            return
+
+        global_data = await asyncio.to_thread(get_stock_data_tool.get_all_global_us_data)
+        rate_limiter = AsyncLimiter(ALPHAVANTAGE_REQUESTS_PER_MINUTE, 60) if ALPHAVANTAGE_REQUESTS_PER_MINUTE > 0 else None
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def analyze(ticker: str) -> Dict[str, Any]:
+            async with semaphore:
+                # Rate limits hit by earlier tickers of this batch open the circuit for the remaining ones
+                circuit_status = await analyzer.check_circuit_breaker()
+                if circuit_status['circuit_open']:
+                    return {
+                        'success': False,
+                        'ticker': ticker,
+                        'error': f"Circuit breaker active - too many rate limits. Try again in {circuit_status['wait_minutes']:.1f} minutes.",
+                        'execution_time': 0,
+                        'circuit_breaker': True
+                    }
+                return await process_financial_analysis(
+                    ticker, day_input, user_id, analyzer=analyzer, global_data=global_data,
+                    rate_limiter=rate_limiter, preflight=False
+                )
+
+        logger.info(f"Starting batch analysis of {len(tickers)} tickers with concurrency {concurrency}")
+        tasks = [asyncio.create_task(analyze(ticker)) for ticker in tickers]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Stop the remaining analyses if the consumer goes away
+            for task in tasks:
+                task.cancel()
+
+
+def _stream_batch_results(tickers: List[str], day_input: str = None, user_id: str = "cloud_function") -> Iterator[str]:
+    """
+    Run a batch on its own event loop thread and stream the results as NDJSON lines
+    Args:
+        tickers: Stock ticker symbols
+        day_input: Day of the analysis
+        user_id: User ID for the agent sessions
+    Returns:
+        Iterator of JSON lines, one per ticker in completion order, followed by a summary line
+    """
+    tickers = list(dict.fromkeys(tickers))
+    results = queue.Queue()
+    finished = object()
+    batch_start_time = time.time()
 
+    def run_batch():
+        async def consume():
+            async for ticker_result in process_financial_analysis_batch(tickers, day_input, user_id):
+                results.put(ticker_result)
+        try:
+            asyncio.run(consume())
         except Exception as e:
             logger.error(traceback.format_exc())
-            logger.error(f"Error in process_financial_analysis for {ticker}: {str(e)}")
-            return {
-                'success': False,
-                'ticker': ticker,
-                'error': str(e),
-                'execution_time': time.time() - function_start_time
-            }
+            results.put({'success': False, 'error': f"Batch failed: {str(e)}"})
+        finally:
+            results.put(finished)
+
+    threading.Thread(target=run_batch, name='analysis-batch', daemon=True).start()
+
+    succeeded = failed = 0
+    while True:
+        ticker_result = results.get()
+        if ticker_result is finished:
+            break
+        if ticker_result.get('success'):
+            succeeded += 1
+        else:
+            failed += 1
+        yield json.dumps(ticker_result, default=str) + '\n'
+
+    yield json.dumps({'summary': {
+        'tickers': len(tickers),
+        'succeeded': succeeded,
+        'failed': failed,
+        'execution_time': time.time() - batch_start_time
+    }}) + '\n'
+
 
 @functions_framework.http
 def content_trigger_function(request):
@@ -1344,12 +1669,29 @@ def content_trigger_function(request):
             return {'error': 'No JSON payload provided'}, 400
         
         ticker = request_json.get('ticker')
+        tickers = request_json.get('tickers')
         user_id = request_json.get('user_id', 'cloud_function')
         day_input = request_json.get("day_input")
+
+        if tickers is not None:
+            if not isinstance(tickers, list) or not tickers or not all(isinstance(t, str) and t for t in tickers):
+                logger.error("Invalid tickers parameter provided in request")
+                return {'error': 'tickers must be a non-empty list of ticker symbols'}, 400
+
+            # Stream one JSON line per ticker as it completes (set "stream": false for a single JSON response)
+            if request_json.get('stream', True):
+                return Response(_stream_batch_results(tickers, day_input, user_id), mimetype='application/x-ndjson')
+
+            async def collect():
+                return [item async for item in process_financial_analysis_batch(tickers, day_input, user_id)]
+
+            results = asyncio.run(collect())
+            success = all(item['success'] for item in results)
+            return {'success': success, 'results': results}, 200 if success else 500
         
         if not ticker:
             logger.error("No ticker parameter provided in request")
-            return {'error': 'ticker parameter is required'}, 400
+            return {'error': 'ticker or tickers parameter is required'}, 400
         
         # Run async function
         result = asyncio.run(process_financial_analysis(ticker, day_input, user_id))
@@ -0,0 +1,219 @@
+"""
+Columnar OHLCV Price Series
+Compact NumPy-backed price history with zero-copy views for indicators and lazy conversion for output
+"""
+
+from typing import Any, Dict, Iterator, List, Sequence
+
+import numpy as np
+
+import av_json
+
+
+class PriceSeries:
+    """
+    OHLCV price history stored as NumPy columns in chronological order (oldest first):
+    dates as datetime64[s], open/high/low/close as float64 and volume as int64.
+
+    The arrays are meant to be read directly by indicator code. For compatibility with the
+    previous List[StockRealtimeDataModel] representation, len(), indexing and iteration follow
+    the API order (newest first, [0] = most recent bar) and build models lazily.
+    """
+
+    __slots__ = ('dates', 'open', 'high', 'low', 'close', 'volume', 'intraday')
+
+    def __init__(self, dates: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, intraday: bool = False):
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.intraday = intraday
+
+    @classmethod
+    def empty(cls) -> 'PriceSeries':
+        """Create a series without any bars"""
+        return cls(
+            np.empty(0, dtype='datetime64[s]'), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.float64), np.empty(0, dtype=np.float64), np.empty(0, dtype=np.int64)
+        )
+
+    @classmethod
+    def from_columns(cls, dates: Sequence[str], opens: Sequence[Any], highs: Sequence[Any], lows: Sequence[Any],
+                     closes: Sequence[Any], volumes: Sequence[Any]) -> 'PriceSeries':
+        """
+        Build a series from column sequences in any order
+        Args:
+            dates: Date strings ('YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS')
+            opens, highs, lows, closes, volumes: Values as numbers or numeric strings
+        Returns:
+            PriceSeries sorted chronologically
+        """
+        if len(dates) == 0:
+            return cls.empty()
+
+        parsed_dates = np.array(dates, dtype='datetime64[s]')
+        order = np.argsort(parsed_dates, kind='stable')
+
+        return cls(
+            parsed_dates[order],
+            np.array(opens, dtype=np.float64)[order],
+            np.array(highs, dtype=np.float64)[order],
+            np.array(lows, dtype=np.float64)[order],
+            np.array(closes, dtype=np.float64)[order],
+            np.array(volumes, dtype=np.int64)[order],
+            intraday=len(dates[0]) > 10,
+        )
+
+    @classmethod
+    def from_alpha_vantage(cls, time_series: Dict[str, Dict[str, str]]) -> 'PriceSeries':
+        """Build a series from an Alpha Vantage 'Time Series (...)' mapping of date -> OHLCV strings"""
+        dates, columns = av_json.time_series_columns(time_series)
+        if not dates:
+            return cls.empty()
+        return cls.from_columns(
+            dates, columns['open'], columns['high'], columns['low'], columns['close'], columns['volume']
+        )
+
+    @classmethod
+    def from_models(cls, price_data: Sequence[Any]) -> 'PriceSeries':
+        """Build a series from a list of StockRealtimeDataModel (any order)"""
+        return cls.from_columns(
+            [p.date for p in price_data],
+            [p.open for p in price_data],
+            [p.high for p in price_data],
+            [p.low for p in price_data],
+            [p.close for p in price_data],
+            [p.volume for p in price_data],
+        )
+
+    def slice(self, start: int, stop: int) -> 'PriceSeries':
+        """Chronological sub-series [start, stop) sharing memory with this series"""
+        return PriceSeries(
+            self.dates[start:stop], self.open[start:stop], self.high[start:stop], self.low[start:stop],
+            self.close[start:stop], self.volume[start:stop], intraday=self.intraday
+        )
+
+    def downsample(self, max_points: int) -> 'PriceSeries':
+        """
+        Shape-preserving subset of at most max_points bars (LTTB on close over time)
+        Args:
+            max_points: Target number of bars; series that are already small enough are returned as-is
+        Returns:
+            PriceSeries with the selected bars, always keeping the first and the last one
+        """
+        if len(self) <= max_points:
+            return self
+        idx = lttb_indices(self.dates.astype(np.int64).astype(np.float64), self.close, max_points)
+        return PriceSeries(
+            self.dates[idx], self.open[idx], self.high[idx], self.low[idx], self.close[idx], self.volume[idx],
+            intraday=self.intraday
+        )
+
+    def replace_values(self, open: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       volume: np.ndarray) -> 'PriceSeries':
+        """New series with the same dates and the given OHLCV columns"""
+        return PriceSeries(self.dates, open, high, low, close, volume, intraday=self.intraday)
+
+    def date_strings(self) -> np.ndarray:
+        """Dates formatted like the Alpha Vantage input, in chronological order"""
+        if self.intraday:
+            return np.char.replace(np.datetime_as_string(self.dates, unit='s'), 'T', ' ')
+        return np.datetime_as_string(self.dates, unit='D')
+
+    def format_date(self, value: np.datetime64) -> str:
+        """Format a single date like the Alpha Vantage input"""
+        if self.intraday:
+            return np.datetime_as_string(value, unit='s').replace('T', ' ')
+        return np.datetime_as_string(value, unit='D')
+
+    def bar(self, i: int):
+        """StockRealtimeDataModel for the chronological position i (negative counts from the newest)"""
+        from data_tool_model import StockRealtimeDataModel
+
+        return StockRealtimeDataModel(
+            date=self.format_date(self.dates[i]),
+            open=float(self.open[i]),
+            high=float(self.high[i]),
+            low=float(self.low[i]),
+            close=float(self.close[i]),
+            volume=int(self.volume[i]),
+        )
+
+    def _rows(self) -> Iterator[tuple]:
+        """Plain Python rows (date, open, high, low, close, volume), newest first"""
+        return zip(
+            self.date_strings()[::-1].tolist(), self.open[::-1].tolist(), self.high[::-1].tolist(),
+            self.low[::-1].tolist(), self.close[::-1].tolist(), self.volume[::-1].tolist()
+        )
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Rows as dicts (newest first), matching StockRealtimeDataModel.model_dump() for Firestore/Pub/Sub"""
+        return [
+            {'date': d, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+            for d, o, h, l, c, v in self._rows()
+        ]
+
+    def to_models(self) -> list:
+        """Rows as StockRealtimeDataModel (newest first)"""
+        return [self.bar(i) for i in range(len(self) - 1, -1, -1)]
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def __getitem__(self, i: int):
+        if isinstance(i, slice):
+            return self.to_models()[i]
+        n = len(self)
+        if i < -n or i >= n:
+            raise IndexError('PriceSeries index out of range')
+        return self.bar(n - 1 - i if i >= 0 else -1 - i)
+
+    def __iter__(self):
+        return iter(self.to_models())
+
+    def __repr__(self) -> str:
+        # Same text as the list of models it replaces (used verbatim in the analysis prompt)
+        return '[' + ', '.join(
+            f"StockRealtimeDataModel(date={d!r}, open={o!r}, high={h!r}, low={l!r}, close={c!r}, volume={v!r})"
+            for d, o, h, l, c, v in self._rows()
+        ) + ']'
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    Args:
+        x: Increasing x values (e.g. timestamps)
+        y: Values to preserve the visual shape of
+        threshold: Number of points to keep (at least 3 to downsample)
+    Returns:
+        Sorted indices of the kept points
+
+    The first and last points are always kept; from every bucket in between, the point forming the
+    largest triangle with the previously kept point and the average of the next bucket is selected,
+    so peaks and troughs survive where plain striding would drop them.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
@@ -0,0 +1,142 @@
+"""
+Streaming Server-Sent Events Parser
+Incrementally splits a byte stream into SSE events (multi-line data, comments, CRLF) without buffering the whole body
+"""
+
+import codecs
+import re
+from typing import Any, AsyncIterator, List, NamedTuple, Optional
+
+# Size of the chunks read from the HTTP response
+READ_CHUNK_SIZE = 64 * 1024
+
+# SSE line terminators (only these; str.splitlines would also split on U+2028 etc. inside JSON data)
+LINE_END_PATTERN = re.compile(r'\r\n|\r|\n')
+
+
+class SSEEvent(NamedTuple):
+    """Single dispatched SSE event"""
+    event: str
+    data: str
+    id: Optional[str] = None
+
+
+class SSEParser:
+    """
+    Incremental SSE parser (WHATWG event stream format).
+
+    Feed raw bytes as they arrive; complete events are returned as soon as their terminating blank line
+    is seen. Data split across chunks, multi-byte UTF-8 characters split across chunks, multi-line
+    'data:' fields and CR/LF/CRLF line endings are all handled.
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._pending: List[str] = []
+        self._event = ''
+        self._data: List[str] = []
+        self._id: Optional[str] = None
+        self._last_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """Parse a chunk of the stream and return the events completed by it"""
+        text = self._decoder.decode(chunk)
+        if '\n' not in text and '\r' not in text:
+            # Still inside one (possibly very long) line: no rescanning of what was buffered so far
+            self._pending.append(text)
+            return []
+        return self._drain_lines(text, final=False)
+
+    def close(self) -> List[SSEEvent]:
+        """Flush the stream end; an event without a trailing blank line is still dispatched"""
+        events = self._drain_lines(self._decoder.decode(b'', final=True), final=True)
+        event = self._dispatch()
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _drain_lines(self, text: str, final: bool) -> List[SSEEvent]:
+        self._pending.append(text)
+        buffer = ''.join(self._pending)
+        self._pending = []
+
+        events = []
+        start = 0
+        for match in LINE_END_PATTERN.finditer(buffer):
+            # A '\r' at the very end may be the first half of a '\r\n' split across chunks
+            if not final and match.end() == len(buffer) and match.group() == '\r':
+                break
+            event = self._process_line(buffer[start:match.start()])
+            if event is not None:
+                events.append(event)
+            start = match.end()
+
+        rest = buffer[start:]
+        if final:
+            if rest:
+                event = self._process_line(rest)
+                if event is not None:
+                    events.append(event)
+        elif rest:
+            self._pending.append(rest)
+        return events
+
+    def _process_line(self, line: str) -> Optional[SSEEvent]:
+        if not line:
+            return self._dispatch()
+        if line.startswith(':'):
+            return None  # Comment / keep-alive
+
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event = value
+        elif field == 'id' and '\0' not in value:
+            self._id = value
+        return None
+
+    def _dispatch(self) -> Optional[SSEEvent]:
+        if self._id is not None:
+            self._last_id = self._id
+        if not self._data:
+            self._event, self._id = '', None
+            return None
+
+        event = SSEEvent(event=self._event or 'message', data='\n'.join(self._data), id=self._last_id)
+        self._event, self._data, self._id = '', [], None
+        return event
+
+
+async def iter_sse_events(content, chunk_size: int = READ_CHUNK_SIZE) -> AsyncIterator[SSEEvent]:
+    """
+    Iterate SSE events from an aiohttp response body as they arrive
+    Args:
+        content: aiohttp StreamReader (response.content)
+        chunk_size: Maximum bytes read per chunk
+    Returns:
+        Async iterator of SSEEvent; breaking out of the loop stops reading the stream
+    """
+    parser = SSEParser()
+    while True:
+        chunk = await content.read(chunk_size)
+        if not chunk:
+            break
+        for event in parser.feed(chunk):
+            yield event
+    for event in parser.close():
+        yield event
+
+
+def is_final_response_event(event: Any) -> bool:
+    """Check whether a decoded ADK event is a complete (non-partial) agent response with content"""
+    if not isinstance(event, dict) or event.get('partial'):
+        return False
+    content = event.get('content')
+    if not isinstance(content, dict):
+        return False
+    parts = content.get('parts') or []
+    return any(isinstance(part, dict) and ('text' in part or 'structured_data' in part) for part in parts)
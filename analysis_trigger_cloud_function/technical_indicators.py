@@ -0,0 +1,308 @@
+"""
+Incremental Technical Indicator Engine
+Maintains a compact per-ticker/timeframe state so every new bar updates all indicators in O(1)
+
+The state accumulates every bar seen since it was created (or last fully recomputed), not just the
+fetched window: the values equal the pandas computation over that whole history. Cumulative and
+recursive indicators (OBV, EMA/MACD, SAR) therefore keep counting bars that have left the window,
+and sma_50/sma_200 become available once enough bars were seen. tools/indicator_parity_check.py
+checks this against process_timeframe_data.
+"""
+
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from data_tool_model import (
+    IndicatorStateModel,
+    StockRealtimeDataModel,
+    TechnicalIndicatorsModel,
+    TimeFrameIndicators,
+)
+from price_series import PriceSeries
+
+# Buffer sizes: longest window that reads each series
+CLOSE_WINDOW = 200   # sma_200
+RANGE_WINDOW = 20    # bollinger / cci
+VOLUME_WINDOW = 2    # volume trend (current vs previous)
+
+# Smoothing factors of the pandas ewm(span=N) averages
+EMA_12_DECAY = 1 - 2 / (12 + 1)
+EMA_26_DECAY = 1 - 2 / (26 + 1)
+MACD_SIGNAL_DECAY = 1 - 2 / (9 + 1)
+
+# Relative tolerance when checking a persisted bar against freshly fetched data
+BAR_MATCH_TOLERANCE = 1e-9
+
+# Parabolic SAR parameters (Wilder defaults)
+SAR_ACCELERATION = 0.02
+SAR_MAXIMUM = 0.2
+
+# Bump whenever the state layout or indicator semantics change; older states are recomputed
+# (2: indicators span the whole history seen by the state, see the module docstring)
+STATE_VERSION = 2
+
+# (is_long, next_sar, extreme_point, acceleration_factor, last_high, last_low)
+SarState = Tuple[bool, float, float, float, float, float]
+
+
+def parabolic_sar(highs: Sequence[float], lows: Sequence[float], acceleration: float = SAR_ACCELERATION,
+                  maximum: float = SAR_MAXIMUM, state: Optional[SarState] = None) -> Tuple[np.ndarray, Optional[SarState]]:
+    """
+    Wilder's Parabolic SAR (same algorithm and initialisation as TA-Lib SAR)
+    Args:
+        highs: High prices in chronological order
+        lows: Low prices in chronological order
+        acceleration: Acceleration factor step (and initial value)
+        maximum: Acceleration factor cap
+        state: State returned by a previous call, to continue the series with new bars only
+    Returns:
+        Tuple of (SAR value per bar, state after the last bar). Without a state the first bar has no
+        value (NaN) and the state is None when fewer than two bars are given.
+    """
+    high = np.asarray(highs, dtype=np.float64).tolist()
+    low = np.asarray(lows, dtype=np.float64).tolist()
+    n = len(high)
+    out = np.full(n, np.nan)
+
+    if state is None:
+        if n < 2:
+            return out, None
+        # Initial direction from the directional movement of the first two bars
+        diff_plus = high[1] - high[0]
+        diff_minus = low[0] - low[1]
+        is_long = not (diff_minus > 0 and diff_plus < diff_minus)
+        if is_long:
+            extreme_point, sar = high[1], low[0]
+        else:
+            extreme_point, sar = low[1], high[0]
+        af = acceleration
+        new_high, new_low = high[1], low[1]
+        start = 1
+    else:
+        is_long, sar, extreme_point, af, new_high, new_low = state
+        start = 0
+
+    for today in range(start, n):
+        prev_high, prev_low = new_high, new_low
+        new_high, new_low = high[today], low[today]
+
+        if is_long:
+            if new_low <= sar:
+                # Reversal to short
+                is_long = False
+                sar = max(extreme_point, prev_high, new_high)
+                out[today] = sar
+                af = acceleration
+                extreme_point = new_low
+                sar = max(sar + af * (extreme_point - sar), prev_high, new_high)
+            else:
+                out[today] = sar
+                if new_high > extreme_point:
+                    extreme_point = new_high
+                    af = min(af + acceleration, maximum)
+                sar = min(sar + af * (extreme_point - sar), prev_low, new_low)
+        else:
+            if new_high >= sar:
+                # Reversal to long
+                is_long = True
+                sar = min(extreme_point, prev_low, new_low)
+                out[today] = sar
+                af = acceleration
+                extreme_point = new_high
+                sar = min(sar + af * (extreme_point - sar), prev_low, new_low)
+            else:
+                out[today] = sar
+                if new_low < extreme_point:
+                    extreme_point = new_low
+                    af = min(af + acceleration, maximum)
+                sar = max(sar + af * (extreme_point - sar), prev_high, new_high)
+
+    return out, (is_long, sar, extreme_point, af, new_high, new_low)
+
+
+def new_state(symbol: str, timeframe: str) -> IndicatorStateModel:
+    """Create an empty indicator state for a ticker and timeframe"""
+    return IndicatorStateModel(symbol=symbol, timeframe=timeframe, version=STATE_VERSION)
+
+
+def _bar_matches(stored: StockRealtimeDataModel, bar: StockRealtimeDataModel) -> bool:
+    """Check that a persisted bar was not revised (split, data correction) since it was stored"""
+    for field in ('open', 'high', 'low', 'close'):
+        if not np.isclose(getattr(stored, field), getattr(bar, field), rtol=BAR_MATCH_TOLERANCE, atol=0.0):
+            return False
+    return int(stored.volume) == int(bar.volume)
+
+
+def resume_index(state: Optional[IndicatorStateModel], series: PriceSeries) -> Optional[int]:
+    """
+    Find where incremental processing can continue
+    Args:
+        state: Previously persisted state (or None)
+        series: Price series (chronological columns)
+    Returns:
+        Index of the first bar not yet folded into the state, or None when a full recompute is required
+        (no state, outdated state version, last known bar no longer in the fetched window, or the bar was
+        revised by a split/correction)
+    """
+    if state is None or state.last_bar is None or state.bars_count == 0 or state.version != STATE_VERSION:
+        return None
+
+    last_date = np.datetime64(state.last_bar.date, 's')
+    i = int(np.searchsorted(series.dates, last_date, side='left'))
+    if i == len(series) or series.dates[i] != last_date:
+        return None
+
+    return i + 1 if _bar_matches(state.last_bar, series.bar(i)) else None
+
+
+def advance_state(state: IndicatorStateModel, bars: PriceSeries) -> IndicatorStateModel:
+    """
+    Fold new bars into the indicator state (in place)
+    Args:
+        state: Indicator state to update
+        bars: New price bars (chronological columns)
+    Returns:
+        The updated state
+    """
+    if not bars:
+        return state
+
+    # Parabolic SAR continues from its state machine, or is initialised from the last buffered bar
+    new_highs = bars.high.tolist()
+    new_lows = bars.low.tolist()
+    if state.sar_is_long is None:
+        sar_values, sar_state = parabolic_sar(state.highs[-1:] + new_highs, state.lows[-1:] + new_lows)
+    else:
+        sar_values, sar_state = parabolic_sar(new_highs, new_lows, state=(
+            state.sar_is_long, state.sar_next, state.sar_extreme_point, state.sar_acceleration,
+            state.highs[-1], state.lows[-1]
+        ))
+    if sar_state is not None:
+        state.sar_value = float(sar_values[-1])
+        state.sar_is_long, state.sar_next, state.sar_extreme_point, state.sar_acceleration = sar_state[:4]
+
+    closes = state.closes
+    highs = state.highs
+    lows = state.lows
+    volumes = state.volumes
+
+    ema_12_num, ema_12_den = state.ema_12_num, state.ema_12_den
+    ema_26_num, ema_26_den = state.ema_26_num, state.ema_26_den
+    signal_num, signal_den = state.macd_signal_num, state.macd_signal_den
+    obv = state.obv
+
+    for close, volume in zip(bars.close.tolist(), bars.volume.tolist()):
+        if closes:
+            if close > closes[-1]:
+                obv += volume
+            elif close < closes[-1]:
+                obv -= volume
+
+        ema_12_num = close + EMA_12_DECAY * ema_12_num
+        ema_12_den = 1.0 + EMA_12_DECAY * ema_12_den
+        ema_26_num = close + EMA_26_DECAY * ema_26_num
+        ema_26_den = 1.0 + EMA_26_DECAY * ema_26_den
+        macd_line = ema_12_num / ema_12_den - ema_26_num / ema_26_den
+        signal_num = macd_line + MACD_SIGNAL_DECAY * signal_num
+        signal_den = 1.0 + MACD_SIGNAL_DECAY * signal_den
+
+        closes.append(close)
+        volumes.append(volume)
+
+    highs.extend(new_highs)
+    lows.extend(new_lows)
+
+    del closes[:-CLOSE_WINDOW]
+    del highs[:-RANGE_WINDOW]
+    del lows[:-RANGE_WINDOW]
+    del volumes[:-VOLUME_WINDOW]
+
+    state.ema_12_num, state.ema_12_den = ema_12_num, ema_12_den
+    state.ema_26_num, state.ema_26_den = ema_26_num, ema_26_den
+    state.macd_signal_num, state.macd_signal_den = signal_num, signal_den
+    state.obv = float(obv)
+    state.bars_count += len(bars)
+    state.last_bar = bars.bar(-1)
+    state.updated_at = datetime.now().isoformat()
+    return state
+
+
+def indicators_from_state(state: IndicatorStateModel) -> TimeFrameIndicators:
+    """
+    Read the current indicator values out of the state
+    They equal the pandas computation over every bar folded into the state, which is more than the
+    fetched window once the state has been carried across runs
+    """
+    count = state.bars_count
+    closes = np.asarray(state.closes, dtype=np.float64)
+    highs = np.asarray(state.highs, dtype=np.float64)
+    lows = np.asarray(state.lows, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Bollinger Bands / standard deviation (20, sample std like pandas rolling)
+        if count >= 20:
+            window = closes[-20:]
+            sma_20 = float(window.mean())
+            std_20 = float(window.std(ddof=1))
+            bollinger = {"upper": sma_20 + std_20 * 2, "middle": sma_20, "lower": sma_20 - std_20 * 2}
+        else:
+            sma_20, std_20 = 0.0, 0.0
+            bollinger = {"upper": 0.0, "middle": 0.0, "lower": 0.0}
+
+        moving_averages = {
+            "sma_20": sma_20,
+            "sma_50": float(closes[-50:].mean()) if count >= 50 else 0.0,
+            "sma_200": float(closes[-200:].mean()) if count >= 200 else 0.0,
+            "ema_12": state.ema_12_num / state.ema_12_den if count >= 12 else 0.0,
+            "ema_26": state.ema_26_num / state.ema_26_den if count >= 26 else 0.0,
+        }
+
+        if count >= 26:
+            macd_line = state.ema_12_num / state.ema_12_den - state.ema_26_num / state.ema_26_den
+            signal_line = state.macd_signal_num / state.macd_signal_den
+            macd = {"macd_line": macd_line, "signal_line": signal_line, "histogram": macd_line - signal_line}
+        else:
+            macd = {"macd_line": 0.0, "signal_line": 0.0, "histogram": 0.0}
+
+        # RSI (14, simple rolling average of gains/losses)
+        if count >= 15:
+            delta = np.diff(closes[-15:])
+            avg_gain = np.float64(delta[delta > 0].sum() / 14)
+            avg_loss = np.float64(-delta[delta < 0].sum() / 14)
+            rsi = float(100 - (100 / (1 + avg_gain / avg_loss)))
+        else:
+            rsi = 50.0
+
+        # Commodity Channel Index (20)
+        if count >= 20:
+            typical_price = (highs[-20:] + lows[-20:] + closes[-20:]) / 3
+            sma_tp = typical_price.mean()
+            mad = np.abs(typical_price - sma_tp).mean()
+            cci = float((typical_price[-1] - sma_tp) / (0.015 * mad))
+        else:
+            cci = 0.0
+
+    sar = state.sar_value if count >= 2 else 0.0
+    momentum = float(closes[-1] - closes[-11]) if count >= 11 else 0.0
+    obv = state.obv if count >= 2 else 0.0
+
+    volume_trend = 0.0
+    if len(state.volumes) == 2 and state.volumes[0] > 0:
+        volume_trend = ((state.volumes[1] - state.volumes[0]) / state.volumes[0]) * 100
+
+    return TimeFrameIndicators(
+        bollinger_bands=TechnicalIndicatorsModel.BollingerBands(**bollinger),
+        moving_averages=TechnicalIndicatorsModel.MovingAverages(**moving_averages),
+        macd=TechnicalIndicatorsModel.MACDIndicator(**macd),
+        rsi=rsi,
+        obv=obv,
+        sar=sar,
+        cci=cci,
+        standard_deviation=std_20,
+        momentum=momentum,
+        trend_indicators=TechnicalIndicatorsModel.TrendIndicators(
+            volume_trend_percent=float(volume_trend), market_cap_trend_percent=0.0
+        )
+    )
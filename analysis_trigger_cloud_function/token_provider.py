@@ -0,0 +1,162 @@
+"""
+Cloud Run Identity Token Provider
+Caches identity tokens per audience until shortly before they expire and refreshes them in the background
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import threading
+import time
+import traceback
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Refresh in the background once less than this remains before the token expires
+# (capped at half the token's lifetime, so short-lived tokens are not refreshed on every hit)
+REFRESH_MARGIN_SECONDS = 300
+# Below this remaining lifetime the cached token is not handed out any more (blocking refresh)
+MIN_VALIDITY_SECONDS = 30
+# Lifetime assumed for tokens whose 'exp' claim cannot be read
+DEFAULT_TOKEN_TTL_SECONDS = 600
+# Access tokens are only a fallback (Cloud Run may reject them), so they are cached briefly
+FALLBACK_TOKEN_TTL_SECONDS = 60
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """Read the 'exp' claim (epoch seconds) from a JWT without verifying it"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return None
+
+
+class TokenProvider:
+    """
+    Process-wide cache of Cloud Run identity tokens keyed by audience.
+
+    Uses a threading lock rather than asyncio primitives so one instance can be shared across the
+    event loops created by successive asyncio.run() calls and across concurrent coroutines.
+    """
+
+    def __init__(self, refresh_margin: float = REFRESH_MARGIN_SECONDS,
+                 fallback_ttl: float = FALLBACK_TOKEN_TTL_SECONDS):
+        self.refresh_margin = refresh_margin
+        self.fallback_ttl = fallback_ttl
+        self._lock = threading.Lock()
+        self._tokens: Dict[Optional[str], Tuple[str, float, float]] = {}  # audience -> (token, expires_at, lifetime)
+        self._fetch_locks: Dict[Optional[str], threading.Lock] = {}
+        self._refreshing: set = set()
+
+    def get_token(self, audience: Optional[str]) -> str:
+        """
+        Get a token for the audience, fetching it only when there is no usable cached one
+        Args:
+            audience: Cloud Run service URL (None for a plain access token)
+        Returns:
+            Token string, or an empty string when no token could be obtained
+        """
+        token = self._cached_token(audience)
+        if token:
+            return token
+
+        # One blocking fetch per audience; concurrent callers wait and reuse its result
+        with self._fetch_lock(audience):
+            token = self._cached_token(audience)
+            if token:
+                return token
+            return self._fetch_and_store(audience)
+
+    async def get_token_async(self, audience: Optional[str]) -> str:
+        """Async variant of get_token: cache hits return immediately, fetches run in a worker thread"""
+        token = self._cached_token(audience)
+        if token:
+            return token
+        return await asyncio.to_thread(self.get_token, audience)
+
+    def invalidate(self, audience: Optional[str] = None) -> None:
+        """Drop the cached token for an audience (or all tokens), e.g. after a 401 response"""
+        with self._lock:
+            if audience is None:
+                self._tokens.clear()
+            else:
+                self._tokens.pop(audience, None)
+
+    def _cached_token(self, audience: Optional[str]) -> Optional[str]:
+        """Return the cached token if still valid, scheduling a background refresh when it is close to expiry"""
+        with self._lock:
+            cached = self._tokens.get(audience)
+        if not cached:
+            return None
+
+        token, expires_at, lifetime = cached
+        remaining = expires_at - time.time()
+        if remaining <= MIN_VALIDITY_SECONDS:
+            return None
+        if remaining <= min(self.refresh_margin, lifetime / 2):
+            self._refresh_in_background(audience)
+        return token
+
+    def _fetch_lock(self, audience: Optional[str]) -> threading.Lock:
+        with self._lock:
+            return self._fetch_locks.setdefault(audience, threading.Lock())
+
+    def _refresh_in_background(self, audience: Optional[str]) -> None:
+        with self._lock:
+            if audience in self._refreshing:
+                return
+            self._refreshing.add(audience)
+
+        def refresh():
+            try:
+                with self._fetch_lock(audience):
+                    self._fetch_and_store(audience)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(audience)
+
+        threading.Thread(target=refresh, name='token-refresh', daemon=True).start()
+
+    def _fetch_and_store(self, audience: Optional[str]) -> str:
+        token, expires_at = self._fetch(audience)
+        if token:
+            with self._lock:
+                self._tokens[audience] = (token, expires_at, expires_at - time.time())
+        return token
+
+    def _fetch(self, audience: Optional[str]) -> Tuple[str, float]:
+        """Fetch a new identity token (access token as fallback) and its expiry time"""
+        try:
+            from google.auth import default
+            from google.auth.transport.requests import Request
+            import google.oauth2.id_token
+
+            # For Cloud Run services, we need an identity token, not an access token
+            # The audience should be the URL of the Cloud Run service
+            if audience:
+                try:
+                    token = google.oauth2.id_token.fetch_id_token(Request(), audience)
+                    logger.info("Successfully obtained identity token for Cloud Run authentication")
+                    return token, _token_expiry(token) or time.time() + DEFAULT_TOKEN_TTL_SECONDS
+                except Exception as id_token_error:
+                    logger.warning(f"Failed to get identity token: {id_token_error}")
+                    # Fallback to access token method
+
+            # Fallback to access token method (may not work for Cloud Run)
+            credentials, _ = default()
+            credentials.refresh(Request())
+            logger.warning("Using access token instead of identity token - this may cause 401 errors")
+            return credentials.token, time.time() + self.fallback_ttl
+
+        except Exception as e:
+            logger.error(f"Error getting authentication token: {str(e)}")
+            logger.error(traceback.format_exc())
+            return "", 0.0
+
+
+# Shared by every FinancialAnalysisTrigger in this process
+token_provider = TokenProvider()
@@ -5,9 +5,10 @@ Enhanced bulk email sending functions for Mailgun
 import os
 import logging
 from typing import Dict, List, Any
-import requests
 import time
 
+import http_client
+
 logger = logging.getLogger(__name__)
 
 MAILGUN_API_KEY = os.environ.get('MAILGUN_API_KEY')
@@ -49,7 +50,8 @@ def send_bulk_emails_batch(recipients: List[str], analysis: Dict[str, Any]) -> D
         }
         
         # Send batch request to Mailgun
-        response = requests.post(
+        # Not retried: a timed-out send may already have gone out
+        response = http_client.post(
             f'https://api.eu.mailgun.net/v3/{MAILGUN_DOMAIN}/messages',
             auth=('api', MAILGUN_API_KEY),
             data=data,
@@ -5,6 +5,7 @@ This ensures 100% consistency in formatting, sending logic, and error handling
 """
 
 import os
+import functools
 import json
 import base64
 import logging
@@ -12,6 +13,7 @@ from google.cloud import firestore
 import functions_framework
 from email_formatters_comprehensive import format_analysis_for_email_comprehensive
 from bulk_email import send_bulk_emails_batch
+import http_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,8 +22,12 @@ logger = logging.getLogger(__name__)
 # Environment variables
 PROJECT_ID = os.environ.get('GCP_PROJECT', 'lab-quoriant-dev')
  
-# Initialize Firestore client
-db = firestore.Client(project=PROJECT_ID)
+# Clients are created on first use, so importing this module (cold start) does not pay for them
+@functools.lru_cache(maxsize=None)
+def get_db() -> firestore.Client:
+    """Shared Firestore client"""
+    return firestore.Client(project=PROJECT_ID)
+
 
 @functions_framework.cloud_event
 def process_email_request(cloud_event):
@@ -52,7 +58,7 @@ def process_email_request(cloud_event):
                 return False
             
             # Fetch the analysis from Firestore with all subcollection data
-            analysis_doc = db.collection('financial_analysis').document(analysis_id).get()
+            analysis_doc = get_db().collection('financial_analysis').document(analysis_id).get()
             
             if not analysis_doc.exists:
                 logger.error(f"Analysis not found: {analysis_id}")
@@ -62,7 +68,7 @@ def process_email_request(cloud_event):
             analysis_data['id'] = analysis_id
 
             # Fetch all subcollection documents from 'data' collection
-            data_collection = db.collection('financial_analysis').document(analysis_id).collection('data')
+            data_collection = get_db().collection('financial_analysis').document(analysis_id).collection('data')
             data_docs = data_collection.get()
             
             # Add each subcollection document to the analysis data
@@ -77,6 +83,7 @@ def process_email_request(cloud_event):
                 logger.warning("No recipients provided for bulk email")
                 return False
             result = send_bulk_emails_batch(recipients, analysis_formatted)
+            http_client.log_latency_metrics(logger.info, reset=True)
 
             success = result.get('success', False)
             
@@ -10,13 +10,18 @@ Designed to handle:
 """
 
 import os
+import functools
+import json
+import hashlib
 import datetime
 import logging
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from pydantic import BaseModel
 from google.cloud import firestore
 import functions_framework
 
+import http_client
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -26,8 +31,21 @@ PROJECT_ID = os.environ.get('GCP_PROJECT', 'lab-quoriant-dev')
 EMAIL_TOPIC = os.environ.get('EMAIL_PUBSUB_TOPIC')
 ALPHAVANTAGE_API_KEY = os.environ.get('ALPHAVANTAGE_API_KEY')
 
-# Initialize clients
-db = firestore.Client(project=PROJECT_ID)
+# Consolidated snapshots: 'latest' holds all five series as date/value arrays (plus their content hashes),
+# the per-day documents only hold the points that were added, revised or removed on that day
+SNAPSHOT_COLLECTION = 'global_us_data_snapshots'
+LATEST_SNAPSHOT_ID = 'latest'
+# Oldest date kept in the snapshot (YYYY-MM-DD); empty keeps the full history
+SNAPSHOT_HISTORY_START = os.environ.get('SNAPSHOT_HISTORY_START', '')
+# Also write the per-indicator documents read by consumers deployed before the snapshot existed
+WRITE_PER_INDICATOR_DOCUMENTS = os.environ.get('WRITE_PER_INDICATOR_DOCUMENTS', 'true').lower() == 'true'
+
+# Clients are created on first use, so importing this module (cold start) does not pay for them
+@functools.lru_cache(maxsize=None)
+def get_db() -> firestore.Client:
+    """Shared Firestore client"""
+    return firestore.Client(project=PROJECT_ID)
+
 
 class GlobalUSCPIDataModel(BaseModel):
     """Model for global US Consumer Price Index (CPI) data"""
@@ -85,7 +103,7 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(self.apis["alpha_vantage"]["base_url"], params=params)
+            response = http_client.get(self.apis["alpha_vantage"]["base_url"], params=params)
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data:
@@ -117,7 +135,7 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(self.apis["alpha_vantage"]["base_url"], params=params)
+            response = http_client.get(self.apis["alpha_vantage"]["base_url"], params=params)
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data:
@@ -149,7 +167,7 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(self.apis["alpha_vantage"]["base_url"], params=params)
+            response = http_client.get(self.apis["alpha_vantage"]["base_url"], params=params)
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data:
@@ -181,7 +199,7 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(self.apis["alpha_vantage"]["base_url"], params=params)
+            response = http_client.get(self.apis["alpha_vantage"]["base_url"], params=params)
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data:
@@ -213,7 +231,7 @@ class FinancialDataTool:
             }
             retrieved_data = []
 
-            response = requests.get(self.apis["alpha_vantage"]["base_url"], params=params)
+            response = http_client.get(self.apis["alpha_vantage"]["base_url"], params=params)
             if response.status_code == 200:
                 data = response.json()
                 if "data" in data:
@@ -236,6 +254,61 @@ class FinancialDataTool:
 financial_data_tool = FinancialDataTool()
 
 
+def fetch_all_global_us_data() -> dict:
+    """
+    Fetch the five indicators from Alpha Vantage concurrently
+    Returns: Document name -> list of models (empty list when the fetch failed)
+    """
+    fetchers = {
+        'inflation': financial_data_tool.get_global_us_inflation_data,
+        'cpi': financial_data_tool.get_global_us_cpi_data,
+        'federal_funds_rate': financial_data_tool.get_global_us_federal_funds_rate_data,
+        'retail_sales': financial_data_tool.get_global_us_retail_sales_data,
+        'unemployment': financial_data_tool.get_global_us_unemployment_data,
+    }
+    with ThreadPoolExecutor(max_workers=len(fetchers)) as executor:
+        futures = {name: executor.submit(fetch) for name, fetch in fetchers.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def to_snapshot_series(data: list) -> dict:
+    """
+    Compact a series into parallel date/value arrays
+    Args: data: List of Global US *DataModel rows
+    Returns: {'dates': [...], 'values': [...]} limited to SNAPSHOT_HISTORY_START onwards
+    """
+    rows = [row for row in data if not SNAPSHOT_HISTORY_START or row.date >= SNAPSHOT_HISTORY_START]
+    return {
+        'dates': [row.date for row in rows],
+        'values': [row.value for row in rows]
+    }
+
+
+def series_hash(data: list) -> str:
+    """Content hash of a fetched series, used to skip writing series that did not change"""
+    payload = json.dumps([[row.date, row.value] for row in data], separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def compute_series_delta(previous: dict, current: dict) -> dict:
+    """
+    Points that differ between two snapshot series
+    Args:
+        previous: {'dates': [...], 'values': [...]} of the last snapshot (empty dict for none)
+        current: {'dates': [...], 'values': [...]} just fetched
+    Returns: {'dates': [...], 'values': [...], 'removed': [...]} with new or revised points and removed dates;
+        all lists are empty when nothing changed
+    """
+    previous_points = dict(zip(previous.get('dates', []), previous.get('values', [])))
+    current_points = dict(zip(current['dates'], current['values']))
+    changed = [(date, value) for date, value in current_points.items() if previous_points.get(date) != value]
+    return {
+        'dates': [date for date, _ in changed],
+        'values': [value for _, value in changed],
+        'removed': [date for date in previous_points if date not in current_points]
+    }
+
+
 @functions_framework.cloud_event
 def refresh_global_us_data(cloud_event):
     """
@@ -244,79 +317,83 @@ def refresh_global_us_data(cloud_event):
     try:
         logger.info("🔍 Starting daily data check")       
         today = datetime.datetime.now().strftime("%Y-%m-%d") 
-
-        # Fetch global US data metrics
-        inflation_data = financial_data_tool.get_global_us_inflation_data()
-        cpi_data = financial_data_tool.get_global_us_cpi_data()
-        federal_funds_rate_data = financial_data_tool.get_global_us_federal_funds_rate_data()
-        retail_sales_data = financial_data_tool.get_global_us_retail_sales_data()
-        unemployment_data = financial_data_tool.get_global_us_unemployment_data()
-
-        # Save data to Firestore
-        if len(inflation_data) > 0:
-            db.collection('global_us_data').document('inflation').set({
-                'data': [data.model_dump() for data in inflation_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            db.collection('global_us_data').document('inflation').collection("history").document(today).set({
-                'data': [data.model_dump() for data in inflation_data],
+        db = get_db()
+
+        # Fetch global US data metrics (the five Alpha Vantage calls run concurrently)
+        all_data = fetch_all_global_us_data()
+        http_client.log_latency_metrics(logger.info, reset=True)
+        if not any(all_data.values()):
+            logger.error("❌ No global US data fetched, nothing saved")
+            return
+
+        latest_ref = db.collection(SNAPSHOT_COLLECTION).document(LATEST_SNAPSHOT_ID)
+        latest = latest_ref.get()
+        latest_data = latest.to_dict() if latest.exists else {}
+        previous_series = latest_data.get('series', {})
+        previous_hashes = latest_data.get('hashes', {})
+
+        # Indicators that failed today keep their last known values
+        series = {name: previous_series[name] for name in all_data if name in previous_series}
+        hashes = {name: previous_hashes[name] for name in all_data if name in previous_hashes}
+        changes = {}
+
+        # All writes go into one batch; unchanged series are not written at all
+        batch = db.batch()
+        for name, data in all_data.items():
+            if len(data) == 0:
+                logger.warning(f"⚠️ No {name} data to save")
+                continue
+
+            content_hash = series_hash(data)
+            if content_hash == previous_hashes.get(name) and name in previous_series:
+                logger.info(f"⏭️ {name} unchanged, skipping")
+                continue
+
+            series[name] = to_snapshot_series(data)
+            hashes[name] = content_hash
+            delta = compute_series_delta(previous_series.get(name, {}), series[name])
+
+            # The full per-indicator document follows every hash change, even one outside the snapshot window
+            if WRITE_PER_INDICATOR_DOCUMENTS:
+                batch.set(db.collection('global_us_data').document(name), {
+                    'data': [row.model_dump() for row in data],
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                })
+
+            if not (delta['dates'] or delta['removed']):
+                # Only outside the snapshot window (or a snapshot written before hashes existed): no history delta
+                logger.info(f"✅ {name} changed outside the snapshot window")
+                continue
+            changes[name] = delta
+
+            if WRITE_PER_INDICATOR_DOCUMENTS:
+                batch.set(db.collection('global_us_data').document(name).collection("history").document(today), {
+                    'changes': delta,
+                    'previous_date': latest_data.get('date'),
+                    'timestamp': firestore.SERVER_TIMESTAMP
+                })
+            logger.info(f"✅ {name}: {len(delta['dates'])} new or revised points, {len(delta['removed'])} removed")
+
+        if hashes == previous_hashes and not changes:
+            logger.info("✅ Completed daily check, all series unchanged - nothing written")
+            return
+
+        batch.set(latest_ref, {
+            'date': today,
+            'series': series,
+            'hashes': hashes,
+            'timestamp': firestore.SERVER_TIMESTAMP
+        })
+        if changes:
+            batch.set(db.collection(SNAPSHOT_COLLECTION).document(today), {
+                'date': today,
+                'previous_date': latest_data.get('date'),
+                'changes': changes,
                 'timestamp': firestore.SERVER_TIMESTAMP
             })
-            logger.info("✅ Saved inflation data to Firestore")
-        else:
-            logger.warning("⚠️ No inflation data to save")
-            
-        if len(cpi_data) > 0:
-            db.collection('global_us_data').document('cpi').set({
-                'data': [data.model_dump() for data in cpi_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            db.collection('global_us_data').document('cpi').collection("history").document(today).set({
-                'data': [data.model_dump() for data in cpi_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            logger.info("✅ Saved CPI data to Firestore")
-        else:
-            logger.warning("⚠️ No CPI data to save")
-            
-        if len(federal_funds_rate_data) > 0:
-            db.collection('global_us_data').document('federal_funds_rate').set({
-                'data': [data.model_dump() for data in federal_funds_rate_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            db.collection('global_us_data').document('federal_funds_rate').collection("history").document(today).set({
-                'data': [data.model_dump() for data in federal_funds_rate_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            logger.info("✅ Saved federal funds rate data to Firestore")
-        else:
-            logger.warning("⚠️ No federal funds rate data to save")
-            
-        if len(retail_sales_data) > 0:
-            db.collection('global_us_data').document('retail_sales').set({
-                'data': [data.model_dump() for data in retail_sales_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            db.collection('global_us_data').document('retail_sales').collection("history").document(today).set({
-                'data': [data.model_dump() for data in retail_sales_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            logger.info("✅ Saved retail sales data to Firestore")
-        else:
-            logger.warning("⚠️ No retail sales data to save")
-            
-        if len(unemployment_data) > 0:
-            db.collection('global_us_data').document('unemployment').set({
-                'data': [data.model_dump() for data in unemployment_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            db.collection('global_us_data').document('unemployment').collection("history").document(today).set({
-                'data': [data.model_dump() for data in unemployment_data],
-                'timestamp': firestore.SERVER_TIMESTAMP
-            })
-            logger.info("✅ Saved unemployment data to Firestore")
-        else:
-            logger.warning("⚠️ No unemployment data to save")
+
+        write_results = batch.commit()
+        logger.info(f"✅ Saved changes for {sorted(changes)} to Firestore in one batch of {len(write_results)} writes")
 
         logger.info(f"✅ Completed daily check")
     except Exception as e:
@@ -1,53 +1,53 @@
 #!/usr/bin/env python3
 # cloud_function_reel.py — FAST IG-style reel for GCP Cloud Functions (2nd gen)
 
-import os, functools, json, base64, logging
-from typing import Dict, List, Any, Optional
+from __future__ import annotations
+
+import os, functools, json, base64, hashlib, logging, shutil, subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Any, Optional
 from pathlib import Path
 from uuid import uuid4
 
 import numpy as np
 import pandas as pd
-import requests
-
-# ---- Matplotlib (used once)
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-plt.rcParams["figure.dpi"] = 100
-plt.rcParams["savefig.dpi"] = 100
+import http_client
 
 # ---- Pillow / ANTIALIAS compat
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, Image as PILImage
 if not hasattr(PILImage, "ANTIALIAS"):
     PILImage.ANTIALIAS = PILImage.Resampling.LANCZOS
 
-# ---- MoviePy + FFmpeg
-from moviepy.editor import (
-    VideoClip, ImageClip, concatenate_videoclips,
-    AudioFileClip, AudioClip, CompositeAudioClip
-)
-import imageio_ffmpeg
-os.environ["IMAGEIO_FFMPEG_EXE"] = imageio_ffmpeg.get_ffmpeg_exe()
-
-# ---- GCS
-from google.cloud import storage
-
 # ---- Functions Framework
 import functions_framework
 
+# Matplotlib, MoviePy (+ FFmpeg) and the GCS client are imported on first use (see lazy loaders below),
+# so a cold start only pays for them when a reel is actually rendered
+if TYPE_CHECKING:
+    from moviepy.editor import ImageClip, VideoClip
+
 # IG integration
 import time
-import requests
 from typing import Optional
 
-GRAPH_BASE = "https://graph.facebook.com/v23.0"  # use latest available for you
+GRAPH_HOST = os.environ.get("IG_GRAPH_HOST", "https://graph.facebook.com")  # tools/graph_api_stub.py locally
+GRAPH_BASE = f"{GRAPH_HOST}/v23.0"  # use latest available for you
 
 IG_USER_ID = os.environ.get("IG_USER_ID", "17841476999950783")         # e.g. "17841400000000000"
 IG_ACCESS_TOKEN = os.environ.get("IG_ACCESS_TOKEN")  # long-lived token recommended
 if not IG_ACCESS_TOKEN:
     logging.warning("IG_ACCESS_TOKEN not set; IG publishing will fail.")
 
+# "inline": wait for Meta's processing and publish inside render_reel (keeps the instance alive meanwhile);
+# "deferred": persist the container id and return, check_pending_reels (Cloud Scheduler) publishes it later
+IG_PUBLISH_MODE = os.environ.get("IG_PUBLISH_MODE", "inline").lower()
+PENDING_PUBLISH_PREFIX = "pending-publish/"  # one JSON record per container, in the reels bucket
+PENDING_POLL_INITIAL_SEC = 30                # first status check after the container was created
+PENDING_POLL_MAX_SEC = 600                   # backoff cap between status checks
+PENDING_PUBLISH_MAX_AGE_SEC = 6 * 3600       # give up on containers that never finish
+PENDING_CHECK_CONCURRENCY = 8
+PENDING_CLAIM_LEASE_SEC = 900                # a claimed record becomes due again if its publish never reported back
+
 # =============== CONFIG ===============
 W, H  = 1080, 1920               # portrait
 FPS   = 30                       # lower FPS => faster (24 is cinematic)
@@ -55,9 +55,19 @@ DUR_FALLBACK = 5.0              # if no TTS
 
 INTRO_SEC = 1
 OUTRO_SEC = 5
+OUTRO_TOP, OUTRO_BOTTOM = "Follow for daily updates", "veloryn.wadby.cloud"
 AUDIO_SAMPLERATE = 44100
 EPS = 1e-3
 
+# "ffmpeg": stream raw frames straight into ffmpeg; "moviepy": previous compose + write_videofile path
+RENDER_BACKEND = os.getenv("REEL_RENDER_BACKEND", "ffmpeg")
+VIDEO_BITRATE = "4500k"
+X264_PRESET = "ultrafast"        # speed!
+# Upload to GCS while ffmpeg encodes (fragmented MP4 piped into a resumable upload, no local file).
+# Off by default: the fragmented layout is not the classic faststart MP4 the IG Reels spec describes.
+STREAM_UPLOAD = os.getenv("REEL_STREAM_UPLOAD", "false").lower() == "true"
+GCS_CHUNK_SIZE = 8 * 1024 * 1024  # resumable upload chunk, multiple of 256 KiB
+
 BG_TOP  = (10, 10, 12)
 BG_BOT  = (18, 18, 22)
 LINE_CORE = (0, 255, 200)        # neon mint
@@ -66,6 +76,19 @@ LINE_WIDTH = 5
 GRID_ALPHA = 0.12
 ORB_BASE_RADIUS = 8
 
+CARD_W, CARD_H = 840, 120        # price card
+CARD_Y_FROM_BOTTOM = 320
+
+# Output cuts. The chart is rendered once for "reels"; other formats fit its chart panel (the axis plus
+# CHART_PANEL_MARGIN px above/below for tick labels) into chart_box = (x, y, width, height).
+FORMATS = {
+    "reels":     {"size": (W, H),        "title_y": 150, "subtitle_y": 230, "chart_box": None,                "card_bottom": CARD_Y_FROM_BOTTOM},
+    "square":    {"size": (1080, 1080),  "title_y": 70,  "subtitle_y": 130, "chart_box": (0, 165, 1080, 760), "card_bottom": 140},
+    "landscape": {"size": (1920, 1080),  "title_y": 70,  "subtitle_y": 130, "chart_box": (0, 165, 1920, 760), "card_bottom": 140},
+}
+CHART_PANEL_MARGIN = (40, 90)
+DEFAULT_FORMATS = [f.strip() for f in os.getenv("REEL_FORMATS", "reels").split(",") if f.strip()]
+
 AX_RECT = (0.2, 0.3, 0.76, 0.5)  # (left, bottom, width, height) in fig coords - added side padding
 
 FONT_DIR = Path(__file__).parent / "fonts"
@@ -79,10 +102,14 @@ FONT_REG_CANDIDATES = [
 
 ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY", "")
 DEFAULT_VOICE_ID = os.getenv("ELEVEN_VOICE_ID", "nPczCjzI2devNBz1zQrb") # Brian
+TTS_MODEL_ID = "eleven_monolingual_v1"
+TTS_VOICE_SETTINGS = {"stability": 0.4, "similarity_boost": 0.7}
+TTS_CACHE_PREFIX = "tts-cache/"  # GCS tier, in the reels bucket
 DEFAULT_BUCKET = "veloryn-ig-reels"
 
 TMP_DIR = Path("/tmp")
 TMP_DIR.mkdir(exist_ok=True)
+TTS_CACHE_DIR = TMP_DIR / "tts_cache"  # local tier, lives as long as the instance
 
 if not ELEVEN_API_KEY:
     logging.warning("ELEVENLABS_API_KEY not set; TTS will be disabled.")
@@ -97,38 +124,136 @@ def pick_font(candidates, size):
             except Exception: pass
     return ImageFont.load_default(size)
 
-FONT_TITLE = pick_font(FONT_BOLD_CANDIDATES, 72)
-FONT_NUM   = pick_font(FONT_BOLD_CANDIDATES, 64)
-FONT_BODY  = pick_font(FONT_REG_CANDIDATES, 48)
+FONT_SPECS = {
+    "title": (FONT_BOLD_CANDIDATES, 72),
+    "num":   (FONT_BOLD_CANDIDATES, 64),
+    "body":  (FONT_REG_CANDIDATES, 48),
+}
+
+@functools.lru_cache(maxsize=None)
+def get_font(kind: str, size: Optional[int] = None):
+    """Font for 'title', 'num' or 'body' (at its default size unless given), loaded on first use"""
+    candidates, default_size = FONT_SPECS[kind]
+    return pick_font(candidates, size or default_size)
+
+# =============== LAZY LOADERS ===============
+@functools.lru_cache(maxsize=1)
+def pyplot():
+    """Matplotlib pyplot with the Agg backend (used once per reel)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    plt.rcParams["figure.dpi"] = 100
+    plt.rcParams["savefig.dpi"] = 100
+    return plt
+
+@functools.lru_cache(maxsize=1)
+def ffmpeg_exe() -> str:
+    """Path of the FFmpeg binary bundled with imageio-ffmpeg"""
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+@functools.lru_cache(maxsize=1)
+def moviepy_editor():
+    """moviepy.editor, with the bundled FFmpeg binary configured first"""
+    os.environ["IMAGEIO_FFMPEG_EXE"] = ffmpeg_exe()
+    import moviepy.editor
+    return moviepy.editor
 
 def lerp(a, b, u): return a + (b - a) * u
 def ease(u): return u*u*(3 - 2*u)  # smoothstep
 
-@functools.lru_cache(maxsize=1)
-def gradient_bg():
-    arr = np.zeros((H, W, 3), dtype=np.uint8)
-    top = np.array(BG_TOP, dtype=np.float32)
-    bot = np.array(BG_BOT, dtype=np.float32)
-    for y in range(H):
-        a = y / (H-1)
-        arr[y, :, :] = (1-a)*top + a*bot
+# =============== ASSET CACHE ===============
+# Everything below is memoised per (content, size, colors) and shared by the intro, chart and outro,
+# so a warm instance renders each gradient, slate, card and text glyph once. Cached arrays are
+# read-only and cached images must not be drawn on: copy them first.
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
     return arr
 
+@functools.lru_cache(maxsize=8)
+def gradient_bg(size: tuple = (W, H), top: tuple = BG_TOP, bot: tuple = BG_BOT) -> np.ndarray:
+    """Vertical gradient (H,W,3) uint8, built with one broadcast"""
+    width, height = size
+    a = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None]
+    rows = (1 - a) * np.array(top, dtype=np.float32) + a * np.array(bot, dtype=np.float32)
+    return _frozen(np.ascontiguousarray(np.broadcast_to(rows.astype(np.uint8)[:, None, :], (height, width, 3))))
 
-def upload_to_gcs(local_path: Path) -> str:
-    client = storage.Client()
+@functools.lru_cache(maxsize=1024)
+def text_glyph(text: str, kind: str, size: Optional[int] = None, anchor: str = "la") -> tuple:
+    """
+    Rendered coverage mask of a text, cropped to its bounding box.
+    Returns (mask: L image, (dx, dy) offset of the mask from the anchor point).
+    """
+    font = get_font(kind, size)
+    left, top, right, bottom = font.getbbox(text, anchor=anchor)
+    mask = Image.new("L", (max(1, right - left), max(1, bottom - top)), 0)
+    ImageDraw.Draw(mask).text((-left, -top), text, font=font, fill=255, anchor=anchor)
+    return mask, (left, top)
+
+def draw_text(img: Image.Image, xy: tuple, text: str, kind: str, fill: tuple,
+              anchor: str = "la", size: Optional[int] = None) -> None:
+    """Same result as ImageDraw.text for integer xy, but the glyphs are rendered once per text/font"""
+    if not text:
+        return
+    mask, (dx, dy) = text_glyph(text, kind, size, anchor)
+    img.paste(fill, (xy[0] + dx, xy[1] + dy), mask)
+
+@functools.lru_cache(maxsize=32)
+def slate_frame(text_top: str, text_bottom: str, size: tuple = (W, H), bg: tuple = (0, 0, 0)) -> np.ndarray:
+    """Full slate frame: title and optional second line centred on a flat background"""
+    width, height = size
+    img = Image.new("RGB", size, bg)
+    draw_text(img, (width//2, height//2-40), text_top, "title", (240,240,240), anchor="mm")
+    draw_text(img, (width//2, height//2+60), text_bottom, "body", (180,180,180), anchor="mm")
+    return _frozen(np.array(img))
+
+@functools.lru_cache(maxsize=8)
+def card_template(size: tuple = (CARD_W, CARD_H), label: str = "Price") -> Image.Image:
+    """Blurred glass card (RGBA) with its static label, without the live numbers"""
+    card = Image.new("RGBA", size, (0,0,0,0))
+    ImageDraw.Draw(card).rounded_rectangle([0, 0, *size], 28, fill=(15,15,20,180), outline=(255,255,255,25), width=2)
+    card = card.filter(ImageFilter.GaussianBlur(2))
+    draw_text(card, (40, 40), label, "body", (160,160,170))
+    return card
+
+def warm_assets() -> None:
+    """Build the assets every reel uses, so the first request on an instance does not pay for them"""
+    gradient_bg()
+    card_template()
+    slate_frame(OUTRO_TOP, OUTRO_BOTTOM)
+    for kind in FONT_SPECS:
+        get_font(kind)
+    for char in "0123456789,.+-%":
+        text_glyph(char, "num")
+
+# cold start: instance initialisation is not billed per request, the first reel is
+warm_assets()
+
+@functools.lru_cache(maxsize=1)
+def gcs_bucket():
+    from google.cloud import storage
 
     if not DEFAULT_BUCKET:
         raise ValueError("No output_uri provided and GCS_BUCKET env var is not set.")
     bucket_name = DEFAULT_BUCKET.replace("gs://", "", 1).rstrip("/")
+    return storage.Client().bucket(bucket_name)
+
+def upload_to_gcs(local_path: Path) -> str:
+    bucket = gcs_bucket()
     blob_name = local_path.name  # default object key
 
-    bucket = client.bucket(bucket_name)
     blob = bucket.blob(blob_name)
     # content_type helps with correct serving headers
     blob.upload_from_filename(str(local_path), content_type="video/mp4")
 
-    return f"gs://{bucket_name}/{blob_name}"
+    return f"gs://{bucket.name}/{blob_name}"
+
+def open_gcs_upload(blob_name: str):
+    """Writable file object backed by a chunked resumable upload; the object exists once it is closed"""
+    blob = gcs_bucket().blob(blob_name)
+    return blob.open("wb", content_type="video/mp4", chunk_size=GCS_CHUNK_SIZE, ignore_flush=True)
 
 # =============== DATA ===============
 def load_df(data: List[Dict[str, Any]]) -> pd.DataFrame:
@@ -147,9 +272,11 @@ def render_chart_static(df: pd.DataFrame) -> dict:
     Render the chart ONCE with Matplotlib (neon + grid), without HUD/dot.
     Return dict with:
       - chart_full: (H,W,3) uint8 composited over gradient (static)
+      - chart_rgb: (H,W,3) uint8 chart on black, the base layer other formats are fitted from
       - ymin,ymax
       - ax_px: (left, top, width, height) in pixels
     """
+    plt = pyplot()
     plt.style.use("dark_background")
     fig = plt.figure(figsize=(W/100, H/100), dpi=100)
     ax = fig.add_axes(AX_RECT)
@@ -198,82 +325,295 @@ def render_chart_static(df: pd.DataFrame) -> dict:
 
     return {
         "chart_full": chart_full,
+        "chart_rgb": _frozen(np.ascontiguousarray(img)),
         "ymin": ymin, "ymax": ymax,
         "ax_px": (ax_left, ax_top, ax_w, ax_h),
     }
 
+def fit_chart_panel(chart_rgb: np.ndarray, ax_px: tuple, size: tuple, box: tuple) -> tuple:
+    """
+    Fit the chart panel of the reels render into box of a frame of another size.
+    Returns (revealed background (h,w,3) uint8, ax_px of the fitted axis in that frame).
+    """
+    ax_left, ax_top, ax_w, ax_h = ax_px
+    margin_top, margin_bottom = CHART_PANEL_MARGIN
+    panel = chart_rgb[ax_top - margin_top:ax_top + ax_h + margin_bottom]
+    ph, pw = panel.shape[:2]
+
+    bx, by, bw, bh = box
+    scale = min(bw / pw, bh / ph)
+    rw, rh = round(pw * scale), round(ph * scale)
+    resized = np.asarray(Image.fromarray(panel).resize((rw, rh), Image.Resampling.LANCZOS))
+    x0, y0 = bx + (bw - rw) // 2, by + (bh - rh) // 2
+
+    revealed = gradient_bg(size).copy()
+    target = revealed[y0:y0+rh, x0:x0+rw]
+    np.maximum(target, resized, target)
+    return revealed, (x0 + int(ax_left * scale), y0 + int(margin_top * scale), int(ax_w * scale), int(ax_h * scale))
+
 # =============== FAST ANIMATED CLIP ===============
-def make_chart_clip_fast(df: pd.DataFrame, title: str, subtitle: str, duration: float) -> VideoClip:
-    meta = render_chart_static(df)
-    chart_full = meta["chart_full"]
-    ymin, ymax = meta["ymin"], meta["ymax"]
-    ax_left, ax_top, ax_w, ax_h = meta["ax_px"]
-
-    n = len(df)
-
-    # pre-render glass card BG once (without numbers)
-    card_w, card_h = 840, 120
-    card = Image.new("RGBA", (card_w, card_h), (0,0,0,0))
-    cd = ImageDraw.Draw(card)
-    r = 28
-    cd.rounded_rectangle([0,0,card_w,card_h], r, fill=(15,15,20,180), outline=(255,255,255,25), width=2)
-    card_base = card.filter(ImageFilter.GaussianBlur(2))
-    card_x = W//2 - card_w//2
-    card_y = H - 320
-
-    def y_to_px(val: float) -> int:
-        # map price to pixel within axis rect (top-down)
-        norm = (ymax - val) / (ymax - ymin + 1e-12)
-        return int(ax_top + norm * ax_h)
+
+def build_chart_layers(df: pd.DataFrame, title: str, subtitle: str, chart: Optional[dict] = None,
+                       fmt: str = "reels") -> dict:
+    """
+    Pre-render everything that does not change between frames.
+    chart: render_chart_static result to reuse (only chart_rgb and ax_px are needed for other formats)
+    fmt: key of FORMATS
+    Return dict with:
+      - hidden / revealed: (h,w,3) uint8 full frames before / after the chart reveal,
+        both with title + subtitle already drawn
+      - card_hidden / card_revealed: the glass card (with its "Price" label) pre-composited
+        over the matching region of each full frame
+      - card_xy: (x, y) of the card, ax_px: (left, top, width, height) of the axis
+    """
+    spec = FORMATS[fmt]
+    width, height = spec["size"]
+    chart = chart or render_chart_static(df)
+    if spec["chart_box"] is None:
+        revealed_bg, ax_px = chart["chart_full"], chart["ax_px"]
+    else:
+        revealed_bg, ax_px = fit_chart_panel(chart["chart_rgb"], chart["ax_px"], spec["size"], spec["chart_box"])
+
+    def with_titles(arr: np.ndarray) -> np.ndarray:
+        img = Image.fromarray(arr)
+        draw_text(img, (width//2, spec["title_y"]), title, "title", (240,240,240), anchor="mm")
+        draw_text(img, (width//2, spec["subtitle_y"]), subtitle, "body", (220,220,220), anchor="mm")
+        return np.array(img)
+
+    hidden = with_titles(gradient_bg(spec["size"]))
+    revealed = with_titles(revealed_bg)
+
+    # glass card (cached template), composited once over each layer
+    card = card_template()
+    card_x, card_y = width//2 - CARD_W//2, height - spec["card_bottom"]
+
+    def card_over(arr: np.ndarray) -> np.ndarray:
+        region = Image.fromarray(arr[card_y:card_y+CARD_H, card_x:card_x+CARD_W]).convert("RGBA")
+        region.alpha_composite(card)
+        return np.array(region.convert("RGB"))
+
+    return {
+        "hidden": hidden, "revealed": revealed,
+        "card_hidden": card_over(hidden), "card_revealed": card_over(revealed),
+        "card_xy": (card_x, card_y),
+        "ax_px": ax_px,
+    }
+
+def make_chart_frame_renderer(df: pd.DataFrame, title: str, subtitle: str, duration: float,
+                              layers: Optional[dict] = None):
+    """
+    Build frame(t) for the animated chart.
+    Each call only touches what changed since the previous frame: the reveal strip between the
+    previous and current cut, and the price card. The returned array is one reused buffer, so
+    callers that keep frames must copy them (MoviePy writes/blits each frame immediately).
+    layers: result of build_chart_layers, when pre-rendered before the duration was known
+    """
+    layers = layers or build_chart_layers(df, title, subtitle)
+    hidden, revealed = layers["hidden"], layers["revealed"]
+    card_hidden, card_revealed = layers["card_hidden"], layers["card_revealed"]
+    card_x, card_y = layers["card_xy"]
+    ax_left, ax_top, ax_w, ax_h = layers["ax_px"]
+
+    closes = df["close"].to_numpy(dtype=float)
+    n = len(closes)
+    start = closes[0]
+
+    buf = hidden.copy()
+    state = {"cut": 0}
+    card_buf = buf[card_y:card_y+CARD_H, card_x:card_x+CARD_W]   # view into buf
 
     def frame(t: float) -> np.ndarray:
         u = ease(0 if duration <= 0 else min(1.0, max(0.0, t / duration)))
 
-        # progressive reveal: copy columns up to cut
+        # progressive reveal: only the columns between the previous and the current cut change
+        # (frames may be requested out of order, so the strip can also be hidden again)
         cut = int(ax_left + u * ax_w)
-        frame = gradient_bg().copy()
-        frame[:, :cut, :] = chart_full[:, :cut, :]
-
-        # head index/value and position
+        prev = state["cut"]
+        if cut > prev:
+            buf[:, prev:cut] = revealed[:, prev:cut]
+        elif cut < prev:
+            buf[:, cut:prev] = hidden[:, cut:prev]
+        state["cut"] = cut
+
+        # card background: revealed left of the cut, hidden right of it
+        card_cut = min(CARD_W, max(0, cut - card_x))
+        card_buf[:, :card_cut] = card_revealed[:, :card_cut]
+        card_buf[:, card_cut:] = card_hidden[:, card_cut:]
+
+        # price + % change at the head of the line
         idxf = max(0, min(n-1, int(round(u * (n-1)))))
-        price = float(df["close"].iloc[idxf])
-        y_px = y_to_px(price)
-        x_px = int(ax_left + (idxf / (n-1)) * ax_w)
-
-        # HUD + dot via PIL
-        pil = Image.fromarray(frame).convert("RGBA")
-        draw = ImageDraw.Draw(pil)
-        draw.text((W//2, 150), title, font=FONT_TITLE, fill=(240,240,240), anchor="mm")
-        if subtitle:
-            draw.text((W//2, 230), subtitle, font=FONT_BODY, fill=(220,220,220), anchor="mm")
-
-        # price + % change card
-        start = float(df["close"].iloc[0])
+        price = float(closes[idxf])
         chg_pct_total = (price - start)/start * 100.0
-        # animate number to current u position
-        chg_disp = chg_pct_total
-        price_txt = f"{price:,.2f}"
-        pct_txt   = f"{chg_disp:+.2f}%"
-        pct_color = (40, 220, 140) if chg_disp >= 0 else (240, 80, 80)
+        pct_color = (40, 220, 140) if chg_pct_total >= 0 else (240, 80, 80)
 
-        card_img = card_base.copy()
-        cd2 = ImageDraw.Draw(card_img)
-        cd2.text((40, 40), "Price", font=FONT_BODY, fill=(160,160,170))
-        cd2.text((200, 30), price_txt, font=FONT_NUM, fill=(245,245,245))
-        cd2.text((card_w - 40, 60), pct_txt, font=FONT_NUM, fill=pct_color, anchor="rm")
-        pil.alpha_composite(card_img, (card_x, card_y))
+        card_img = Image.fromarray(card_buf)
+        draw_text(card_img, (200, 30), f"{price:,.2f}", "num", (245,245,245))
+        draw_text(card_img, (CARD_W - 40, 60), f"{chg_pct_total:+.2f}%", "num", pct_color, anchor="rm")
+        card_buf[:] = np.asarray(card_img)
 
-        return np.array(pil.convert("RGB"))
+        return buf
 
-    return VideoClip(frame, duration=float(duration))
+    return frame
+
+def make_chart_clip_fast(df: pd.DataFrame, title: str, subtitle: str, duration: float,
+                         layers: Optional[dict] = None) -> VideoClip:
+    frame = make_chart_frame_renderer(df, title, subtitle, duration, layers)
+    return moviepy_editor().VideoClip(frame, duration=float(duration))
 
 def make_slate(text_top: str, text_bottom: str, seconds=0.6) -> ImageClip:
-    img = Image.new("RGB", (W,H), (0,0,0))
-    draw = ImageDraw.Draw(img)
-    draw.text((W//2, H//2-40), text_top,   font=FONT_TITLE, fill=(240,240,240), anchor="mm")
-    if text_bottom:
-        draw.text((W//2, H//2+60), text_bottom, font=FONT_BODY,  fill=(180,180,180), anchor="mm")
-    return ImageClip(np.array(img)).set_duration(seconds)
+    return moviepy_editor().ImageClip(slate_frame(text_top, text_bottom)).set_duration(seconds)
+
+# =============== RAW-FRAME FFMPEG BACKEND ===============
+def write_reel_ffmpeg(out_path: Optional[Path], segments: list, audio_path: Optional[Path] = None,
+                      audio_start: float = 0.0, stream_to=None, size: tuple = (W, H)) -> None:
+    """
+    Encode the reel in one ffmpeg pass, without MoviePy compositing.
+    segments: [(source, seconds), ...] in order; source is either a still (h,w,3) uint8 frame of the
+              given size, written as the same cached bytes for every frame, or frame(t) -> (h,w,3) uint8,
+              with t local to the segment
+    audio_path: optional narration, delayed by audio_start, padded with silence and cut to the video
+    stream_to: optional binary file object (e.g. open_gcs_upload) that receives a fragmented MP4
+               while it is being encoded, instead of out_path
+    """
+    frame_counts = [max(1, int(round(seconds * FPS))) for _, seconds in segments]
+    cmd = [
+        ffmpeg_exe(), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-r", str(FPS), "-i", "-",
+    ]
+    if audio_path:
+        cmd += ["-i", str(audio_path)]
+    cmd += [
+        "-map", "0:v", "-c:v", "libx264", "-preset", X264_PRESET, "-b:v", VIDEO_BITRATE,
+        "-pix_fmt", "yuv420p", "-threads", "0",
+        # faststart rewrites the finished file, so a streamed output has to be fragmented instead
+        "-movflags", "frag_keyframe+empty_moov+default_base_moof" if stream_to else "+faststart",
+    ]
+    if audio_path:
+        delay_ms = int(round(audio_start * 1000))
+        cmd += [
+            # explicit -t: "-shortest" overshoots with apad
+            "-map", "1:a", "-af", f"adelay={delay_ms}:all=1,apad", "-t", f"{sum(frame_counts) / FPS:.3f}",
+            "-c:a", "aac", "-ar", str(AUDIO_SAMPLERATE),
+        ]
+    cmd += ["-f", "mp4", "pipe:1"] if stream_to else [str(out_path)]
+
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                            stdout=subprocess.PIPE if stream_to else None)
+    pump, pool = None, None
+    if stream_to:
+        def pump_output():
+            try:
+                shutil.copyfileobj(proc.stdout, stream_to, GCS_CHUNK_SIZE)
+            finally:
+                proc.stdout.close()  # on upload errors ffmpeg gets EPIPE instead of blocking forever
+
+        # drain ffmpeg's output concurrently, otherwise a full stdout pipe blocks the frame writes
+        pool = ThreadPoolExecutor(max_workers=1)
+        pump = pool.submit(pump_output)
+    try:
+        for (source, _), n_frames in zip(segments, frame_counts):
+            if callable(source):
+                for i in range(n_frames):
+                    proc.stdin.write(memoryview(np.ascontiguousarray(source(i / FPS))))
+            else:
+                still = np.ascontiguousarray(source).tobytes()
+                for _ in range(n_frames):
+                    proc.stdin.write(still)
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its error is reported below
+    finally:
+        stderr = proc.stderr.read().decode("utf-8", "replace")
+        returncode = proc.wait()
+        if pool:
+            pool.shutdown()
+    if pump:
+        pump.result()  # re-raises upload errors first: they make ffmpeg fail too
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr.strip()[-2000:]}")
+
+def write_reel_moviepy(out_path: Path, df: pd.DataFrame, title: str, subtitle: str, chart_duration: float,
+                       audio_path: Optional[Path] = None, layers: Optional[dict] = None) -> None:
+    """Previous MoviePy compose path (REEL_RENDER_BACKEND=moviepy)"""
+    intro = make_slate(title, subtitle, seconds=INTRO_SEC)
+    chart = make_chart_clip_fast(df, title, subtitle, duration=chart_duration, layers=layers)
+    outro = make_slate(OUTRO_TOP, OUTRO_BOTTOM, seconds=OUTRO_SEC)
+
+    mpy = moviepy_editor()
+    final = mpy.concatenate_videoclips([intro, chart, outro], method="compose")
+
+    # Attach audio robustly
+    if audio_path and audio_path.exists():
+        narr = mpy.AudioFileClip(str(audio_path))
+        safe_narr = narr.subclip(0, max(0, narr.duration - EPS)).set_start(INTRO_SEC)
+        silence = mpy.AudioClip(lambda t: np.array([0.0, 0.0]), duration=final.duration, fps=AUDIO_SAMPLERATE)
+        final_audio = mpy.CompositeAudioClip([silence, safe_narr])
+        final = final.set_audio(final_audio)
+
+    final.write_videofile(
+        str(out_path),
+        fps=FPS,
+        codec="libx264",
+        audio_codec="aac",
+        preset=X264_PRESET,
+        threads=0,                    # let ffmpeg choose
+        bitrate=VIDEO_BITRATE,
+        ffmpeg_params=["-movflags", "+faststart"]
+    )
+
+def write_reel(out_path: Path, df: pd.DataFrame, title: str, subtitle: str, chart_duration: float,
+               audio_path: Optional[Path] = None, layers: Optional[dict] = None, stream_to=None,
+               fmt: str = "reels") -> None:
+    """
+    Intro slate + animated chart + outro slate (+ narration from the end of the intro) to an mp4
+    layers: pre-rendered build_chart_layers result for fmt (only the duration is applied here)
+    stream_to: file object receiving the video while it is encoded (ffmpeg backend only)
+    fmt: key of FORMATS; formats other than "reels" always use the ffmpeg backend
+    """
+    if audio_path and not audio_path.exists():
+        audio_path = None
+    size = FORMATS[fmt]["size"]
+    if RENDER_BACKEND == "moviepy" and fmt == "reels":
+        write_reel_moviepy(out_path, df, title, subtitle, chart_duration, audio_path, layers)
+        if stream_to:
+            with open(out_path, "rb") as f:
+                shutil.copyfileobj(f, stream_to, GCS_CHUNK_SIZE)
+        return
+    layers = layers or build_chart_layers(df, title, subtitle, fmt=fmt)
+    write_reel_ffmpeg(out_path, [
+        (slate_frame(title, subtitle, size), INTRO_SEC),
+        (make_chart_frame_renderer(df, title, subtitle, chart_duration, layers), chart_duration),
+        (slate_frame(OUTRO_TOP, OUTRO_BOTTOM, size), OUTRO_SEC),
+    ], audio_path=audio_path, audio_start=INTRO_SEC, stream_to=stream_to, size=size)
+
+# =============== MULTI-FORMAT ===============
+def _render_format(chart: dict, fmt: str, out_path: Path, df: pd.DataFrame, title: str, subtitle: str,
+                   chart_duration: float, audio_path: Optional[Path]) -> Path:
+    """Build one format's layers from the shared chart render and encode it"""
+    layers = build_chart_layers(df, title, subtitle, chart=chart, fmt=fmt)
+    write_reel(out_path, df, title, subtitle, chart_duration, audio_path, layers, fmt=fmt)
+    return out_path
+
+def start_format_workers(chart: dict, jobs: list) -> tuple:
+    """
+    Render extra formats in parallel worker threads.
+    jobs: [(fmt, out_path, df, title, subtitle, chart_duration, audio_path), ...]
+    The threads read the one chart render passed in (never modified), so nothing is copied; frames are
+    cheap layered composites and each format's encoding runs in its own ffmpeg subprocess.
+    Returns (pool, {fmt: future of the output path}); the caller shuts the pool down.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="reel-format")
+    return pool, {job[0]: pool.submit(_render_format, chart, *job) for job in jobs}
+
+def resolve_formats(requested: Optional[List[str]]) -> List[str]:
+    """Known formats from the payload (or REEL_FORMATS), always starting with "reels" for Instagram"""
+    formats = ["reels"]
+    for fmt in requested or DEFAULT_FORMATS:
+        if fmt not in FORMATS:
+            logging.warning(f"Unknown reel format {fmt!r}; known: {', '.join(FORMATS)}")
+        elif fmt not in formats:
+            formats.append(fmt)
+    return formats
 
 # =============== TTS (ElevenLabs) ===============
 def eleven_tts_to_file(text: str, out_path: Path, voice_id: Optional[str] = None) -> float:
@@ -282,18 +622,78 @@ def eleven_tts_to_file(text: str, out_path: Path, voice_id: Optional[str] = None
         raise RuntimeError("ELEVENLABS_API_KEY not set.")
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice}"
     headers = {"xi-api-key": ELEVEN_API_KEY, "accept": "audio/mpeg", "Content-Type": "application/json"}
-    payload = {"text": text, "model_id": "eleven_monolingual_v1",
-               "voice_settings": {"stability": 0.4, "similarity_boost": 0.7}}
-    with requests.post(url, headers=headers, json=payload, stream=True, timeout=60) as r:
+    payload = {"text": text, "model_id": TTS_MODEL_ID, "voice_settings": TTS_VOICE_SETTINGS}
+    with http_client.post(url, headers=headers, json=payload, stream=True, timeout=60, retries=2) as r:
         r.raise_for_status()
         with open(out_path, "wb") as f:
             for chunk in r.iter_content(1024 * 16):
                 if chunk: f.write(chunk)
-    clip = AudioFileClip(str(out_path))
+    clip = moviepy_editor().AudioFileClip(str(out_path))
     dur = float(clip.duration)
     clip.close()
     return dur
 
+def tts_cache_key(text: str, voice_id: Optional[str] = None) -> str:
+    """Content address of a narration: everything that changes the synthesized audio"""
+    request = {"text": text, "voice_id": voice_id or DEFAULT_VOICE_ID,
+               "model_id": TTS_MODEL_ID, "voice_settings": TTS_VOICE_SETTINGS}
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+def cached_tts_to_file(text: str, out_path: Path, voice_id: Optional[str] = None) -> float:
+    """
+    eleven_tts_to_file behind a content-addressed cache: /tmp first, then GCS, then ElevenLabs.
+    The measured duration is stored next to the audio (json file / blob metadata), so a cache hit
+    skips both the API call and the AudioFileClip probe. Returns the duration in seconds.
+    """
+    key = tts_cache_key(text, voice_id)
+    local_audio = TTS_CACHE_DIR / f"{key}.mp3"
+    local_meta = TTS_CACHE_DIR / f"{key}.json"
+
+    # 1) local tier
+    try:
+        duration = float(json.loads(local_meta.read_text())["duration"])
+        shutil.copyfile(local_audio, out_path)
+        logging.info(f"TTS cache hit (local): {key}")
+        return duration
+    except (OSError, ValueError, KeyError):
+        pass
+
+    # 2) GCS tier
+    bucket = None
+    blob_name = f"{TTS_CACHE_PREFIX}{key}.mp3"
+    try:
+        bucket = gcs_bucket()
+        blob = bucket.get_blob(blob_name)  # None when missing; loads the metadata in the same request
+        if blob is not None and "duration" in (blob.metadata or {}):
+            duration = float(blob.metadata["duration"])
+            blob.download_to_filename(str(out_path))
+            _store_local_tts(key, out_path, duration)
+            logging.info(f"TTS cache hit (GCS): {key}")
+            return duration
+    except Exception:
+        logging.exception("TTS cache lookup failed; synthesizing")
+
+    # 3) synthesize, then fill both tiers (cache write failures never fail the reel)
+    duration = eleven_tts_to_file(text, out_path, voice_id=voice_id)
+    _store_local_tts(key, out_path, duration)
+    if bucket is not None:
+        try:
+            blob = bucket.blob(blob_name)
+            blob.metadata = {"duration": f"{duration:.6f}"}
+            blob.upload_from_filename(str(out_path), content_type="audio/mpeg")
+        except Exception:
+            logging.exception("Failed to store TTS in the GCS cache")
+    return duration
+
+def _store_local_tts(key: str, audio_path: Path, duration: float) -> None:
+    try:
+        TTS_CACHE_DIR.mkdir(exist_ok=True)
+        shutil.copyfile(audio_path, TTS_CACHE_DIR / f"{key}.mp3")
+        # metadata last: its presence marks a complete entry
+        (TTS_CACHE_DIR / f"{key}.json").write_text(json.dumps({"duration": duration}))
+    except OSError:
+        logging.exception("Failed to store TTS in the local cache")
+
 
 def create_video_container(
     ig_user_id: str,
@@ -320,7 +720,7 @@ def create_video_container(
     if thumb_offset_ms is not None:
         payload["thumb_offset"] = thumb_offset_ms  # choose thumbnail frame (ms)
 
-    r = requests.post(url, data=payload, timeout=60)
+    r = http_client.post(url, data=payload, timeout=60)
     print(r.status_code, r.text)
     r.raise_for_status()
     data = r.json()
@@ -338,7 +738,7 @@ def wait_until_finished(container_id: str, access_token: str, timeout_sec: int =
     last_status = None
 
     while time.time() < deadline:
-        r = requests.get(url, params=params, timeout=30)
+        r = http_client.get(url, params=params, timeout=30)
         r.raise_for_status()
         status = r.json().get("status_code")
         if status != last_status:
@@ -360,7 +760,7 @@ def publish_media(ig_user_id: str, access_token: str, creation_id: str) -> str:
     Publishes the processed container and returns the new media ID.
     Retries on transient 5xx / code 1 errors and treats 'already published' as success.
     """
-    url = f"https://graph.facebook.com/v21.0/{ig_user_id}/media_publish"
+    url = f"{GRAPH_HOST}/v21.0/{ig_user_id}/media_publish"
     payload = {"creation_id": creation_id, "access_token": access_token}
 
     # Small grace delay after FINISHED often helps avoid immediate 500s
@@ -368,7 +768,7 @@ def publish_media(ig_user_id: str, access_token: str, creation_id: str) -> str:
 
     backoff = INITIAL_BACKOFF_SEC
     for attempt in range(1, PUBLISH_MAX_ATTEMPTS + 1):
-        r = requests.post(url, data=payload, timeout=60)
+        r = http_client.post(url, data=payload, timeout=60)
         if r.ok:
             data = r.json()
             mid = data.get("id")
@@ -411,15 +811,142 @@ def try_find_recent_media_from_caption_or_created(ig_user_id: str, access_token:
     Best-effort: fetch recent media and return the newest ID.
     If publish actually succeeded despite the error, it should appear here quickly.
     """
-    url = f"https://graph.facebook.com/v21.0/{ig_user_id}/media"
+    url = f"{GRAPH_HOST}/v21.0/{ig_user_id}/media"
     params = {"fields": "id,caption,media_type,timestamp", "access_token": access_token, "limit": 5}
-    r = requests.get(url, params=params, timeout=30)
+    r = http_client.get(url, params=params, timeout=30)
     if not r.ok:
         return None
     items = r.json().get("data", [])
     return items[0]["id"] if items else None
 
 
+# =============== DEFERRED PUBLISH ===============
+def get_container_status(container_id: str, access_token: str) -> Optional[str]:
+    """Single status_code lookup of a media container (IN_PROGRESS, FINISHED, ERROR, EXPIRED, PUBLISHED)"""
+    r = http_client.get(f"{GRAPH_BASE}/{container_id}",
+                        params={"fields": "status_code", "access_token": access_token}, timeout=30)
+    r.raise_for_status()
+    return r.json().get("status_code")
+
+def next_poll_delay(attempts: int) -> float:
+    """Exponential backoff between status checks of one container"""
+    return min(PENDING_POLL_MAX_SEC, PENDING_POLL_INITIAL_SEC * 2 ** attempts)
+
+def save_pending_publish(creation_id: str, video_name: str) -> dict:
+    """Persist a created container so check_pending_reels can publish it once Meta has processed it"""
+    now = time.time()
+    record = {
+        "creation_id": creation_id,
+        "video_name": video_name,
+        "created_at": now,
+        "attempts": 0,
+        "next_check_at": now + PENDING_POLL_INITIAL_SEC,
+    }
+    blob = gcs_bucket().blob(f"{PENDING_PUBLISH_PREFIX}{creation_id}.json")
+    blob.upload_from_string(json.dumps(record), content_type="application/json")
+    return record
+
+def process_pending_publish(blob, now: float) -> str:
+    """
+    Advance one pending container: publish it when FINISHED, otherwise reschedule with backoff.
+    Returns the outcome: 'published', 'waiting', 'skipped' or 'failed'.
+
+    Before publishing, the record is claimed by rewriting it (generation precondition) with a lease of
+    PENDING_CLAIM_LEASE_SEC, and it is only deleted once the publish succeeded. If the instance dies in
+    between, the record becomes due again when the lease runs out and the next run retries it.
+    """
+    from google.api_core.exceptions import NotFound, PreconditionFailed
+
+    try:
+        record = json.loads(blob.download_as_bytes())
+    except NotFound:
+        return "skipped"  # handled by an overlapping run since the listing
+    creation_id = record["creation_id"]
+    if record.get("next_check_at", 0) > now:
+        return "skipped"
+
+    def reschedule(error: Optional[str] = None) -> str:
+        record.pop("claimed_at", None)
+        record["attempts"] = record.get("attempts", 0) + 1
+        record["next_check_at"] = now + next_poll_delay(record["attempts"])
+        if error:
+            record["last_error"] = error
+        blob.upload_from_string(json.dumps(record), content_type="application/json")
+        return "waiting"
+
+    def drop(reason: str) -> str:
+        logging.error(f"Dropping pending reel {creation_id} ({record.get('video_name')}): {reason}")
+        blob.delete()
+        return "failed"
+
+    try:
+        status = get_container_status(creation_id, IG_ACCESS_TOKEN)
+    except Exception as e:
+        logging.warning(f"Status check failed for container {creation_id}: {e}")
+        status = None
+        if now - record["created_at"] <= PENDING_PUBLISH_MAX_AGE_SEC:
+            return reschedule(str(e))
+
+    if status in {"ERROR", "EXPIRED"}:
+        return drop(f"container status {status}")
+    if status == "PUBLISHED":
+        # Published by a run that died before removing the record
+        logging.info(f"Container {creation_id} ({record.get('video_name')}) is already published")
+        blob.delete()
+        return "published"
+    if status != "FINISHED":
+        if now - record["created_at"] > PENDING_PUBLISH_MAX_AGE_SEC:
+            return drop(f"still {status} after {PENDING_PUBLISH_MAX_AGE_SEC}s")
+        return reschedule()
+
+    # Claim the record: an overlapping checker run fails the precondition and skips it, and the lease
+    # keeps it from being due again while this run publishes
+    record["claimed_at"] = now
+    record["next_check_at"] = now + PENDING_CLAIM_LEASE_SEC
+    try:
+        blob.upload_from_string(json.dumps(record), content_type="application/json",
+                                if_generation_match=blob.generation)
+    except (NotFound, PreconditionFailed):
+        return "skipped"
+
+    try:
+        media_id = publish_media(IG_USER_ID, IG_ACCESS_TOKEN, creation_id)
+    except Exception as e:
+        logging.exception(f"Publishing container {creation_id} failed")
+        return reschedule(str(e))
+    logging.info(f"Published reel {record.get('video_name')}: container {creation_id}, media {media_id}")
+
+    try:
+        blob.delete(if_generation_match=blob.generation)
+    except (NotFound, PreconditionFailed):
+        logging.warning(f"Pending record of container {creation_id} changed while it was published")
+    return "published"
+
+@functions_framework.cloud_event
+def check_pending_reels(cloud_event):
+    """
+    Scheduled follow-up for IG_PUBLISH_MODE=deferred (Cloud Scheduler -> ig-reels-publish-check topic).
+    Checks every due container concurrently and returns a summary of the outcomes.
+    """
+    now = time.time()
+    blobs = list(gcs_bucket().list_blobs(prefix=PENDING_PUBLISH_PREFIX))
+    summary = {"pending": len(blobs), "published": 0, "waiting": 0, "skipped": 0, "failed": 0}
+
+    def check(blob) -> str:
+        try:
+            return process_pending_publish(blob, now)
+        except Exception:
+            logging.exception(f"Failed to process pending reel {blob.name}")
+            return "failed"
+
+    with ThreadPoolExecutor(max_workers=PENDING_CHECK_CONCURRENCY) as pool:
+        for outcome in pool.map(check, blobs):
+            summary[outcome] += 1
+
+    logging.info(f"Pending reels check: {summary}")
+    http_client.log_latency_metrics(logging.info, reset=True)
+    return summary
+
 # =============== HANDLER ===============
 @functions_framework.cloud_event
 def render_reel(cloud_event):
@@ -431,7 +958,8 @@ def render_reel(cloud_event):
       tts?: str,
       voice_id?: str,
       subtitle?: str,
-      duration?: float   # used only if no TTS
+      duration?: float,  # used only if no TTS
+      formats?: [str]    # extra cuts from FORMATS (default REEL_FORMATS); "reels" is always rendered
     }
     """
     try:
@@ -448,59 +976,74 @@ def render_reel(cloud_event):
     captions  = payload.get("captions", "")
     voice_id  = payload.get("voice_id")
     desired_duration = float(payload.get("duration", DUR_FALLBACK))
+    formats   = resolve_formats(payload.get("formats"))
 
     df = load_df(payload["data"])
 
-    # Generate TTS first (to drive chart duration)
+    # TTS drives the chart duration: download it in the background while everything that does not
+    # depend on the duration (chart render, layers, slates) is pre-rendered
     audio_path = None
     tts_duration = None
-    if tts_text:
-        try:
-            audio_path = TMP_DIR / "tts.mp3"
-            # raise Exception("TTS disabled for testing")  # --- IGNORE ---
-            tts_duration = eleven_tts_to_file(tts_text, audio_path, voice_id=voice_id)
-        except Exception:
-            logging.exception("TTS failed; continuing without audio.")
-            audio_path = None
-            tts_duration = None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        tts_future = None
+        if tts_text:
+            audio_path = TMP_DIR / f"tts_{uuid4()}.mp3"
+            tts_future = pool.submit(cached_tts_to_file, tts_text, audio_path, voice_id=voice_id)
+
+        chart = render_chart_static(df)  # rendered once, shared by every format
+        layers = build_chart_layers(df, title, subtitle, chart=chart)
+        slate_frame(title, subtitle)
+
+        if tts_future:
+            try:
+                tts_duration = tts_future.result()
+            except Exception:
+                logging.exception("TTS failed; continuing without audio.")
+                audio_path.unlink(missing_ok=True)
+                audio_path = None
+                tts_duration = None
 
     chart_duration = float(tts_duration) if tts_duration else desired_duration
 
-    # Build video timeline (FAST path)
-    intro = make_slate(title, subtitle, seconds=INTRO_SEC)
-    chart = make_chart_clip_fast(df, title, subtitle, duration=chart_duration)
-    outro = make_slate("Follow for daily updates", "veloryn.wadby.cloud", seconds=OUTRO_SEC)
-
-    final = concatenate_videoclips([intro, chart, outro], method="compose")
-
-    # Attach audio robustly
-    if audio_path and audio_path.exists():
-        narr = AudioFileClip(str(audio_path))
-        safe_narr = narr.subclip(0, max(0, narr.duration - EPS)).set_start(INTRO_SEC)
-        silence = AudioClip(lambda t: np.array([0.0, 0.0]), duration=final.duration, fps=AUDIO_SAMPLERATE)
-        final_audio = CompositeAudioClip([silence, safe_narr])
-        final = final.set_audio(final_audio)
-
-    # Write & upload
-    video_name = f"{title}_{uuid4()}.mp4"
+    # Render & upload (only the duration is patched into the pre-rendered layers).
+    # Extra formats render in worker threads while this thread renders the reels cut.
+    base_name = f"{title}_{uuid4()}"
+    video_name = f"{base_name}.mp4"
     out_local = TMP_DIR / video_name
-    final.write_videofile(
-        str(out_local),
-        fps=FPS,
-        codec="libx264",
-        audio_codec="aac",
-        preset="ultrafast",          # speed!
-        threads=0,                    # let ffmpeg choose
-        bitrate="4500k",
-        ffmpeg_params=["-movflags", "+faststart"]
-    )
-
-    gs_path = upload_to_gcs(out_local)
-    logging.info(f"Uploaded to {gs_path}")
+    extra_jobs = [(fmt, TMP_DIR / f"{base_name}_{fmt}.mp4", df, title, subtitle, chart_duration, audio_path)
+                  for fmt in formats[1:]]
+    pool, extra_futures = start_format_workers(chart, extra_jobs) if extra_jobs else (None, {})
+    outputs = []
+    try:
+        if STREAM_UPLOAD:
+            # no context manager: on errors the resumable session is abandoned instead of committing a partial video
+            upload = open_gcs_upload(video_name)
+            write_reel(out_local, df, title, subtitle, chart_duration, audio_path, layers, stream_to=upload)
+            upload.close()
+            logging.info(f"Uploaded to gs://{gcs_bucket().name}/{video_name}")
+        else:
+            write_reel(out_local, df, title, subtitle, chart_duration, audio_path, layers)
+            outputs.append(out_local)
+
+        for fmt, future in extra_futures.items():
+            try:
+                outputs.append(future.result())
+            except Exception:
+                logging.exception(f"Rendering the {fmt} format failed; continuing without it")
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    # Upload every rendered output in one concurrent pass
+    if outputs:
+        with ThreadPoolExecutor(max_workers=len(outputs)) as uploads:
+            for gs_path in uploads.map(upload_to_gcs, outputs):
+                logging.info(f"Uploaded to {gs_path}")
 
     # Cleanup
     try:
-        out_local.unlink(missing_ok=True)
+        for path in [out_local, *(job[1] for job in extra_jobs)]:
+            path.unlink(missing_ok=True)
         if audio_path: audio_path.unlink(missing_ok=True)
     except Exception:
         pass
@@ -528,12 +1071,19 @@ This system provides AI-generated analysis for educational and informational pur
     )
     print(f"Created container: {creation_id}")
 
+    if IG_PUBLISH_MODE == "deferred":
+        save_pending_publish(creation_id, video_name)
+        print(f"Container {creation_id} queued for publishing by check_pending_reels")
+        http_client.log_latency_metrics(logging.info, reset=True)
+        return
+
     print("Waiting for processing to finish...")
     wait_until_finished(creation_id, IG_ACCESS_TOKEN, timeout_sec=900, poll_sec=5)
 
     print("Publishing...")
     media_id = publish_media(IG_USER_ID, IG_ACCESS_TOKEN, creation_id)
     print(f"Done! Media ID: {media_id}")
+    http_client.log_latency_metrics(logging.info, reset=True)
 
     return
 
@@ -1,11 +1,13 @@
 import base64
 import json
 import os
-import requests
 from datetime import datetime, timedelta
 from google.cloud import bigquery
 import functions_framework
 
+import av_json
+import http_client
+
 ALPHAVANTAGE_API_KEY = os.environ.get('ALPHAVANTAGE_API_KEY')
 GCP_PROJECT = os.environ.get('GCP_PROJECT', 'veloryn-prod')
 
@@ -19,10 +21,10 @@ def get_news_sentiment(ticker: str, price_data: dict[str, dict[str, float]] = {}
     }
     retrieved_data = {}
 
-    response = requests.get(url, params=params)
+    response = http_client.get(url, params=params, stream=True)
     print(f"[{ticker}][NEWS_SENTIMENT]: Received data")
     if response.status_code == 200:
-        data = response.json()
+        data = av_json.get_json(response)
         if 'feed' in data:
             for item in data['feed']:
                 time_published = item.get('time_published')
@@ -81,20 +83,22 @@ def get_day_prices(ticker: str):
         'apikey': ALPHAVANTAGE_API_KEY,
     }
 
-    response = requests.get(url, params=params)
+    response = http_client.get(url, params=params, stream=True)
     print(f"[{ticker}][TIME_SERIES_DAILY]: Received data")
     if response.status_code == 200:
-        data = response.json()
+        data = av_json.get_json(response)
         if 'Time Series (Daily)' in data:
+            dates, columns = av_json.time_series_columns(data['Time Series (Daily)'])
             return {
-                timestamp: {
-                    'open': float(values['1. open']),
-                    'high': float(values['2. high']),
-                    'low': float(values['3. low']),
-                    'close': float(values['4. close']),
-                    'volume': int(values['5. volume'])
-                }
-                for timestamp, values in data['Time Series (Daily)'].items()
+                timestamp: {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+                for timestamp, open_, high, low, close, volume in zip(
+                    dates,
+                    map(float, columns.get('open', [])),
+                    map(float, columns.get('high', [])),
+                    map(float, columns.get('low', [])),
+                    map(float, columns.get('close', [])),
+                    map(int, columns.get('volume', []))
+                )
             }
         else:
             print(f"[{ticker}][TIME_SERIES_DAILY]: No 'Time Series (Daily)' key found in the response.")
@@ -116,10 +120,10 @@ def get_sma_ema_wma_dema_tema_trima_kama_mama_t3(ticker: str, price_data: dict[s
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}, {time_period}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         timestamp_adj = timestamp
@@ -145,10 +149,10 @@ def get_macd_apo_ppo_ultosc_bop_sar_trange_adosc_obv_htdcphase(ticker: str, pric
             'apikey': ALPHAVANTAGE_API_KEY,
         }
 
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params, stream=True)
         print(f"[{ticker}][{func}]: Received data")
         if response.status_code == 200:
-            data = response.json()
+            data = av_json.get_json(response)
             if f'Technical Analysis: {func}' in data:
                 for timestamp, values in data[f'Technical Analysis: {func}'].items():
                     timestamp_adj = timestamp
@@ -180,10 +184,10 @@ def get_stoch_stochf(ticker: str, price_data: dict[str, dict[str, float]] = {}):
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         if timestamp in price_data:
@@ -212,10 +216,10 @@ def get_httredmode(ticker: str, price_data: dict[str, dict[str, float]] = {}):
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         timestamp_adj = timestamp
@@ -247,10 +251,10 @@ def get_stochrsi_aroon_bbands(ticker: str, price_data: dict[str, dict[str, float
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}, {time_period}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         timestamp_adj = timestamp
@@ -284,10 +288,10 @@ def get_rsi_willr_adx_adxr_mom_cmo_roc_rocr_trix_cci_mfi_aroonsc_dx_minusdi_plus
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}, {time_period}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         timestamp_adj = timestamp
@@ -314,10 +318,10 @@ def get_ad(ticker: str, price_data: dict[str, dict[str, float]] = {}):
             'apikey': ALPHAVANTAGE_API_KEY,
         }
 
-        response = requests.get(url, params=params)
+        response = http_client.get(url, params=params, stream=True)
         print(f"[{ticker}][{func}]: Received data")
         if response.status_code == 200:
-            data = response.json()
+            data = av_json.get_json(response)
             if f'Technical Analysis: {func}' in data:
                 for timestamp, values in data[f'Technical Analysis: {func}'].items():
                     timestamp_adj = timestamp
@@ -345,10 +349,10 @@ def get_httredmode(ticker: str, price_data: dict[str, dict[str, float]] = {}):
                 'apikey': ALPHAVANTAGE_API_KEY,
             }
 
-            response = requests.get(url, params=params)
+            response = http_client.get(url, params=params, stream=True)
             print(f"[{ticker}][{func}]: Received data")
             if response.status_code == 200:
-                data = response.json()
+                data = av_json.get_json(response)
                 if f'Technical Analysis: {func}' in data:
                     for timestamp, values in data[f'Technical Analysis: {func}'].items():
                         timestamp_adj = timestamp
@@ -431,6 +435,7 @@ def execute_collection(cloud_event):
     print(f"[{ticker}]: Finished data collection, starting data insertion")
     save_to_bigquery(data, ticker, GCP_PROJECT, 'stock_data', 'daily_all')
     print(f"[{ticker}]: Finished data insertion")
+    http_client.log_latency_metrics(reset=True)
 
 if __name__ == "__main__":    
     ticker = 'ASTS'
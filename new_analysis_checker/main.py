@@ -10,6 +10,7 @@ Designed to handle:
 """
 
 import os
+import functools
 import json
 import logging
 from datetime import datetime, timedelta
@@ -28,16 +29,23 @@ ANALYSIS_BATCH_SIZE = int(os.environ.get('ANALYSIS_BATCH_SIZE', '50'))  # Proces
 LOOKBACK_HOURS = int(os.environ.get('LOOKBACK_HOURS', '24'))  # How far back to look for new analyses
 SUPPORTED_LANGUAGES = os.environ.get('LANGUAGES', 'en').split('#')
 
-# Initialize clients
-db = firestore.Client(project=PROJECT_ID)
-publisher = pubsub_v1.PublisherClient()
+# Clients are created on first use, so importing this module (cold start) does not pay for them
+@functools.lru_cache(maxsize=None)
+def get_db() -> firestore.Client:
+    """Shared Firestore client"""
+    return firestore.Client(project=PROJECT_ID)
+
+@functools.lru_cache(maxsize=None)
+def get_publisher() -> pubsub_v1.PublisherClient:
+    """Shared Pub/Sub publisher client"""
+    return pubsub_v1.PublisherClient()
 
 def get_topic_path():
     """Get the topic path and ensure topic exists"""
-    topic_path = publisher.topic_path(PROJECT_ID, EMAIL_TOPIC)
+    topic_path = get_publisher().topic_path(PROJECT_ID, EMAIL_TOPIC)
     try:
         # Try to get topic info to verify it exists
-        publisher.get_topic(request={"topic": topic_path})
+        get_publisher().get_topic(request={"topic": topic_path})
         logger.info(f"✅ Pub/Sub topic exists: {EMAIL_TOPIC}")
     except Exception as e:
         logger.warning(f"⚠️ Topic {EMAIL_TOPIC} may not exist: {str(e)}")
@@ -102,7 +110,7 @@ def get_new_analyses(since: datetime) -> List[Dict]:
         logger.info(f"Querying for analyses since: {since}")
         
         # Query Firestore for new analyses
-        analyses_ref = db.collection('financial_analysis')
+        analyses_ref = get_db().collection('financial_analysis')
         query = analyses_ref.where('created_at', '>', since).order_by('created_at')
         
         analyses = []
@@ -194,7 +202,7 @@ def get_users_by_tickers(tickers: Set[str]) -> Dict[str, Dict[str, List[str]]]:
     try:
         # Get all users (we need to scan all users since Firestore doesn't support 
         # complex queries on array elements)
-        users_ref = db.collection('users')
+        users_ref = get_db().collection('users')
         
         # Process users in batches to avoid memory issues
         batch_size = 1000
@@ -275,7 +283,7 @@ def send_email_notification(analysis: Dict, user_emails: List[str], language: st
         # Publish to Pub/Sub topic
         message_data = json.dumps(email_message).encode('utf-8')
         topic_path = get_topic_path()
-        future = publisher.publish(topic_path, message_data)
+        future = get_publisher().publish(topic_path, message_data)
         
         # Wait for publish to complete
         message_id = future.result(timeout=30)
@@ -0,0 +1,110 @@
+"""
+Fast Alpha Vantage JSON Decoding
+Streams response bodies as bytes and decodes them with orjson when it is installed (stdlib json otherwise)
+"""
+
+import json
+from typing import Any, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Chunk size used when streaming a response body
+CHUNK_SIZE = 64 * 1024
+
+# Name of the active decoder (for logging/benchmarks)
+DECODER = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data: bytes | str) -> Any:
+    """Decode a JSON document from bytes or text"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_body(response) -> bytes:
+    """
+    Read a requests response body as raw bytes
+    Args:
+        response: requests.Response, ideally requested with stream=True
+    Returns:
+        Complete body without decoding it to text first (no charset detection, no intermediate str)
+    """
+    return b''.join(response.iter_content(chunk_size=CHUNK_SIZE))
+
+
+def get_json(response) -> Any:
+    """Drop-in replacement for response.json() using the fast decoder on the raw body"""
+    return loads(read_body(response))
+
+
+def time_series_columns(time_series: Dict[str, Dict[str, str]]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    Split an Alpha Vantage 'Time Series (...)' / 'Technical Analysis: ...' mapping into columns
+    Args:
+        time_series: Mapping of date -> {'1. open': '...', '2. high': '...', ...}
+    Returns:
+        Tuple of (dates in payload order, column name without its 'N. ' prefix -> raw string values).
+        Values are left as strings so callers can convert a whole column at once (e.g. NumPy astype).
+    """
+    dates = list(time_series)
+    if not dates:
+        return [], {}
+
+    rows = list(time_series.values())
+    columns = {}
+    for key in rows[0]:
+        name = key.split('. ', 1)[1] if '. ' in key else key
+        columns[name] = [row[key] for row in rows]
+    return dates, columns
+
+
+def _benchmark_payloads() -> Dict[str, bytes]:
+    """Synthetic payloads shaped like the largest Alpha Vantage responses"""
+    def series(count: int, intraday: bool) -> Dict[str, Dict[str, str]]:
+        data = {}
+        for i in range(count):
+            date = f"{2000 + i // 336:04d}-{1 + (i // 28) % 12:02d}-{1 + i % 28:02d}"
+            if intraday:
+                date = f"{date} {i % 24:02d}:00:00"
+            data[date] = {
+                '1. open': f"{100 + i % 50:.4f}", '2. high': f"{101 + i % 50:.4f}",
+                '3. low': f"{99 + i % 50:.4f}", '4. close': f"{100.5 + i % 50:.4f}",
+                '5. volume': str(1000000 + i)
+            }
+        return data
+
+    news_item = {
+        'title': 'Headline ' * 8, 'url': 'https://example.com/article', 'time_published': '20240102T153000',
+        'authors': ['Author'], 'summary': 'Summary sentence. ' * 20, 'banner_image': None,
+        'source': 'Source', 'category_within_source': 'n/a', 'source_domain': 'example.com',
+        'topics': [{'topic': 'Technology', 'relevance_score': '0.5'}],
+        'overall_sentiment_score': 0.12, 'overall_sentiment_label': 'Neutral',
+        'ticker_sentiment': [
+            {'ticker': 'AAPL', 'relevance_score': '0.3', 'ticker_sentiment_score': '0.1',
+             'ticker_sentiment_label': 'Neutral'}
+        ] * 3
+    }
+
+    return {
+        'daily (full, 6000 bars)': json.dumps({'Time Series (Daily)': series(6000, False)}).encode(),
+        'intraday (60min, 1000 bars)': json.dumps({'Time Series (60min)': series(1000, True)}).encode(),
+        'news (1000 items)': json.dumps({'feed': [news_item] * 1000}).encode(),
+    }
+
+
+if __name__ == '__main__':
+    import timeit
+
+    runs = 20
+    print(f"Active decoder: {DECODER}")
+    for name, payload in _benchmark_payloads().items():
+        stdlib_ms = timeit.timeit(lambda: json.loads(payload.decode('utf-8')), number=runs) / runs * 1000
+        line = f"{name:<30} {len(payload) / 1024:8.0f} KiB  json: {stdlib_ms:7.2f} ms"
+        if orjson is not None:
+            fast_ms = timeit.timeit(lambda: orjson.loads(payload), number=runs) / runs * 1000
+            line += f"  orjson: {fast_ms:7.2f} ms  ({stdlib_ms / fast_ms:.1f}x)"
+        print(line)
@@ -0,0 +1,404 @@
+"""
+Shared Pooled HTTP Client
+Keep-alive connection pooling, compression, default timeouts, jittered retries, per-host latency metrics
+and one verifying TLS context with session resumption for requests (sync) and aiohttp (async)
+"""
+
+import functools
+import os
+import random
+import ssl
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict, deque
+from typing import TYPE_CHECKING, Any, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    import aiohttp
+
+# (connect, read) timeout in seconds applied when a call does not pass its own
+DEFAULT_TIMEOUT = (5, 60)
+
+# Connections kept alive per host
+POOL_MAXSIZE = 32
+
+# Retries: idempotent methods are retried by default, other methods only when a call passes retries=
+MAX_RETRIES = 3
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+RETRY_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+BACKOFF_BASE = 0.5  # seconds
+BACKOFF_MAX = 8.0
+
+# Latency samples kept per host for the percentiles
+METRICS_WINDOW = 512
+
+
+class _HostStats:
+    """Request counters and a rolling window of latencies for one host"""
+
+    __slots__ = ('requests', 'errors', 'retries', 'total_ms', 'max_ms', 'samples')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=METRICS_WINDOW)
+
+
+_stats: Dict[str, _HostStats] = defaultdict(_HostStats)
+_stats_lock = threading.Lock()
+
+
+def record_request(host: str, elapsed_ms: float, ok: bool) -> None:
+    """Record one HTTP attempt (elapsed time until the response headers arrived)"""
+    with _stats_lock:
+        stats = _stats[host]
+        stats.requests += 1
+        stats.errors += not ok
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.samples.append(elapsed_ms)
+
+
+def record_retry(host: str) -> None:
+    """Count an attempt that is going to be retried"""
+    with _stats_lock:
+        _stats[host].retries += 1
+
+
+def latency_metrics(reset: bool = False) -> Dict[str, Dict[str, Any]]:
+    """
+    Per-host latency metrics of this process
+    Args:
+        reset: Clear the counters after reading them
+    Returns:
+        Dict of host -> requests, errors, retries, avg_ms, p50_ms, p95_ms, max_ms
+    """
+    with _stats_lock:
+        snapshot = {}
+        for host, stats in _stats.items():
+            samples = sorted(stats.samples)
+            snapshot[host] = {
+                'requests': stats.requests,
+                'errors': stats.errors,
+                'retries': stats.retries,
+                'avg_ms': round(stats.total_ms / stats.requests, 1) if stats.requests else 0.0,
+                'p50_ms': round(samples[len(samples) // 2], 1) if samples else 0.0,
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 1) if samples else 0.0,
+                'max_ms': round(stats.max_ms, 1),
+            }
+        if reset:
+            _stats.clear()
+    return snapshot
+
+
+def log_latency_metrics(log=print, reset: bool = False) -> None:
+    """Write one line per host with its latency metrics"""
+    for host, metrics in latency_metrics(reset=reset).items():
+        log(f"HTTP {host}: " + ', '.join(f"{key}={value}" for key, value in metrics.items()))
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Full-jitter exponential backoff, honoring a numeric Retry-After header when the server sends one"""
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _retry_budget(method: str, retries: Optional[int]) -> int:
+    if retries is not None:
+        return retries
+    return MAX_RETRIES if method.upper() in RETRY_METHODS else 0
+
+
+# ---------------------------------------------------------------------------
+# TLS
+# ---------------------------------------------------------------------------
+
+class _SessionSavingSSLSocket(ssl.SSLSocket):
+    """SSLSocket that hands its TLS session back to the context before it is closed"""
+
+    def close(self):
+        if isinstance(self.context, _ResumingSSLContext):
+            self.context._save_session(self.server_hostname, self)
+        super().close()
+
+
+class _ResumingSSLContext(ssl.SSLContext):
+    """
+    Client context that offers the newest TLS session of a host to its next connection, so pool growth
+    and reconnects after an idle timeout resume the session instead of doing a full handshake
+    """
+
+    sslsocket_class = _SessionSavingSSLSocket
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        self._tls_lock = threading.Lock()
+        self._tls_connections = {}  # host -> weak references to its live TLS connections
+        self._tls_sessions = {}  # host -> newest session with a ticket
+
+    def _save_session(self, host: Optional[str], connection) -> None:
+        # TLS 1.3 tickets arrive after the handshake, so sessions are read from connections that have been used
+        session = connection.session if host else None
+        if session is not None and session.has_ticket:
+            with self._tls_lock:
+                self._tls_sessions[host] = session
+
+    def _resume(self, host: str) -> Optional[ssl.SSLSession]:
+        with self._tls_lock:
+            refs = self._tls_connections.get(host, [])
+            self._tls_connections[host] = [ref for ref in refs if ref() is not None]
+            live = [ref() for ref in self._tls_connections[host]]
+        for connection in live:
+            if connection is not None:
+                self._save_session(host, connection)
+        return self._tls_sessions.get(host)
+
+    def _track(self, host: str, connection) -> None:
+        with self._tls_lock:
+            self._tls_connections.setdefault(host, []).append(weakref.ref(connection))
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        client = server_hostname and not server_side
+        if client and session is None:
+            session = self._resume(server_hostname)
+        connection = super().wrap_socket(sock, server_side, do_handshake_on_connect, suppress_ragged_eofs,
+                                         server_hostname, session)
+        if client:
+            self._track(server_hostname, connection)
+        return connection
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        # used by asyncio (aiohttp) connections
+        client = server_hostname and not server_side
+        if client and session is None:
+            session = self._resume(server_hostname)
+        connection = super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+        if client:
+            self._track(server_hostname, connection)
+        return connection
+
+
+def ca_bundle_path() -> str:
+    """CA bundle requests verifies against (REQUESTS_CA_BUNDLE / CURL_CA_BUNDLE override certifi's)"""
+    from requests.utils import DEFAULT_CA_BUNDLE_PATH
+    return os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or DEFAULT_CA_BUNDLE_PATH
+
+
+@functools.lru_cache(maxsize=1)
+def ssl_context() -> ssl.SSLContext:
+    """
+    Verifying TLS context shared by every connection of this process
+    The CA bundle is parsed once here instead of on every new connection.
+    """
+    context = _ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)  # CERT_REQUIRED and hostname checks
+    context.load_verify_locations(cafile=ca_bundle_path())
+    return context
+
+
+# ---------------------------------------------------------------------------
+# Sync (requests)
+# ---------------------------------------------------------------------------
+
+class _SharedTLSAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools verify TLS with the shared context"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['ssl_context'] = ssl_context()
+        super().init_poolmanager(*args, **kwargs)
+
+    def cert_verify(self, conn, url, verify, cert):
+        # urllib3 loads a call's CA file and client certificate into the pool's context, which is the
+        # process-wide ssl_context(): accepting either would change trust for every later connection
+        if verify is False:
+            raise ValueError('http_client always verifies TLS (verify=False is not supported)')
+        if verify is not True and verify != ca_bundle_path():
+            raise ValueError(f"http_client only verifies against {ca_bundle_path()} "
+                             f"(verify={verify!r} is not supported)")
+        if cert:
+            raise ValueError('http_client does not support client certificates (cert= is not supported)')
+        super().cert_verify(conn, url, verify, cert)
+        # the shared context already holds this bundle; passing it again re-parses it per connection
+        conn.ca_certs = conn.ca_cert_dir = None
+
+
+@functools.lru_cache(maxsize=1)
+def get_session() -> requests.Session:
+    """Process-wide requests session with keep-alive pools (shared by all threads; no cookies are relied on)"""
+    session = requests.Session()
+    adapter = _SharedTLSAdapter(pool_connections=16, pool_maxsize=POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # requests already decompresses; make the accepted encodings explicit for every call
+    session.headers['Accept-Encoding'] = 'gzip, deflate'
+    return session
+
+
+def request(method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+    """
+    requests.request through the shared session
+    Args:
+        method: HTTP method
+        url: Request URL
+        retries: Retries on connection errors, timeouts and 429/5xx responses
+                 (default MAX_RETRIES for idempotent methods, 0 otherwise)
+        **kwargs: requests arguments; timeout defaults to DEFAULT_TIMEOUT
+    Returns:
+        The final response (status codes are not raised; the last retryable response is returned)
+    """
+    kwargs.setdefault('timeout', DEFAULT_TIMEOUT)
+    host = urlsplit(url).hostname
+    budget = _retry_budget(method, retries)
+
+    for attempt in range(budget + 1):
+        started = time.perf_counter()
+        try:
+            response = get_session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            record_request(host, (time.perf_counter() - started) * 1000, ok=False)
+            if attempt >= budget:
+                raise
+            record_retry(host)
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        record_request(host, (time.perf_counter() - started) * 1000, ok=response.status_code < 500)
+        if response.status_code in RETRY_STATUS and attempt < budget:
+            record_retry(host)
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            response.close()
+            time.sleep(delay)
+            continue
+        return response
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session (retried by default)"""
+    return request('GET', url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """POST through the shared session (not retried unless retries= is given)"""
+    return request('POST', url, **kwargs)
+
+
+def warm_pool(url: str, connections: int = 1, timeout: float = 5) -> int:
+    """
+    Open keep-alive connections to a host ahead of its first real calls (HEAD requests, errors ignored)
+    Args:
+        url: Any URL of the host
+        connections: Connections opened concurrently (capped at POOL_MAXSIZE)
+        timeout: Seconds per connection attempt
+    Returns:
+        Number of connections that were opened
+    """
+    def open_connection(_) -> bool:
+        try:
+            request('HEAD', url, retries=0, timeout=timeout, allow_redirects=False)
+            return True
+        except requests.RequestException:
+            return False
+
+    connections = max(0, min(connections, POOL_MAXSIZE))
+    if connections == 0:
+        return 0
+    with ThreadPoolExecutor(max_workers=connections) as pool:
+        return sum(pool.map(open_connection, range(connections)))
+
+
+# ---------------------------------------------------------------------------
+# Async (aiohttp)
+# ---------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=1)
+def _aiohttp():
+    """aiohttp is imported on first async use, so the sync-only functions never pay for it at cold start"""
+    import aiohttp
+    return aiohttp
+
+
+def _trace_config():
+    """aiohttp tracing hooks feeding the per-host metrics"""
+    aiohttp = _aiohttp()
+
+    async def on_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_end(session, context, params):
+        record_request(params.url.host, (time.perf_counter() - context.started) * 1000,
+                       ok=params.response.status < 500)
+
+    async def on_exception(session, context, params):
+        record_request(params.url.host, (time.perf_counter() - context.started) * 1000, ok=False)
+
+    config = aiohttp.TraceConfig()
+    config.on_request_start.append(on_start)
+    config.on_request_end.append(on_end)
+    config.on_request_exception.append(on_exception)
+    return config
+
+
+def create_async_session(ssl: Any = None, **kwargs) -> 'aiohttp.ClientSession':
+    """
+    aiohttp session with a keep-alive pool, DNS caching, compression, default timeouts and latency metrics
+    Args:
+        ssl: SSL context for the connector (default: the shared verifying ssl_context())
+        **kwargs: Extra aiohttp.ClientSession arguments
+    Returns:
+        New session; the caller owns it and closes it (sessions are bound to their event loop)
+    """
+    aiohttp = _aiohttp()
+    connector = aiohttp.TCPConnector(limit=POOL_MAXSIZE * 2, limit_per_host=POOL_MAXSIZE, ttl_dns_cache=300,
+                                     ssl=ssl if ssl is not None else ssl_context())
+    kwargs.setdefault('timeout', aiohttp.ClientTimeout(total=None, sock_connect=DEFAULT_TIMEOUT[0],
+                                                       sock_read=DEFAULT_TIMEOUT[1]))
+    kwargs.setdefault('auto_decompress', True)
+    headers = {'Accept-Encoding': 'gzip, deflate', **kwargs.pop('headers', {})}
+    return aiohttp.ClientSession(connector=connector, headers=headers, trace_configs=[_trace_config()], **kwargs)
+
+
+async def request_async(session: 'aiohttp.ClientSession', method: str, url: str, retries: Optional[int] = None,
+                        **kwargs) -> 'aiohttp.ClientResponse':
+    """
+    session.request with jittered retries on connection errors, timeouts and 429/5xx responses
+    Args:
+        session: Session from create_async_session (latency is recorded by its trace hooks)
+        method, url, **kwargs: aiohttp request arguments
+        retries: As for request()
+    Returns:
+        The final response; use it as `async with response:` so the connection is released
+    """
+    import asyncio
+    aiohttp = _aiohttp()
+
+    host = urlsplit(str(url)).hostname
+    budget = _retry_budget(method, retries)
+    for attempt in range(budget + 1):
+        try:
+            response = await session.request(method, url, **kwargs)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt >= budget:
+                raise
+            record_retry(host)
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status in RETRY_STATUS and attempt < budget:
+            record_retry(host)
+            delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+            response.release()
+            await asyncio.sleep(delay)
+            continue
+        return response
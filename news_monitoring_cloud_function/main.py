@@ -14,6 +14,9 @@ from google.cloud import firestore
 import logging
 import functions_framework
 
+import av_json
+import http_client
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -54,10 +57,10 @@ class NewsMonitoringService:
                 'apikey': self.api_key
             }
             
-            response = requests.get(self.base_url, params=params, timeout=30)
+            response = http_client.get(self.base_url, params=params, timeout=30, stream=True)
             response.raise_for_status()
             
-            data = response.json()
+            data = av_json.get_json(response)
             
             if "feed" in data:
                 logger.info(f"Successfully fetched {len(data['feed'])} news articles")
@@ -313,6 +316,7 @@ def news_monitoring_trigger(cloud_event):
     try:
         service = NewsMonitoringService()
         result = service.process_news_batch()
+        http_client.log_latency_metrics(logger.info, reset=True)
         
         if result['success']:
             logger.info(f"Successfully processed {result['processed_count']} news items")
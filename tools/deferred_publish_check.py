@@ -0,0 +1,205 @@
+"""
+Deferred Publish End-to-End Check
+Runs ig_reels_manager's check_pending_reels against tools/graph_api_stub.py with an in-memory bucket,
+including runs that die between claiming a record and removing it
+
+Usage: python tools/deferred_publish_check.py
+Exits non-zero when a scenario does not publish its container exactly once.
+"""
+
+import json
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS_DIR))
+sys.path.insert(0, str(TOOLS_DIR.parent / 'ig_reels_manager'))
+
+from graph_api_stub import GraphApiStub, serve  # noqa: E402
+
+STUB = GraphApiStub(polls_until_finished=3, fail_publishes=0)
+_server, os.environ['IG_GRAPH_HOST'] = serve(STUB)
+os.environ.setdefault('IG_ACCESS_TOKEN', 'stub-token')
+
+import main as reels  # noqa: E402
+from google.api_core.exceptions import NotFound, PreconditionFailed  # noqa: E402
+
+
+class FakeBlob:
+    """The google.cloud.storage.Blob calls check_pending_reels makes, with generation preconditions"""
+
+    def __init__(self, bucket: 'FakeBucket', name: str):
+        self.bucket = bucket
+        self.name = name
+        self.generation = bucket.objects.get(name, (None, None))[1]
+
+    def download_as_bytes(self) -> bytes:
+        with self.bucket.lock:
+            if self.name not in self.bucket.objects:
+                raise NotFound(self.name)
+            return self.bucket.objects[self.name][0]
+
+    def upload_from_string(self, data: str, content_type: Optional[str] = None,
+                           if_generation_match: Optional[int] = None) -> None:
+        with self.bucket.lock:
+            self.bucket.check(self.name, if_generation_match)
+            self.bucket.next_generation += 1
+            self.bucket.objects[self.name] = (data.encode('utf-8'), self.bucket.next_generation)
+            self.generation = self.bucket.next_generation
+
+    def delete(self, if_generation_match: Optional[int] = None) -> None:
+        with self.bucket.lock:
+            self.bucket.check(self.name, if_generation_match)
+            del self.bucket.objects[self.name]
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects: Dict[str, Tuple[bytes, int]] = {}
+        self.next_generation = 0
+        self.lock = threading.Lock()
+
+    def check(self, name: str, if_generation_match: Optional[int]) -> None:
+        if if_generation_match is None:
+            return
+        if name not in self.objects:
+            if if_generation_match == 0:
+                return
+            raise NotFound(name)
+        if self.objects[name][1] != if_generation_match:
+            raise PreconditionFailed(name)
+
+    def blob(self, name: str) -> FakeBlob:
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix: str = '') -> List[FakeBlob]:
+        with self.lock:
+            names = sorted(name for name in self.objects if name.startswith(prefix))
+        return [FakeBlob(self, name) for name in names]
+
+    def records(self) -> List[dict]:
+        return [json.loads(data) for data, _ in self.objects.values()]
+
+
+class FakeTime:
+    """Clock for main: moved forward by the scenarios, sleeps return immediately"""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        pass
+
+
+class InstanceDied(BaseException):
+    """Stands in for the instance being killed (not an Exception, so nothing in main catches it)"""
+
+
+def run_checks(clock: FakeTime, until_published: int = 12) -> List[Dict]:
+    """Run check_pending_reels once per poll interval until nothing is pending"""
+    summaries = []
+    for _ in range(until_published):
+        clock.now += reels.PENDING_POLL_MAX_SEC
+        summaries.append(reels.check_pending_reels(None))
+        if summaries[-1]['pending'] == 0:
+            break
+    return summaries
+
+
+def scenario(name: str, body: Callable[[FakeBucket, FakeTime], None]) -> bool:
+    """Queue one container, run the scenario and check it was published exactly once with no record left"""
+    bucket, clock = FakeBucket(), FakeTime()
+    reels.gcs_bucket = lambda: bucket
+    reels.time = clock
+    published_before = len(STUB.media)
+
+    creation_id = reels.create_video_container(ig_user_id=reels.IG_USER_ID, access_token=reels.IG_ACCESS_TOKEN,
+                                               video_url='https://example.com/reel.mp4', caption=name)
+    reels.save_pending_publish(creation_id, f"{name}.mp4")
+    try:
+        body(bucket, clock)
+        run_checks(clock)
+    except Exception as e:
+        print(f"FAIL {name}: {type(e).__name__} {e}")
+        return False
+
+    published = len(STUB.media) - published_before
+    ok = published == 1 and not bucket.objects
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: published {published}x, records left {len(bucket.objects)}")
+    return ok
+
+
+def transient_publish_error(bucket: FakeBucket, clock: FakeTime) -> None:
+    STUB.fail_publishes = 1
+
+
+def dies_after_claim(bucket: FakeBucket, clock: FakeTime) -> None:
+    publish = reels.publish_media
+
+    def die(*args, **kwargs):
+        reels.publish_media = publish
+        raise InstanceDied()
+
+    reels.publish_media = die
+    try:
+        run_checks(clock)
+    except InstanceDied:
+        pass
+    record = bucket.records()[0]
+    assert 'claimed_at' in record, record
+    # Within the lease the record is left alone
+    summary = reels.check_pending_reels(None)
+    assert summary['skipped'] == 1, summary
+    clock.now += reels.PENDING_CLAIM_LEASE_SEC
+
+
+def dies_after_publish(bucket: FakeBucket, clock: FakeTime) -> None:
+    publish = reels.publish_media
+
+    def publish_then_die(*args, **kwargs):
+        reels.publish_media = publish
+        publish(*args, **kwargs)
+        raise InstanceDied()
+
+    reels.publish_media = publish_then_die
+    try:
+        run_checks(clock)
+    except InstanceDied:
+        pass
+    assert len(bucket.objects) == 1
+    clock.now += reels.PENDING_CLAIM_LEASE_SEC
+
+
+def overlapping_runs(bucket: FakeBucket, clock: FakeTime) -> None:
+    # Poll until the next status check reports FINISHED, then have two runs race on the same listing
+    container = STUB.containers[bucket.records()[0]['creation_id']]
+    while container['polls'] < STUB.polls_until_finished - 1:
+        clock.now += reels.PENDING_POLL_MAX_SEC
+        reels.check_pending_reels(None)
+    clock.now += reels.PENDING_POLL_MAX_SEC
+    listings = [bucket.list_blobs(reels.PENDING_PUBLISH_PREFIX) for _ in range(2)]
+    outcomes = []
+    threads = [threading.Thread(target=lambda blobs=blobs: outcomes.append(
+        reels.process_pending_publish(blobs[0], clock.now))) for blobs in listings]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes) == ['published', 'skipped'], outcomes
+
+
+if __name__ == '__main__':
+    results = [
+        scenario('plain', lambda bucket, clock: None),
+        scenario('transient publish error', transient_publish_error),
+        scenario('instance dies after claim', dies_after_claim),
+        scenario('instance dies after publish', dies_after_publish),
+        scenario('overlapping runs', overlapping_runs),
+    ]
+    sys.exit(0 if all(results) else 1)
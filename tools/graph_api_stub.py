@@ -0,0 +1,116 @@
+"""
+Instagram Graph API Stub
+Local stand-in for the container / publish endpoints used by ig_reels_manager
+
+Usage: python tools/graph_api_stub.py [--port 8765] [--polls-until-finished 3] [--fail-publishes 0]
+Then run the reels function with IG_GRAPH_HOST=http://127.0.0.1:8765 (any IG_ACCESS_TOKEN works).
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+class GraphApiStub:
+    """
+    In-memory Graph API state: containers finish after a number of status polls, and the first
+    publishes can be made to fail with a transient (code 1) error to exercise the retries.
+    """
+
+    def __init__(self, polls_until_finished: int = 3, fail_publishes: int = 0):
+        self.polls_until_finished = polls_until_finished
+        self.fail_publishes = fail_publishes
+        self.containers: Dict[str, Dict] = {}
+        self.media: list = []
+        self.calls: list = []
+        self.lock = threading.Lock()
+
+    def handle(self, method: str, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        """Route one request; returns (HTTP status, JSON body)"""
+        parts = [p for p in path.split('/') if p][1:]  # drop the API version
+        with self.lock:
+            self.calls.append((method, '/'.join(parts)))
+
+            if method == 'POST' and len(parts) == 2 and parts[1] == 'media':
+                creation_id = f"{17900000000000000 + len(self.containers)}"
+                self.containers[creation_id] = {'polls': 0, 'status': 'IN_PROGRESS', 'caption': params.get('caption')}
+                return 200, {'id': creation_id}
+
+            if method == 'POST' and len(parts) == 2 and parts[1] == 'media_publish':
+                container = self.containers.get(params.get('creation_id', ''))
+                if container is None:
+                    return 400, {'error': {'message': 'Invalid creation_id', 'code': 100}}
+                if container['status'] == 'PUBLISHED':
+                    return 400, {'error': {'message': 'Media already published', 'code': 9007}}
+                if container['status'] != 'FINISHED':
+                    return 400, {'error': {'message': 'Media ID is not available', 'code': 9007}}
+                if self.fail_publishes > 0:
+                    self.fail_publishes -= 1
+                    return 500, {'error': {'message': 'An unknown error occurred', 'code': 1}}
+                container['status'] = 'PUBLISHED'
+                media_id = f"{18000000000000000 + len(self.media)}"
+                self.media.insert(0, {'id': media_id, 'caption': container['caption'], 'media_type': 'VIDEO'})
+                return 200, {'id': media_id}
+
+            if method == 'GET' and len(parts) == 2 and parts[1] == 'media':
+                return 200, {'data': self.media[:int(params.get('limit', 25))]}
+
+            if method == 'GET' and len(parts) == 1 and parts[0] in self.containers:
+                container = self.containers[parts[0]]
+                container['polls'] += 1
+                if container['status'] == 'IN_PROGRESS' and container['polls'] >= self.polls_until_finished:
+                    container['status'] = 'FINISHED'
+                return 200, {'status_code': container['status'], 'id': parts[0]}
+
+        return 404, {'error': {'message': f"Unknown path {path}", 'code': 803}}
+
+
+def serve(stub: GraphApiStub, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a background thread; returns (server, base URL for IG_GRAPH_HOST)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, method: str):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                params.update({k: v[0] for k, v in parse_qs(self.rfile.read(length).decode('utf-8')).items()})
+            status, body = stub.handle(method, url.path, params)
+            data = json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._respond('GET')
+
+        def do_POST(self):
+            self._respond('POST')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--polls-until-finished', type=int, default=3,
+                        help='Status checks before a container reports FINISHED')
+    parser.add_argument('--fail-publishes', type=int, default=0, help='First publishes that fail with code 1')
+    args = parser.parse_args()
+
+    server, base_url = serve(GraphApiStub(args.polls_until_finished, args.fail_publishes), args.port)
+    print(f"Graph API stub on {base_url} (IG_GRAPH_HOST={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,106 @@
+"""
+Incremental Indicator Parity Check
+Slides a fetch window over a synthetic price history, feeding each window to the incremental path of
+process_timeframe_data, and checks every indicator against the pandas path over all bars seen so far
+
+Usage: python tools/indicator_parity_check.py [--bars 300] [--window 100] [--seed 7]
+The persisted state is kept in memory (no Firestore). Exits non-zero on any mismatch, so it can run as a CI check.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'analysis_trigger_cloud_function'))
+
+from get_stock_data_tool import FinancialDataTool  # noqa: E402
+from price_series import PriceSeries  # noqa: E402
+
+# Relative tolerance between the incremental and the pandas values
+TOLERANCE = 1e-6
+
+
+class InMemoryStateTool(FinancialDataTool):
+    """FinancialDataTool keeping indicator state in a dict instead of Firestore"""
+
+    def __init__(self):
+        super().__init__()
+        self.states = {}
+
+    def load_indicator_state(self, symbol, timeframe):
+        state = self.states.get((symbol, timeframe))
+        return state.model_copy(deep=True) if state is not None else None
+
+    def save_indicator_state(self, state):
+        self.states[(state.symbol, state.timeframe)] = state.model_copy(deep=True)
+
+
+def random_walk(bars: int, seed: int) -> PriceSeries:
+    """Deterministic daily OHLCV series with flat closes mixed in (OBV ignores unchanged closes)"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.02, bars)
+    returns[rng.random(bars) < 0.05] = 0.0
+    close = 100 * np.cumprod(1 + returns)
+    spread = close * rng.uniform(0.002, 0.03, bars)
+    dates = np.datetime64('2020-01-01') + np.arange(bars)
+    return PriceSeries.from_columns(
+        [str(d) for d in dates], close, close + spread, close - spread, close, rng.integers(1_000, 50_000, bars)
+    )
+
+
+def flatten(values: Dict, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    for key, value in values.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        else:
+            yield prefix + key, value
+
+
+def compare(incremental, reference) -> Dict[str, Tuple[float, float]]:
+    """Fields whose values differ beyond TOLERANCE, as name -> (incremental, reference)"""
+    inc = dict(flatten(incremental.model_dump()))
+    ref = dict(flatten(reference.model_dump()))
+    return {name: (inc[name], ref[name]) for name in ref
+            if not np.isclose(inc[name], ref[name], rtol=TOLERANCE, atol=TOLERANCE)}
+
+
+def run(bars: int, window: int, seed: int) -> int:
+    """Check every window position; returns the number of mismatching positions"""
+    history = random_walk(bars, seed)
+    tool = InMemoryStateTool()
+    failures = 0
+    window_only = {}
+
+    for end in range(min(window, bars), bars + 1):
+        fetched = history.slice(max(0, end - window), end)
+        incremental = tool.process_timeframe_data(fetched, symbol='PARITY', timeframe='daily')
+
+        # The state accumulates every bar seen since it was created, so the reference is the whole history
+        mismatches = compare(incremental, tool.process_timeframe_data(history.slice(0, end)))
+        if mismatches:
+            failures += 1
+            print(f"bar {end}: " + ', '.join(f"{k} {a:.6g} != {b:.6g}" for k, (a, b) in mismatches.items()))
+
+        # For information: where the result differs from recomputing over the fetched window only
+        for name in compare(incremental, tool.process_timeframe_data(fetched)):
+            window_only[name] = window_only.get(name, 0) + 1
+
+    checked = bars - min(window, bars) + 1
+    print(f"{checked} window positions, {failures} mismatching the full-history pandas computation")
+    if window_only:
+        print("Differs from a recompute over the fetched window only (expected, state spans the history): "
+              + ', '.join(f"{name} ({count})" for name, count in sorted(window_only.items())))
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=300, help='Length of the synthetic history')
+    parser.add_argument('--window', type=int, default=100, help='Bars per fetch (Alpha Vantage compact size)')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    sys.exit(1 if run(args.bars, args.window, args.seed) else 0)
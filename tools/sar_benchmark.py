@@ -0,0 +1,107 @@
+"""
+Parabolic SAR Validation and Benchmark
+Checks technical_indicators.parabolic_sar against TA-Lib's SAR on a fixed series and times it against the
+previous range-midpoint approximation
+
+Usage: python tools/sar_benchmark.py [--bars 5000] [--repeat 20]
+The TA-Lib comparison is skipped when the talib package is not installed. Exits non-zero on a mismatch.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'analysis_trigger_cloud_function'))
+
+import technical_indicators  # noqa: E402
+
+# Absolute tolerance against TA-Lib (both compute in float64)
+TOLERANCE = 1e-9
+
+
+def fixed_series(bars: int, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Deterministic highs/lows with trends, reversals and gaps"""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.choice([-0.004, 0.0, 0.004], size=bars // 25 + 1), 25)[:bars]
+    mid = 100 * np.cumprod(1 + drift + rng.normal(0, 0.015, bars))
+    spread = mid * rng.uniform(0.002, 0.03, bars)
+    return mid + spread, mid - spread
+
+
+def midpoint_sar(highs: np.ndarray, lows: np.ndarray) -> float:
+    """Previous calculate_sar: middle of the last 10 bars' range (reference only)"""
+    if len(highs) < 2 or len(lows) < 2:
+        return 0.0
+    return float((pd.Series(highs).tail(10).max() + pd.Series(lows).tail(10).min()) / 2)
+
+
+def validate(highs: np.ndarray, lows: np.ndarray) -> Optional[bool]:
+    """
+    Compare every SAR value (and the continuation from a saved state) with talib.SAR
+    Returns:
+        True when all values match, False on a mismatch, None when talib is not installed
+    """
+    try:
+        import talib
+    except ImportError:
+        return None
+
+    expected = talib.SAR(highs, lows, acceleration=technical_indicators.SAR_ACCELERATION,
+                         maximum=technical_indicators.SAR_MAXIMUM)
+    actual, _ = technical_indicators.parabolic_sar(highs, lows)
+
+    # Continuing from the state after the first half must give the same second half
+    half = len(highs) // 2
+    _, state = technical_indicators.parabolic_sar(highs[:half], lows[:half])
+    continued, _ = technical_indicators.parabolic_sar(highs[half:], lows[half:], state=state)
+
+    ok = True
+    for name, values, reference in (('full series', actual, expected),
+                                    ('continued from state', continued, expected[half:])):
+        if not np.allclose(values, reference, rtol=0.0, atol=TOLERANCE, equal_nan=True):
+            worst = int(np.nanargmax(np.abs(values - reference)))
+            print(f"talib mismatch ({name}) at bar {worst}: {values[worst]} != {reference[worst]}")
+            ok = False
+    return ok
+
+
+def best_of(function: Callable, repeat: int) -> float:
+    """Fastest of `repeat` runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, default=5000, help='Length of the fixed series')
+    parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    highs, lows = fixed_series(args.bars)
+
+    valid = validate(highs, lows)
+    if valid is None:
+        print("talib not installed: validation skipped")
+    else:
+        print(f"talib.SAR over {args.bars} bars: {'match' if valid else 'MISMATCH'}")
+
+    _, state = technical_indicators.parabolic_sar(highs[:-1], lows[:-1])
+    timings = {
+        'midpoint SAR (previous)': best_of(lambda: midpoint_sar(highs, lows), args.repeat),
+        'Wilder SAR, full series': best_of(lambda: technical_indicators.parabolic_sar(highs, lows), args.repeat),
+        'Wilder SAR, one new bar': best_of(
+            lambda: technical_indicators.parabolic_sar(highs[-1:], lows[-1:], state=state), args.repeat),
+    }
+    for name, ms in timings.items():
+        print(f"{name:<26} {ms:9.3f} ms")
+
+    sys.exit(1 if valid is False else 0)
@@ -0,0 +1,82 @@
+"""
+Shared Module Copy Check
+Every Cloud Function deploys its own directory, so shared modules are copied into each function that
+uses them; this fails when a copy differs from the canonical one or a function imports a module it lacks
+
+Usage: python tools/shared_modules_check.py [--sync]
+--sync overwrites the other copies with the canonical one. startup_benchmark.py runs the check as well.
+"""
+
+import argparse
+import difflib
+import re
+import shutil
+import sys
+from pathlib import Path
+from typing import List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Shared module -> function directory holding the copy that is edited (the others follow it)
+CANONICAL_COPIES = {
+    'http_client.py': 'analysis_trigger_cloud_function',
+    'av_json.py': 'analysis_trigger_cloud_function',
+}
+
+
+def function_directories() -> List[Path]:
+    """Deployed function directories (every top-level directory with a main.py)"""
+    return sorted(path.parent for path in REPO_ROOT.glob('*/main.py'))
+
+
+def imports_module(directory: Path, module: str) -> bool:
+    """Whether any Python file of a function imports the module"""
+    pattern = re.compile(rf'^\s*(import|from)\s+{re.escape(module)}\b', re.MULTILINE)
+    return any(pattern.search(path.read_text(encoding='utf-8', errors='replace'))
+               for path in directory.glob('*.py') if path.name != f'{module}.py')
+
+
+def check(sync: bool = False) -> int:
+    """Compare every copy with its canonical module; returns the number of problems found"""
+    problems = 0
+    for filename, canonical_dir in CANONICAL_COPIES.items():
+        canonical = REPO_ROOT / canonical_dir / filename
+        expected = canonical.read_text(encoding='utf-8')
+        module = filename[:-len('.py')]
+
+        copies = 0
+        for directory in function_directories():
+            path = directory / filename
+            if not path.exists():
+                if imports_module(directory, module):
+                    print(f"{directory.name}/{filename}: missing, but {directory.name} imports {module}")
+                    problems += 1
+                continue
+
+            copies += 1
+            actual = path.read_text(encoding='utf-8')
+            if actual == expected:
+                continue
+            if sync:
+                shutil.copyfile(canonical, path)
+                print(f"{directory.name}/{filename}: synced from {canonical_dir}")
+                continue
+
+            problems += 1
+            diff = list(difflib.unified_diff(expected.splitlines(), actual.splitlines(),
+                                             f"{canonical_dir}/{filename}", f"{directory.name}/{filename}",
+                                             lineterm='', n=1))
+            print(f"{directory.name}/{filename}: differs from {canonical_dir}/{filename}")
+            print('\n'.join('    ' + line for line in diff[:40]))
+            if len(diff) > 40:
+                print(f"    ... {len(diff) - 40} more diff lines")
+
+        print(f"{filename:<16} {copies} copies, canonical {canonical_dir}")
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sync', action='store_true', help='Overwrite differing copies with the canonical one')
+    args = parser.parse_args()
+    sys.exit(1 if check(args.sync) else 0)
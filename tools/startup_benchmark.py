@@ -0,0 +1,122 @@
+"""
+Cloud Function Startup Benchmark
+Measures the import (cold start) time of each function's main module with `python -X importtime`
+and checks it against a per-function budget
+
+Usage: python tools/startup_benchmark.py [function_dir ...] [--top N] [--budget MS] [--strict]
+Exits non-zero when a function exceeds its budget or a shared module copy has drifted (shared_modules_check.py),
+so it can run as a CI check.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import shared_modules_check
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Import time budget per function directory, in milliseconds (cumulative time of `import main`)
+IMPORT_BUDGETS_MS = {
+    'analysis_trigger_cloud_function': 1500,
+    'email_sending_cloud_function': 1500,
+    'global_us_data_collector': 1500,
+    'ig_reels_manager': 1500,
+    'indicators_collect': 1500,
+    'indicators_spawn': 1000,
+    'new_analysis_checker': 1500,
+    'news_monitoring_cloud_function': 1500,
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse `-X importtime` output
+    Args:
+        stderr: Standard error of the interpreter run with -X importtime
+    Returns:
+        List of (module, self microseconds, cumulative microseconds, nesting level)
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def measure_function(directory: Path, module: str = 'main') -> Dict:
+    """
+    Import a function's main module in a fresh interpreter and collect its import times
+    Args:
+        directory: Function directory (the deployed source root)
+        module: Module imported by the functions framework
+    Returns:
+        Dict with 'total_ms' and 'modules', or 'error' when the import failed
+    """
+    env = {**os.environ, 'PYTHONDONTWRITEBYTECODE': '1'}
+    env.setdefault('GCP_PROJECT', 'startup-benchmark')
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=directory, env=env, capture_output=True, text=True
+    )
+    modules = parse_importtime(completed.stderr)
+    if completed.returncode != 0:
+        errors = [line for line in completed.stderr.splitlines() if line.strip() and not IMPORTTIME_LINE.match(line)]
+        last_line = errors[-1] if errors else 'unknown error'
+        return {'error': last_line, 'modules': modules}
+
+    total_us = next((cumulative for name, _, cumulative, level in reversed(modules) if name == module and level == 0), 0)
+    return {'total_ms': total_us / 1000, 'modules': modules}
+
+
+def top_level_packages(modules: List[Tuple[str, int, int, int]], limit: int) -> List[Tuple[str, float]]:
+    """Slowest imported top-level packages (first import of each), in milliseconds"""
+    cumulative = {}
+    for name, _, cumulative_us, _ in modules:
+        package = name.split('.')[0]
+        cumulative[package] = max(cumulative.get(package, 0), cumulative_us)
+    return sorted(((name, us / 1000) for name, us in cumulative.items()), key=lambda item: -item[1])[:limit]
+
+
+def run(functions: List[str], top: int, strict: bool, budget_override: Optional[float]) -> int:
+    """Measure every function, print the report and return the process exit code"""
+    failures = shared_modules_check.check()
+    for function in functions:
+        directory = REPO_ROOT / function
+        result = measure_function(directory)
+        budget = budget_override or IMPORT_BUDGETS_MS.get(function)
+
+        if 'error' in result:
+            print(f"{function:<34} skipped ({result['error']})")
+            failures += strict
+            continue
+
+        over_budget = budget is not None and result['total_ms'] > budget
+        status = 'OVER BUDGET' if over_budget else 'ok'
+        print(f"{function:<34} {result['total_ms']:8.1f} ms  (budget {budget or '-'} ms)  {status}")
+        for package, elapsed_ms in top_level_packages(result['modules'], top):
+            if package != 'main':
+                print(f"    {package:<30} {elapsed_ms:8.1f} ms")
+        failures += over_budget
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('functions', nargs='*', default=sorted(IMPORT_BUDGETS_MS),
+                        help='Function directories to measure (default: all)')
+    parser.add_argument('--top', type=int, default=8, help='Slowest packages listed per function')
+    parser.add_argument('--budget', type=float, help='Budget in ms applied to every function')
+    parser.add_argument('--strict', action='store_true',
+                        help='Also fail when a function cannot be imported (missing dependencies)')
+    args = parser.parse_args()
+    sys.exit(run(args.functions, args.top, args.strict, args.budget))
@@ -0,0 +1,144 @@
+"""
+TLS Handshake Benchmark
+Compares connection setup with a verifying SSL context built per request, one shared context,
+the shared resuming context of http_client and the warmed keep-alive pool
+
+Usage: python tools/tls_handshake_benchmark.py [--host www.alphavantage.co] [--connections 20] [--local]
+--local serves HTTPS on 127.0.0.1 with a throwaway CA (needs the openssl CLI), for runs without network access.
+"""
+
+import argparse
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'analysis_trigger_cloud_function'))
+
+import http_client  # noqa: E402
+
+
+def serve_local_https(workdir: Path) -> Tuple[ThreadingHTTPServer, int, str]:
+    """HTTPS server for localhost signed by a throwaway CA; returns (server, port, CA file)"""
+    def openssl(*args):
+        subprocess.run(['openssl', *args], cwd=workdir, check=True, capture_output=True)
+
+    openssl('req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', 'ca.key', '-out', 'ca.pem', '-days', '1',
+            '-subj', '/CN=tls-benchmark-ca')
+    openssl('req', '-newkey', 'rsa:2048', '-nodes', '-keyout', 'server.key', '-out', 'server.csr',
+            '-subj', '/CN=localhost')
+    (workdir / 'ext').write_text('subjectAltName=DNS:localhost')
+    openssl('x509', '-req', '-in', 'server.csr', '-CA', 'ca.pem', '-CAkey', 'ca.key', '-CAcreateserial',
+            '-out', 'server.pem', '-days', '1', '-extfile', 'ext')
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '2')
+            self.end_headers()
+
+        def do_GET(self):
+            self.do_HEAD()
+            self.wfile.write(b'ok')
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(workdir / 'server.pem', workdir / 'server.key')
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1], str(workdir / 'ca.pem')
+
+
+def verifying_context(extra_cafile: Optional[str]) -> ssl.SSLContext:
+    """What a per-request verifying client does: parse the CA bundle into a new context"""
+    context = ssl.create_default_context(cafile=http_client.ca_bundle_path())
+    if extra_cafile:
+        context.load_verify_locations(cafile=extra_cafile)
+    return context
+
+
+def connect(host: str, port: int, context_for: Callable[[], ssl.SSLContext]) -> Tuple[float, bool]:
+    """
+    Open one verified TLS connection and send one request over it (so TLS 1.3 tickets arrive)
+    Returns:
+        (milliseconds for context + TCP connect + handshake, whether the session was resumed)
+    """
+    started = time.perf_counter()
+    context = context_for()
+    connection = context.wrap_socket(socket.create_connection((host, port), timeout=10), server_hostname=host)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    connection.sendall(f"HEAD / HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    connection.recv(4096)
+    resumed = connection.session_reused
+    connection.close()
+    return elapsed_ms, resumed
+
+
+def measure(name: str, samples: List[float], resumed: Optional[int] = None) -> Dict:
+    """Median / p95 of one variant's samples in milliseconds"""
+    return {'name': name, 'median': statistics.median(samples), 'p95': sorted(samples)[int(len(samples) * 0.95) - 1],
+            'resumed': resumed, 'count': len(samples)}
+
+
+def run(host: str, port: int, connections: int, extra_cafile: Optional[str]) -> List[Dict]:
+    """Measure every variant against one host, slowest (the per-request context) first"""
+    results = []
+
+    timings = [connect(host, port, lambda: verifying_context(extra_cafile)) for _ in range(connections)]
+    results.append(measure('context per request', [ms for ms, _ in timings], sum(r for _, r in timings)))
+
+    shared = verifying_context(extra_cafile)
+    timings = [connect(host, port, lambda: shared) for _ in range(connections)]
+    results.append(measure('shared context', [ms for ms, _ in timings], sum(r for _, r in timings)))
+
+    resuming = http_client.ssl_context()
+    if extra_cafile:
+        resuming.load_verify_locations(cafile=extra_cafile)
+    connect(host, port, lambda: resuming)  # first full handshake provides the session
+    timings = [connect(host, port, lambda: resuming) for _ in range(connections)]
+    results.append(measure('shared resuming context', [ms for ms, _ in timings], sum(r for _, r in timings)))
+
+    url = f"https://{host}:{port}/"
+    http_client.warm_pool(url)
+    samples = []
+    for _ in range(connections):
+        started = time.perf_counter()
+        http_client.request('HEAD', url, retries=0)
+        samples.append((time.perf_counter() - started) * 1000)
+    results.append(measure('warmed pool (full request)', samples))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='www.alphavantage.co')
+    parser.add_argument('--port', type=int, default=443)
+    parser.add_argument('--connections', type=int, default=20, help='Connections measured per variant')
+    parser.add_argument('--local', action='store_true', help='Benchmark against a local HTTPS server')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        host, port, cafile = args.host, args.port, None
+        if args.local:
+            server, port, cafile = serve_local_https(Path(workdir))
+            host = 'localhost'
+
+        print(f"{host}:{port}, {args.connections} connections per variant, CA bundle {http_client.ca_bundle_path()}")
+        results = run(host, port, args.connections, cafile)
+        baseline = results[0]['median']
+        for result in results:
+            resumed = f"{result['resumed']}/{result['count']} resumed" if result['resumed'] is not None else ''
+            print(f"{result['name']:<28} median {result['median']:7.2f} ms  p95 {result['p95']:7.2f} ms  "
+                  f"({baseline / result['median']:4.1f}x)  {resumed}")